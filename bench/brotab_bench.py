@@ -0,0 +1,62 @@
+"""
+Compares tab focus through the bt command line and through the HTTP backend, against a stub mediator
+
+Usage: python -m bench.brotab_bench [--tabs 200] [--presses 50] [--port 4625]
+"""
+import argparse
+import asyncio
+import re
+import shutil
+import time
+
+from bench.stub_brotab_mediator import StubBrotabMediator
+from executors.executor_pool import ExecutorPool
+from focus.brotab_backend import BrotabBackend, HttpBrotabBackend, SubprocessBrotabBackend
+from focus.brotab_tab_index import BrotabTabIndex
+from focus.browser_tab_focus import BrowserTabFocuser
+
+
+async def measure(description: str, backend: BrotabBackend, nb_presses: int, nb_tabs: int) -> None:
+    focuser = BrowserTabFocuser(re.compile('firefox'), re.compile(f'Tab {nb_tabs - 1}$'), BrotabTabIndex(backend))
+
+    start = time.perf_counter()
+    for _ in range(nb_presses):
+        assert await focuser.focus()
+    elapsed = time.perf_counter() - start
+
+    print(f'{description}: {elapsed / nb_presses * 1000:.2f}ms per press')
+    await backend.close()
+
+
+async def run(nb_tabs: int, nb_presses: int, port: int) -> None:
+    mediator = StubBrotabMediator('firefox', [(f'Tab {i}', f'https://example.com/{i}') for i in range(nb_tabs)],
+                                  port=port)
+    await mediator.start()
+
+    try:
+        await measure('HTTP backend', HttpBrotabBackend(ports=[port]), nb_presses, nb_tabs)
+
+        if shutil.which('bt') is None or port != HttpBrotabBackend.DEFAULT_PORTS[0]:
+            print(f'Skipping the subprocess backend (needs bt and port {HttpBrotabBackend.DEFAULT_PORTS[0]})')
+        else:
+            executor = ExecutorPool('subprocess', 4)
+            await measure('Subprocess backend', SubprocessBrotabBackend(executor), nb_presses, nb_tabs)
+            executor.shutdown()
+    finally:
+        await mediator.stop()
+
+    print(f'Mediator requests: {dict(mediator.requests)}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tabs', type=int, default=200)
+    parser.add_argument('--presses', type=int, default=50)
+    parser.add_argument('--port', type=int, default=HttpBrotabBackend.DEFAULT_PORTS[0])
+    args = parser.parse_args()
+
+    asyncio.run(run(args.tabs, args.presses, args.port))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+Replays MIDI scenarios through the bindings against in-process fakes of Pulse, the window manager, brotab and uinput,
+and reports the message to action latency, the Pulse request rate and the peak memory
+
+Usage: python -m bench.end_to_end_bench [--bindings bindings.toml] [--scenario knob_sweep] [--recording file]
+                                        [--asap] [--round-trip 0.0005] [--metrics]
+                                        [--ramp-rate 50]
+"""
+import argparse
+import asyncio
+import logging
+import pathlib
+import re
+import time
+import tracemalloc
+from typing import Callable, Coroutine, Dict, List, Optional
+
+import mido
+
+from bench.fake_brotab_backend import FakeBrotabBackend
+from bench.fake_pulse import FakePulse
+from bench.fake_virtual_keyboard import FakeVirtualKeyboard
+from bench.fake_window_events import FakeWindowEvents
+from bench.replay import replay
+from config.binding_compiler import BindingCompiler
+from config.binding_config import controller_sections, load_binding_config
+from config.binding_resources import BindingResources
+from executors.blocking_executors import BlockingExecutors
+from focus.brotab_tab_index import BrotabTabIndex
+from focus.window_registry import WindowRegistry
+from metrics.metrics_registry import MetricsRegistry
+from metrics.stall_watchdog import StallWatchdog
+from midi.midi_hub import MidiHub
+from midi.midi_recorder import Recording, load_recording
+from sound.mixer import Mixer
+from sound.pulse_sink_inputs_db import PulseSinkInputsDb
+from sound.pulse_sinks_db import PulseSinksDb
+from sound.sample_bank import SampleBank
+from sound.volume_ramps import VolumeRamps
+
+
+class LatencyProbe:
+    """
+    Records when messages are received, through the hub recorder hook, and when a binding finished handling
+    them. Messages coalesced away by a newer value never complete.
+    """
+
+    def __init__(self):
+        self._received_at: Dict[int, float] = {}
+        self.latencies: List[float] = []
+
+    def record(self, msg: mido.Message, received_at: float, device: Optional[str] = None) -> None:
+        self._received_at[id(msg)] = received_at
+
+    def wrap(self, callback: Callable[[mido.Message], Coroutine]) -> Callable[[mido.Message], Coroutine]:
+        async def timed(msg: mido.Message):
+            await callback(msg)
+            received_at = self._received_at.get(id(msg))
+            if received_at is not None:
+                self.latencies.append(time.perf_counter() - received_at)
+
+        return timed
+
+    def quantile(self, q: float) -> float:
+        if not self.latencies:
+            return 0.
+        latencies = sorted(self.latencies)
+        return latencies[min(int(q * len(latencies)), len(latencies) - 1)]
+
+
+class TimedBindingCompiler(BindingCompiler):
+    def __init__(self, resources: BindingResources, probe: LatencyProbe, metrics: Optional[MetricsRegistry]):
+        super().__init__(resources, metrics)
+        self._probe = probe
+
+    def _compile_action(self, binding: dict, config: dict) -> Callable[[mido.Message], Coroutine]:
+        return self._probe.wrap(super()._compile_action(binding, config))
+
+
+class FakeDesktop:
+    """
+    Fakes populated with the windows, tabs, sinks and streams the default bindings act on
+    """
+
+    def __init__(self, round_trip: float):
+        self.pulse = FakePulse(round_trip)
+        self.pulse.add_sink('WH-1000XM4')
+        self.pulse.add_sink('Speaker + Headphones')
+        for app in ['spotify', 'Firefox', 'Firefox', 'Chromium']:
+            self.pulse.add_sink_input(app)
+        self.pulse.add_sink_input('ZOOM VoiceEngine', 'playStream')
+
+        self.window_events = FakeWindowEvents()
+        self.window_events.add_window('spotify.Spotify', 'Spotify Premium')
+        self.window_events.add_window('zoom.zoom', 'Zoom Meeting')
+        self.window_events.add_window('Navigator.firefox', 'Microsoft Teams - Mozilla Firefox')
+
+        self.brotab = FakeBrotabBackend('firefox', ['Inbox', 'Microsoft Teams', 'Criteo SpatialChat'])
+        self.keyboard = FakeVirtualKeyboard()
+        self.sinks_db = PulseSinksDb()
+        self.sink_inputs_db = PulseSinkInputsDb()
+
+    async def sync(self) -> None:
+        self.sinks_db.refresh(await self.pulse.sink_list())
+        self.sink_inputs_db.refresh(await self.pulse.sink_input_list())
+
+    async def churn(self, period: float) -> None:
+        """
+        Streams appearing and disappearing, like notification sounds or a browser opening media, delivered to the
+        db the way pulse_loop does
+        """
+        streams = []
+        while True:
+            await asyncio.sleep(period)
+            if len(streams) < 10:
+                sink_input = self.pulse.add_sink_input('spotify', 'churn')
+                streams.append(sink_input.index)
+                self.sink_inputs_db.add_or_update(await self.pulse.sink_input_info(sink_input.index))
+            else:
+                index = streams.pop(0)
+                self.pulse.remove_sink_input(index)
+                self.sink_inputs_db.remove(index)
+
+
+def sweep(control: int, duration: float, period: float, channel: int = 0) -> Recording:
+    """
+    Knob turned back and forth over its whole range
+    """
+    recording = []
+    for i in range(int(duration / period)):
+        value = i % 254
+        recording.append((i * period, mido.Message('control_change', channel=channel, control=control,
+                                                   value=value if value < 128 else 253 - value), None))
+    return recording
+
+
+def pad_roll(notes: List[int], duration: float, period: float) -> Recording:
+    recording = []
+    for i in range(int(duration / period)):
+        note = notes[i % len(notes)]
+        recording.append((i * period, mido.Message('note_on', note=note, velocity=100), None))
+        recording.append((i * period + period / 2, mido.Message('note_off', note=note), None))
+    return recording
+
+
+def merge(*recordings: Recording) -> Recording:
+    return sorted((entry for recording in recordings for entry in recording), key=lambda entry: entry[0])
+
+
+SCENARIOS: Dict[str, Callable[[float], Recording]] = {
+    # Spotify (program 1), running sinks and Firefox (program 2) volumes at once
+    'knob_sweep': lambda duration: merge(sweep(15, duration, .004), sweep(31, duration, .004),
+                                         sweep(36, duration, .004)),
+    # Samples (program 1), focus and media keys (program 2)
+    'pad_roll': lambda duration: pad_roll([6, 7, 8, 21, 23, 26, 27], duration, .03),
+    'crossfader_thrash': lambda duration: sweep(11, duration, .002),
+}
+
+
+async def run_scenario(name: str, recording: Recording, bindings_path: pathlib.Path, realtime: bool,
+                       round_trip: float, churn_period: Optional[float], with_metrics: bool,
+                       ramp_rate: Optional[float]) -> None:
+    desktop = FakeDesktop(round_trip)
+    await desktop.sync()
+
+    window_registry = WindowRegistry(desktop.window_events)
+    window_registry.start()
+    mixer = Mixer()
+    metrics = MetricsRegistry() if with_metrics else None
+    ramps = VolumeRamps(desktop.pulse, ramp_rate) if ramp_rate is not None else None
+    executors = BlockingExecutors()
+    resources = BindingResources(desktop.sinks_db, desktop.sink_inputs_db, desktop.pulse, window_registry,
+                                 BrotabTabIndex(desktop.brotab), SampleBank(mixer.samplerate, mixer.channels), mixer,
+                                 desktop.keyboard, executors, metrics, ramps)
+    probe = LatencyProbe()
+    config = load_binding_config(bindings_path)
+    resources.preload(config)
+
+    hub = MidiHub()
+    for controller_name in controller_sections(config):
+        hub.add(controller_name, re.compile('fake'))
+    hub.record_to(probe)
+    hub.load(TimedBindingCompiler(resources, probe, metrics).compile(config))
+    receive_task = asyncio.create_task(hub.receive())
+    churn_task = asyncio.create_task(desktop.churn(churn_period)) if churn_period is not None else None
+    ramps_task = asyncio.create_task(ramps.run()) if ramps is not None else None
+
+    desktop.pulse.calls.clear()
+    tracemalloc.reset_peak()
+    baseline_memory, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    await replay(hub, recording, realtime)
+    while ramps is not None and ramps.active:
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+
+    if churn_task is not None:
+        churn_task.cancel()
+    if ramps_task is not None:
+        ramps_task.cancel()
+    receive_task.cancel()
+    await asyncio.gather(receive_task, return_exceptions=True)
+    executors.shutdown()
+
+    dispatcher = hub.dispatcher
+    print(f'{name}: {len(recording)} messages in {elapsed:.2f}s, {len(probe.latencies)} actions, '
+          f'p50={probe.quantile(.5) * 1000:.2f}ms, p99={probe.quantile(.99) * 1000:.2f}ms, '
+          f'{sum(desktop.pulse.calls.values()) / elapsed:.0f} Pulse calls/s, '
+          f'peak memory +{(peak_memory - baseline_memory) / 1024:.0f}KiB, coalesced {dispatcher.coalescer.dropped}, '
+          f'dropped {sum(worker.dropped for worker in dispatcher.workers())}, '
+          f'{sum(desktop.keyboard.combos.values())} key combos')
+    for pool in executors.pools:
+        if pool.completed:
+            print(f'  executor {pool}')
+    if metrics is not None:
+        print(metrics.render())
+
+
+async def run(args: argparse.Namespace) -> None:
+    if args.recording is not None:
+        scenarios = {args.recording.name: (load_recording(args.recording), None)}
+    else:
+        names = [args.scenario] if args.scenario else list(SCENARIOS)
+        scenarios = {name: (SCENARIOS[name](args.duration), .01 if name == 'crossfader_thrash' else None)
+                     for name in names}
+
+    watchdog = StallWatchdog(args.stall_report, args.stall_threshold / 1000) if args.stall_report else None
+    watchdog_task = asyncio.create_task(watchdog.run()) if watchdog is not None else None
+
+    tracemalloc.start()
+    for name, (recording, churn_period) in scenarios.items():
+        await run_scenario(name, recording, args.bindings, not args.asap, args.round_trip, churn_period,
+                           args.metrics, args.ramp_rate)
+
+    if watchdog_task is not None:
+        watchdog_task.cancel()
+        await asyncio.gather(watchdog_task, return_exceptions=True)
+        print(f'Event loop {watchdog}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bindings', type=pathlib.Path, default=pathlib.Path('bindings.toml'))
+    parser.add_argument('--scenario', choices=list(SCENARIOS))
+    parser.add_argument('--recording', type=pathlib.Path, help='File written by bind_controller.py --record')
+    parser.add_argument('--duration', type=float, default=2.)
+    parser.add_argument('--asap', action='store_true', help='Replay as fast as possible instead of in real time')
+    parser.add_argument('--round-trip', type=float, default=0.0005)
+    parser.add_argument('--ramp-rate', type=float, help='Glide volumes, written at this rate, instead of setting them '
+                                                            'on every message')
+    parser.add_argument('--metrics', action='store_true', help='Instrument the bindings and print their metrics')
+    parser.add_argument('--stall-report', type=pathlib.Path, help='Write the event loop stalls to this rotating file')
+    parser.add_argument('--stall-threshold', type=float, default=5., help='Event loop lag reported as a stall, in '
+                                                                          'milliseconds')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+import asyncio
+import collections
+from typing import Dict, List, Optional
+
+from focus.brotab_backend import BrotabBackend
+
+
+class FakeBrotabBackend(BrotabBackend):
+    """
+    In-process stand-in for the brotab mediators, every request costs a simulated round-trip
+    """
+
+    def __init__(self, browser: str, tab_titles: List[str], round_trip: float = 0.001):
+        self._browser = browser
+        self._tabs = {f'a.1.{i}': title for i, title in enumerate(tab_titles)}
+        self._round_trip = round_trip
+        self.active_tab: Optional[str] = None
+        self.calls = collections.Counter()
+
+    async def list_browsers(self) -> Optional[Dict[str, str]]:
+        await self._request('list_browsers')
+        return {'a': self._browser}
+
+    async def list_tabs(self, browser_id: str) -> Optional[Dict[str, str]]:
+        await self._request('list_tabs')
+        return dict(self._tabs) if browser_id == 'a' else None
+
+    async def activate_tab(self, tab_id: str) -> bool:
+        await self._request('activate_tab')
+        if tab_id not in self._tabs:
+            return False
+
+        self.active_tab = tab_id
+        return True
+
+    async def _request(self, name: str) -> None:
+        self.calls[name] += 1
+        await asyncio.sleep(self._round_trip)
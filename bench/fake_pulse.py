@@ -0,0 +1,105 @@
+import asyncio
+import collections
+import dataclasses
+from typing import Dict, List, Optional
+
+from pulsectl import PulseIndexError, PulseVolumeInfo
+
+
+@dataclasses.dataclass
+class FakeSinkInfo:
+    index: int
+    name: str
+    description: str
+    volume: PulseVolumeInfo
+    state: str = 'running'
+
+
+@dataclasses.dataclass
+class FakeSinkInputInfo:
+    index: int
+    name: str
+    proplist: Dict[str, str]
+    volume: PulseVolumeInfo
+    sink: int = 0
+
+
+class FakePulse:
+    """
+    In-process stand-in for PulseAsync: every request costs a simulated round-trip, requests are pipelined like they
+    are on a real Pulse connection
+    """
+
+    def __init__(self, round_trip: float = 0.0005):
+        self._round_trip = round_trip
+        self._sinks: Dict[int, FakeSinkInfo] = {}
+        self._sink_inputs: Dict[int, FakeSinkInputInfo] = {}
+        self._next_index = 0
+        self.default_sink: Optional[str] = None
+        self.connected = True
+        self.calls = collections.Counter()
+
+    def add_sink(self, description: str, state: str = 'running') -> FakeSinkInfo:
+        sink = FakeSinkInfo(self._allocate_index(), f'sink.{self._next_index}', description,
+                            PulseVolumeInfo(1., 2), state)
+        self._sinks[sink.index] = sink
+        return sink
+
+    def add_sink_input(self, app_name: str, media_name: str = 'playback', sink: int = 0) -> FakeSinkInputInfo:
+        sink_input = FakeSinkInputInfo(self._allocate_index(), media_name,
+                                       {'application.name': app_name, 'media.name': media_name},
+                                       PulseVolumeInfo(1., 2), sink)
+        self._sink_inputs[sink_input.index] = sink_input
+        return sink_input
+
+    def remove_sink_input(self, index: int) -> None:
+        del self._sink_inputs[index]
+
+    async def sink_list(self) -> List[FakeSinkInfo]:
+        await self._request('sink_list')
+        return list(self._sinks.values())
+
+    async def sink_info(self, index: int) -> FakeSinkInfo:
+        await self._request('sink_info')
+        return self._get(self._sinks, index)
+
+    async def sink_input_list(self) -> List[FakeSinkInputInfo]:
+        await self._request('sink_input_list')
+        return list(self._sink_inputs.values())
+
+    async def sink_input_info(self, index: int) -> FakeSinkInputInfo:
+        await self._request('sink_input_info')
+        return self._get(self._sink_inputs, index)
+
+    async def sink_volume_set(self, index: int, volume: PulseVolumeInfo) -> None:
+        await self._request('sink_volume_set')
+        sink = self._get(self._sinks, index)
+        self._sinks[index] = dataclasses.replace(sink, volume=volume)
+
+    async def sink_input_volume_set(self, index: int, volume: PulseVolumeInfo) -> None:
+        await self._request('sink_input_volume_set')
+        sink_input = self._get(self._sink_inputs, index)
+        self._sink_inputs[index] = dataclasses.replace(sink_input, volume=volume)
+
+    async def sink_input_move(self, index: int, sink_index: int) -> None:
+        await self._request('sink_input_move')
+        sink_input = self._get(self._sink_inputs, index)
+        self._sink_inputs[index] = dataclasses.replace(sink_input, sink=self._get(self._sinks, sink_index).index)
+
+    async def sink_default_set(self, sink) -> None:
+        await self._request('sink_default_set')
+        self.default_sink = sink if isinstance(sink, str) else sink.name
+
+    async def _request(self, name: str) -> None:
+        self.calls[name] += 1
+        await asyncio.sleep(self._round_trip)
+
+    def _allocate_index(self) -> int:
+        self._next_index += 1
+        return self._next_index
+
+    @staticmethod
+    def _get(objects: dict, index: int):
+        if index not in objects:
+            raise PulseIndexError(index)
+        return objects[index]
@@ -0,0 +1,26 @@
+import collections
+from typing import List, Tuple
+
+from executors.executor_pool import ExecutorPool
+from input.virtual_keyboard import VirtualKeyboard
+
+
+class FakeVirtualKeyboard(VirtualKeyboard):
+    """
+    Virtual keyboard that counts the combos instead of writing them to /dev/uinput
+    """
+
+    def __init__(self):
+        super().__init__(ExecutorPool('fake-uinput'))
+        self._started = False
+        self.combos = collections.Counter()
+
+    async def start(self) -> None:
+        self._started = True
+
+    def emit_combo(self, keys: List[Tuple[int, int]]) -> None:
+        self.combos[tuple(keys)] += 1
+
+    @property
+    def started(self) -> bool:
+        return self._started
@@ -0,0 +1,54 @@
+import collections
+from typing import Callable, List, Optional
+
+import attr
+from wmctrl import Window
+
+from focus.window_events import WindowEventSource
+
+
+class FakeWindowEvents(WindowEventSource):
+    """
+    In-process stand-in for the X11 window events: windows are declared up front and activation is notified
+    immediately, like a window manager that honours every request
+    """
+
+    def __init__(self):
+        self._windows: List[Window] = []
+        self._active_id: Optional[int] = None
+        self._on_windows_changed: Optional[Callable[[], None]] = None
+        self._on_active_changed: Optional[Callable[[Optional[int]], None]] = None
+        self._on_title_changed: Optional[Callable[[int, str], None]] = None
+        self.calls = collections.Counter()
+
+    def add_window(self, wm_class: str, wm_name: str) -> Window:
+        window = Window(hex(0x1000000 + len(self._windows)), 0, 0, 0, 0, 0, 0, wm_class, 'localhost', wm_name)
+        self._windows.append(window)
+        if self._on_windows_changed is not None:
+            self._on_windows_changed()
+
+        return window
+
+    def rename(self, window: Window, wm_name: str) -> None:
+        index = self._windows.index(window)
+        self._windows[index] = attr.evolve(window, wm_name=wm_name)
+        if self._on_title_changed is not None:
+            self._on_title_changed(int(window.id, 16), wm_name)
+
+    def start(self, on_windows_changed: Callable[[], None], on_active_changed: Callable[[Optional[int]], None],
+              on_title_changed: Callable[[int, str], None]) -> None:
+        self._on_windows_changed = on_windows_changed
+        self._on_active_changed = on_active_changed
+        self._on_title_changed = on_title_changed
+
+    def list_windows(self) -> List[Window]:
+        self.calls['list_windows'] += 1
+        return list(self._windows)
+
+    def active_window(self) -> Optional[int]:
+        return self._active_id
+
+    def activate(self, window: Window) -> None:
+        self.calls['activate'] += 1
+        self._active_id = int(window.id, 16)
+        self._on_active_changed(self._active_id)
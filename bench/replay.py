@@ -0,0 +1,38 @@
+import asyncio
+
+from midi.midi_hub import MidiHub
+from midi.midi_recorder import Recording
+
+
+async def replay(hub: MidiHub, recording: Recording, realtime: bool = True) -> None:
+    """
+    Feed a recording to the controllers, with its original timing or as fast as possible, then wait until every
+    message was handled
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    for timestamp, msg, device in recording:
+        if realtime:
+            delay = start + timestamp - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        hub.feed(msg, device)
+        if not realtime:
+            await asyncio.sleep(0)
+
+    await wait_until_idle(hub)
+
+
+async def wait_until_idle(hub: MidiHub, interval: float = 0.005) -> None:
+    dispatcher = hub.dispatcher
+
+    def idle() -> bool:
+        return hub.backlog == 0 and dispatcher.coalescer.in_flight == 0 \
+            and all(worker.depth == 0 and not worker.busy for worker in dispatcher.workers())
+
+    # Idle twice in a row, a binding may hand over to another task between two checks
+    idle_checks = 0
+    while idle_checks < 2:
+        await asyncio.sleep(interval)
+        idle_checks = idle_checks + 1 if idle() else 0
@@ -0,0 +1,71 @@
+import asyncio
+import collections
+import logging
+import os
+from typing import List, Optional, Tuple
+
+
+class StubBrotabMediator:
+    """
+    Minimal HTTP server answering the brotab mediator requests used by the focusers, with keep-alive support
+    """
+
+    def __init__(self, browser: str, tabs: List[Tuple[str, str]], host: str = '127.0.0.1', port: int = 4625):
+        """
+        :param tabs: (title, url) of the tabs, all in window 1
+        """
+        self._browser = browser
+        self._tabs = tabs
+        self._host = host
+        self._port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.active_tab: Optional[int] = None
+        self.requests = collections.Counter()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, self._host, self._port)
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers = {}
+                while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    name, _, value = line.decode().partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                _method, path, _version = request_line.decode().split()
+                status, body = self._handle(path.split('?')[0])
+                writer.write(f'HTTP/1.1 {status}\r\nContent-Type: text/plain\r\n'
+                             f'Content-Length: {len(body)}\r\n\r\n'.encode() + body)
+                await writer.drain()
+
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, ValueError) as e:
+            logging.debug(f'Stub mediator connection failed: {e}')
+        finally:
+            writer.close()
+
+    def _handle(self, path: str) -> Tuple[str, bytes]:
+        self.requests[path.split('/')[1]] += 1
+
+        if path == '/get_browser':
+            return '200 OK', self._browser.encode()
+        if path == '/get_pid':
+            return '200 OK', str(os.getpid()).encode()
+        if path == '/list_tabs':
+            return '200 OK', '\n'.join(f'1.{tab_id}\t{title}\t{url}'
+                                       for tab_id, (title, url) in enumerate(self._tabs)).encode()
+        if path.startswith('/activate_tab/'):
+            self.active_tab = int(path.split('/')[2])
+            return '200 OK', b'OK'
+
+        return '404 Not Found', b''
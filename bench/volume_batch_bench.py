@@ -0,0 +1,59 @@
+"""
+Compares one awaited volume command per sink input with VolumeBatch, against a fake Pulse server
+
+Usage: python -m bench.volume_batch_bench [--sink-inputs 50] [--ticks 100] [--round-trip 0.0005]
+"""
+import argparse
+import asyncio
+import re
+import time
+
+from pulsectl import PulseVolumeInfo
+
+from bench.fake_pulse import FakePulse
+from sound.pulse_sink_input import PulseSinkInput
+from sound.pulse_sink_inputs_db import PulseSinkInputsDb
+
+
+async def serial_tick(pulse: FakePulse, sink_inputs_db: PulseSinkInputsDb, percentage: float) -> None:
+    for sink_input in sink_inputs_db.get():
+        await pulse.sink_input_volume_set(sink_input.index, PulseVolumeInfo(percentage, len(sink_input.volume.values)))
+
+
+async def run(nb_sink_inputs: int, nb_ticks: int, round_trip: float) -> None:
+    pulse = FakePulse(round_trip)
+    for i in range(nb_sink_inputs):
+        pulse.add_sink_input('Firefox', f'media {i}')
+
+    sink_inputs_db = PulseSinkInputsDb()
+    sink_inputs_db.refresh(await pulse.sink_input_list())
+    firefox = PulseSinkInput(re.compile('Firefox'), None, sink_inputs_db, pulse)
+
+    async def measure(description: str, tick) -> None:
+        pulse.calls.clear()
+        start = time.perf_counter()
+        for i in range(nb_ticks):
+            await tick(i)
+            # Stands for the change events Pulse sends back
+            sink_inputs_db.refresh(await pulse.sink_input_list())
+        elapsed = time.perf_counter() - start
+        print(f'{description}: {elapsed / nb_ticks * 1000:.2f}ms per tick, '
+              f'{pulse.calls["sink_input_volume_set"]} volume commands')
+
+    await measure('Serial', lambda i: serial_tick(pulse, sink_inputs_db, (i % 100) / 100))
+    await measure('Batched', lambda i: firefox.set_volume((i % 100) / 100))
+    await measure('Batched, unchanged volume', lambda i: firefox.set_volume(.5))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sink-inputs', type=int, default=50)
+    parser.add_argument('--ticks', type=int, default=100)
+    parser.add_argument('--round-trip', type=float, default=0.0005)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.sink_inputs, args.ticks, args.round_trip))
+
+
+if __name__ == '__main__':
+    main()
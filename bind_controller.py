@@ -1,32 +1,41 @@
+import argparse
 import asyncio
 import logging
 import pathlib
 import re
 import sys
-from typing import Callable
+from typing import Dict, List, Optional
 
 import pulsectl_asyncio
-import pyudev
-import uinput
-from mido import Message
-from pulsectl import PulseEventFacilityEnum, PulseEventTypeEnum
 from pulsectl_asyncio import PulseAsync
 
-from controls.crossfader import CrossFader
-from focus.browser_tab_focus import BrowserTabFocuser
-from focus.no_focus import NoFocuser
-from focus.window_focus import WindowFocuser
-from input import WindowInput
-from input.browser_input import BrowserInput
-from midi.controller_mapping import ControllerMapping
-from midi.midi_controller import MidiController
-from midi.program import Program
-from sound.pulse_sink_input import PulseSinkInput
+from config.binding_compiler import BindingCompiler
+from config.binding_config import controller_sections, load_binding_config
+from config.binding_config_exception import BindingConfigException
+from config.binding_resources import BindingResources, config_keys, preload_samples
+from config.config_watcher import ConfigWatcher
+from executors.blocking_executors import BlockingExecutors
+from focus.brotab_backend import HttpBrotabBackend
+from focus.brotab_tab_index import BrotabTabIndex
+from focus.window_registry import WindowRegistry
+from input.virtual_keyboard import VirtualKeyboard
+from metrics.instrumented import InstrumentedProxy
+from metrics.metrics_registry import MetricsRegistry
+from metrics.metrics_server import MetricsServer
+from metrics.stall_watchdog import StallWatchdog
+from midi.feedback_engine import FeedbackEngine, FeedbackSources
+from midi.midi_hotplug import MidiHotplug
+from midi.midi_hub import MidiHub
+from midi.midi_recorder import MidiRecorder
+from sound.mixer import Mixer
 from sound.pulse_sink_inputs_db import PulseSinkInputsDb
-from sound.pulse_sinks import PulseSinks
 from sound.pulse_sinks_db import PulseSinksDb
-from sound.pulse_sinks_view import PulseSinksView
-from sound.sound_player import SoundPlayer
+from sound.pulse_supervisor import PulseSupervisor
+from sound.sample_bank import SampleBank
+from sound.stream_router import StreamRouter
+from sound.volume_ramps import VolumeRamps
+from startup.lazy_import import load_now
+from startup.startup_timer import StartupTimer
 
 
 def bootstrap_logging():
@@ -37,178 +46,241 @@ def bootstrap_logging():
     logging.getLogger().setLevel(logging.INFO)
 
 
-async def asyncify(callback: Callable):
-    callback()
-
-
-async def refresh_sink_inputs(sink_inputs_db: PulseSinkInputsDb, pulse_client: PulseAsync):
-    await sink_inputs_db.refresh(await pulse_client.sink_input_list())
-
-
-async def refresh_sinks(sinks_db: PulseSinksDb, pulse_client: PulseAsync):
-    sinks_db.refresh(await pulse_client.sink_list())
-
-
-async def pulse_loop(pulse_client: PulseAsync, sinks_db: PulseSinksDb, sink_inputs_db: PulseSinkInputsDb):
-    await refresh_sink_inputs(sink_inputs_db, pulse_client)
-    await refresh_sinks(sinks_db, pulse_client)
-
-    async for ev in pulse_client.subscribe_events('all'):
-        if ev.facility in [PulseEventFacilityEnum.sink_input] and \
-                ev.t in [PulseEventTypeEnum.new, PulseEventTypeEnum.remove]:
-            await refresh_sink_inputs(sink_inputs_db, pulse_client)
-
-        if ev.facility in [PulseEventFacilityEnum.sink] and \
-                ev.t in [PulseEventTypeEnum.new, PulseEventTypeEnum.remove]:
-            await refresh_sinks(sinks_db, pulse_client)
-
-
-def bind_common(ctrl: MidiController, program: Program) -> None:
-    play_pause = WindowInput(NoFocuser(), [uinput.KEY_PLAYPAUSE])
-    ctrl.bind_note_on(program.get_pad(5), lambda msg: play_pause.send())
-
-
-def bind_dj_mode(ctrl: MidiController, program: Program, sinks_db: PulseSinksDb, sink_inputs_db: PulseSinkInputsDb,
-                 pulse_client: PulseAsync) -> None:
-    spotify_focuser = WindowFocuser(re.compile("spotify.Spotify"), None)
-
-    cue_1 = WindowInput(spotify_focuser, [uinput.KEY_1])
-    cue_2 = WindowInput(spotify_focuser, [uinput.KEY_2])
-    cue_3 = WindowInput(spotify_focuser, [uinput.KEY_3])
-    cue_4 = WindowInput(spotify_focuser, [uinput.KEY_4])
-
-    rm_cue_1 = WindowInput(spotify_focuser, [uinput.KEY_LEFTSHIFT, uinput.KEY_1])
-    rm_cue_2 = WindowInput(spotify_focuser, [uinput.KEY_LEFTSHIFT, uinput.KEY_2])
-    rm_cue_3 = WindowInput(spotify_focuser, [uinput.KEY_LEFTSHIFT, uinput.KEY_3])
-    rm_cue_4 = WindowInput(spotify_focuser, [uinput.KEY_LEFTSHIFT, uinput.KEY_4])
-
-    ctrl.bind_note_on(program.get_pad(1), lambda msg: cue_1.send())
-    ctrl.bind_note_on(program.get_pad(2), lambda msg: cue_2.send())
-    ctrl.bind_note_on(program.get_pad(3), lambda msg: cue_3.send())
-    ctrl.bind_note_on(program.get_pad(4), lambda msg: cue_4.send())
-
-    async def send_if_not_0(msg: Message, window_input: WindowInput):
-        if msg.value > 0:
-            await window_input.send()
-
-    ctrl.bind_control_change(program.get_pad(1), lambda msg: send_if_not_0(msg, rm_cue_1))
-    ctrl.bind_control_change(program.get_pad(2), lambda msg: send_if_not_0(msg, rm_cue_2))
-    ctrl.bind_control_change(program.get_pad(3), lambda msg: send_if_not_0(msg, rm_cue_3))
-    ctrl.bind_control_change(program.get_pad(4), lambda msg: send_if_not_0(msg, rm_cue_4))
-
-    drum_roll = SoundPlayer(pathlib.Path("media/drum-roll-short.wav"), True)
-    cymbals = SoundPlayer(pathlib.Path("media/cymbals-crash-short.wav"))
-    wah_wah = SoundPlayer(pathlib.Path("media/wah-wah.wav"))
-
-    ctrl.bind_note_on(program.get_pad(6), lambda msg: asyncify(drum_roll.toggle))
-    ctrl.bind_note_on(program.get_pad(7), lambda msg: asyncify(cymbals.play))
-    ctrl.bind_note_on(program.get_pad(8), lambda msg: asyncify(wah_wah.play))
-
-    headset_re = re.compile('W[FH]-1000XM')
-    headset_sink = PulseSinks(PulseSinksView(lambda sink: headset_re.match(sink.description) is not None, sinks_db,
-                                             'Sony BT headsets'), pulse_client)
-    speaker_sink = PulseSinks(PulseSinksView(lambda sink: 'Speaker + Headphones' in sink.description,
-                                             sinks_db, 'Speaker or jack attachment'), pulse_client)
-
-    spotify_sink_input = PulseSinkInput(re.compile("(spotify|ALSA plug-in)"), None, sink_inputs_db, pulse_client)
-    sink_inputs_db.register_to_change(spotify_sink_input.update)
-
-    crossfader = CrossFader(headset_sink, speaker_sink)
-    ctrl.bind_control_change(program.get_knob(1), crossfader.update)
-    ctrl.bind_control_change(program.get_knob(5), lambda msg: spotify_sink_input.set_volume(msg.value / 127.))
-
-    bind_common(ctrl, program)
-
-
-def bind_work_mode(ctrl: MidiController, program: Program, sinks_db: PulseSinksDb,
-                   sink_inputs_db: PulseSinkInputsDb, pulse_client: PulseAsync) -> None:
-    spatial_chat_mute = BrowserInput(BrowserTabFocuser(re.compile('firefox'), re.compile('Criteo SpatialChat')),
-                                     WindowInput(WindowFocuser(re.compile('Navigator\\.firefox'),
-                                                               re.compile('.*SpatialChat')),
-                                                 [uinput.KEY_PAUSECD], [uinput.KEY_LEFTCTRL, uinput.KEY_E]))
-
-    # TODO: Match small Zoom window
-    zoom_toggle_mute = WindowInput(WindowFocuser(re.compile("zoom"), re.compile("Zoom Meeting")),
-                                   [uinput.KEY_PAUSECD], [uinput.KEY_LEFTALT, uinput.KEY_Q])
-
-    teams_mute = BrowserInput(BrowserTabFocuser(re.compile('firefox'), re.compile('Microsoft Teams')),
-                              WindowInput(WindowFocuser(re.compile('Navigator\\.firefox'),
-                                                        re.compile('.*Microsoft Teams')),
-                                          [uinput.KEY_PAUSECD],
-                                          [uinput.KEY_LEFTCTRL, uinput.KEY_LEFTSHIFT, uinput.KEY_SEMICOLON]))
-
-    ctrl.bind_note_on(program.get_pad(1), lambda msg: zoom_toggle_mute.send())
-    ctrl.bind_note_on(program.get_pad(2), lambda msg: spatial_chat_mute.send())
-    ctrl.bind_note_on(program.get_pad(3), lambda msg: teams_mute.send())
-
-    media_next = WindowInput(NoFocuser(), [uinput.KEY_NEXTSONG])
-    media_previous = WindowInput(NoFocuser(), [uinput.KEY_PREVIOUSSONG])
-
-    ctrl.bind_note_on(program.get_pad(6), lambda msg: media_previous.send())
-    ctrl.bind_note_on(program.get_pad(7), lambda msg: media_next.send())
-
-    firefox_sink_input = PulseSinkInput(re.compile("Firefox"), None, sink_inputs_db,
-                                        pulse_client)
-    ctrl.bind_control_change(program.get_knob(6), lambda msg: firefox_sink_input.set_volume(msg.value / 127.))
-
-    chrome_sink_input = PulseSinkInput(re.compile("Chrom(e|ium)"), None, sink_inputs_db, pulse_client)
-    ctrl.bind_control_change(program.get_knob(7), lambda msg: chrome_sink_input.set_volume(msg.value / 127.))
-
-    zoom_sink_input = PulseSinkInput(re.compile("ZOOM VoiceEngine"), re.compile("playStream"), sink_inputs_db,
-                                     pulse_client)
-    ctrl.bind_control_change(program.get_knob(8), lambda msg: zoom_sink_input.set_volume(msg.value / 127.))
-
-    running_sinks = PulseSinks(PulseSinksView(lambda sink: sink.state == 'running', sinks_db,
-                                              'All running sinks'), pulse_client)
-    ctrl.bind_control_change(program.get_knob(1), lambda msg: running_sinks.set_volume(msg.value / 127.))
-
-    spotify_sink_input = PulseSinkInput(re.compile("spotify"), None, sink_inputs_db, pulse_client)
-    ctrl.bind_control_change(program.get_knob(5), lambda msg: spotify_sink_input.set_volume(msg.value / 127.))
-    sink_inputs_db.register_to_change(spotify_sink_input.update)
-
-    bind_common(ctrl, program)
-
-
-def watch_usb_events(ctrl: MidiController):
-    context = pyudev.Context()
-    monitor = pyudev.Monitor.from_netlink(context)
-    monitor.filter_by(subsystem='usb')
-
-    observer = pyudev.MonitorObserver(monitor, lambda evt, _: evt == 'bind' and ctrl.connect())
-    observer.start()
-
-
-async def inputs_loop(pulse_client: PulseAsync, sinks_db: PulseSinksDb, sink_inputs_db: PulseSinkInputsDb) -> None:
-    ctrl = MidiController(re.compile('LPD8'))
-    ctrl.connect()
-
-    mapping = ControllerMapping(4)
-    mapping.map(1, Program(list(range(1, 9)), list(range(11, 19))))
-    mapping.map(2, Program(list(range(21, 29)), list(range(31, 39))))
-    mapping.map(3, Program(list(range(41, 49)), list(range(51, 59))))
-    mapping.map(4, Program(list(range(61, 69)), list(range(71, 79))))
-
-    bind_dj_mode(ctrl, mapping.get(1), sinks_db, sink_inputs_db, pulse_client)
-    bind_work_mode(ctrl, mapping.get(2), sinks_db, sink_inputs_db, pulse_client)
-
-    watch_usb_events(ctrl)
-
-    await ctrl.receive()
+def create_window_registry() -> WindowRegistry:
+    # Xlib is only imported once the rest of the startup is running
+    from Xlib import error as xerror
+    from focus.x11_window_events import X11WindowEvents
+
+    try:
+        return WindowRegistry(X11WindowEvents())
+    except xerror.DisplayError as e:
+        logging.warning(f'Could not connect to the X server, window focus will poll: {e}')
+        return WindowRegistry()
+
+
+def register_pulse_metrics(metrics: MetricsRegistry, supervisor: PulseSupervisor) -> None:
+    metrics.register('pulse_connected', 'gauge', 'Whether the Pulse connection is up and synchronized',
+                     lambda: int(supervisor.connected))
+    metrics.register('pulse_outages_total', 'counter', 'Pulse connections lost and recovered',
+                     lambda: supervisor.outages)
+    metrics.register('pulse_recovery_seconds', 'histogram', 'Delay between losing the Pulse connection and being '
+                                                            'synchronized again', supervisor.recovery_time)
+    metrics.register('pulse_events_total', 'counter', 'Sink, sink input and server events received',
+                     lambda: supervisor.events)
+    metrics.register('pulse_events_coalesced_total', 'counter', 'Pulse events handled with an earlier event of the '
+                                                                'same burst', lambda: supervisor.events_coalesced)
+    metrics.register('pulse_resyncs_avoided_total', 'counter', 'Pulse requests saved by handling events in bursts',
+                     lambda: supervisor.resyncs_avoided)
+
+
+def register_controller_metrics(metrics: MetricsRegistry, hub: MidiHub, hotplugs: List[MidiHotplug]) -> None:
+    dispatcher = hub.dispatcher
+    metrics.register('dispatch_latency_seconds', 'histogram', 'Delay between a MIDI message being received and '
+                                                              'dispatched', hub.latency)
+    metrics.register('dispatch_backlog', 'gauge', 'MIDI messages waiting to be dispatched', lambda: hub.backlog)
+    metrics.register('control_changes_coalesced_total', 'counter', 'Control changes replaced by a newer value',
+                     lambda: dispatcher.coalescer.dropped)
+    metrics.register('binding_queue_depth', 'gauge', 'Messages queued for the bindings',
+                     lambda: sum(worker.depth for worker in dispatcher.workers()))
+    metrics.register('binding_dropped_total', 'counter', 'Messages dropped by full binding queues',
+                     lambda: sum(worker.dropped for worker in dispatcher.workers()))
+
+    for controller, hotplug in zip(hub.controllers, hotplugs):
+        metrics.register('controller_messages_total', 'counter', 'MIDI messages received from a controller',
+                         lambda c=controller: c.received, controller=controller.name)
+        metrics.register('controller_dropped_total', 'counter', 'MIDI messages of a controller coalesced or dropped '
+                                                                'by full binding queues',
+                         lambda c=controller: dispatcher.dropped(c.index), controller=controller.name)
+        metrics.register('hotplug_reconnect_seconds', 'histogram', 'Delay between a controller being plugged and its '
+                                                                   'ports being reopened', hotplug.reconnect_latency,
+                         controller=controller.name)
+        metrics.register('hotplug_messages_lost_total', 'counter', 'MIDI messages lost while reconnecting',
+                         lambda h=hotplug: h.messages_lost, controller=controller.name)
+
+
+def register_executor_metrics(metrics: MetricsRegistry, executors: BlockingExecutors) -> None:
+    for pool in executors.pools:
+        metrics.register('executor_queue_wait_seconds', 'histogram', 'Delay between submitting a blocking call and '
+                                                                     'a worker starting it', pool.queue_wait,
+                         pool=pool.name)
+        metrics.register('executor_utilisation', 'gauge', 'Share of the worker time spent running blocking calls',
+                         lambda p=pool: p.utilisation, pool=pool.name)
+        metrics.register('executor_running', 'gauge', 'Blocking calls being run', lambda p=pool: p.running,
+                         pool=pool.name)
+        metrics.register('executor_superseded_total', 'counter', 'Queued blocking calls cancelled by a newer one',
+                         lambda p=pool: p.superseded, pool=pool.name)
+
+
+async def inputs_loop(pulse_client: PulseAsync, sinks_db: PulseSinksDb, sink_inputs_db: PulseSinkInputsDb,
+                      bindings_path: pathlib.Path, recorder: Optional[MidiRecorder],
+                      metrics: Optional[MetricsRegistry], startup: StartupTimer) -> None:
+    with startup.phase('config'):
+        config = load_binding_config(bindings_path)
+    if metrics is not None:
+        pulse_client = InstrumentedProxy(pulse_client, metrics, 'pulse', name='pulse')
+    supervisor = PulseSupervisor(pulse_client, sinks_db, sink_inputs_db,
+                                 event_window=config.get('pulse', {}).get('event_window', 0.015))
+
+    hub = MidiHub()
+    hub.record_to(recorder)
+    feedbacks: Dict[str, FeedbackEngine] = {}
+    for name, section in controller_sections(config).items():
+        controller = hub.add(name, re.compile(section['name']))
+        feedbacks[name] = FeedbackEngine(controller, section.get('feedback_messages_per_second', 100.))
+
+    tab_index = BrotabTabIndex(HttpBrotabBackend())
+    mixer = Mixer()
+    sample_bank = SampleBank(mixer.samplerate, mixer.channels)
+    executors = BlockingExecutors()
+    keyboard = VirtualKeyboard(executors.uinput)
+    volume_config = config.get('volume', {})
+    ramps = VolumeRamps(pulse_client, volume_config.get('ramp_rate', 50.), volume_config.get('ramp_time', 0.08)) \
+        if volume_config.get('ramp', True) else None
+
+    async def start_sound() -> None:
+        # numpy, soundfile and sounddevice are only imported, and the audio output opened, once samples are configured
+        if not config.get('samples'):
+            return
+
+        # The samples and the mixer both use numpy from their own thread, and lazy modules cannot be loaded by two
+        # threads at once
+        await startup.run('numpy', asyncio.to_thread(load_now, 'numpy'))
+        await asyncio.gather(startup.run('samples', asyncio.to_thread(preload_samples, sample_bank, config)),
+                             startup.run('mixer', asyncio.to_thread(mixer.start)))
+
+    # Independent and mostly waiting on devices or other processes, only compiling the bindings needs them all
+    keyboard.register(config_keys(config))
+    window_registry, *_ = await asyncio.gather(
+        startup.run('windows', asyncio.to_thread(create_window_registry)),
+        startup.run('pulse', supervisor.connect()),
+        startup.run('keyboard', keyboard.start()),
+        start_sound(),
+        *[startup.run(f'midi {controller.name}', asyncio.to_thread(controller.connect))
+          for controller in hub.controllers],
+    )
+
+    window_registry.start()
+    resources = BindingResources(sinks_db, sink_inputs_db, pulse_client, window_registry, tab_index, sample_bank,
+                                 mixer, keyboard, executors, metrics, ramps)
+    compiler = BindingCompiler(resources, metrics)
+    supervisor.register_to_recovery(resources.restore_volumes)
+    router = StreamRouter(sink_inputs_db, sinks_db, pulse_client)
+
+    def load_feedback(sources: Dict[str, FeedbackSources]) -> None:
+        for name, feedback in feedbacks.items():
+            feedback.load(sources[name])
+
+    async def load_bindings(new_config: dict) -> None:
+        names = list(controller_sections(new_config))
+        if names != hub.names:
+            raise BindingConfigException(f'Controllers changed from {hub.names} to {names}, restart to apply')
+
+        await asyncio.to_thread(resources.preload, new_config)
+        if new_config.get('samples') and not mixer.started:
+            # After the samples, which loaded numpy
+            await asyncio.to_thread(mixer.start)
+        keyboard.register(config_keys(new_config))
+        table = compiler.compile(new_config)
+        feedback_sources = compiler.compile_feedback(new_config)
+        routes = compiler.compile_routes(new_config)
+        hub.load(table)
+        load_feedback(feedback_sources)
+        router.load(routes)
+        resources.release_unused()
+        if not keyboard.started:
+            await keyboard.start()
+
+    with startup.phase('bindings'):
+        hub.load(compiler.compile(config))
+        load_feedback(compiler.compile_feedback(config))
+        router.load(compiler.compile_routes(config))
+        resources.release_unused()
+
+    receive_task = asyncio.create_task(hub.receive())
+    pulse_task = asyncio.create_task(supervisor.run())
+    startup.report()
+
+    hotplugs = [MidiHotplug(controller) for controller in hub.controllers]
+    for hotplug in hotplugs:
+        hotplug.start()
+    if metrics is not None:
+        register_pulse_metrics(metrics, supervisor)
+        register_controller_metrics(metrics, hub, hotplugs)
+        register_executor_metrics(metrics, executors)
+
+    watcher_task = asyncio.create_task(ConfigWatcher(bindings_path, load_bindings).watch())
+    feedback_tasks = [asyncio.create_task(feedback.run()) for feedback in feedbacks.values()]
+    ramps_task = asyncio.create_task(ramps.run()) if ramps is not None else None
+    try:
+        await asyncio.gather(receive_task, pulse_task)
+    finally:
+        watcher_task.cancel()
+        for feedback_task in feedback_tasks:
+            feedback_task.cancel()
+        if ramps_task is not None:
+            ramps_task.cancel()
+        for hotplug in hotplugs:
+            hotplug.stop()
+        executors.shutdown()
+        mixer.stop()
+        await tab_index.backend.close()
+        logging.info(f'Stream routing: {router}')
 
 
 async def main():
+    startup = StartupTimer()
+    startup.mark('imports')
     bootstrap_logging()
 
-    pulse_client: PulseAsync
-    async with pulsectl_asyncio.PulseAsync('midi-shortcuts-controller') as pulse_client:
-        sink_inputs_db = PulseSinkInputsDb()
-        sinks_db = PulseSinksDb()
-
-        pulse_task = asyncio.create_task(pulse_loop(pulse_client, sinks_db, sink_inputs_db))
-        inputs_task = asyncio.create_task(inputs_loop(pulse_client, sinks_db, sink_inputs_db))
-
-        await pulse_task
-        await inputs_task
+    parser = argparse.ArgumentParser()
+    parser.add_argument('bindings', type=pathlib.Path, nargs='?', default=pathlib.Path('bindings.toml'))
+    parser.add_argument('--record', type=pathlib.Path, help='Write the received MIDI messages to this file, to be '
+                                                            'replayed by the benchmarks')
+    parser.add_argument('--metrics-port', type=int, help='Serve Prometheus metrics over HTTP on this local port')
+    parser.add_argument('--metrics-socket', type=pathlib.Path, help='Serve Prometheus metrics over HTTP on this Unix '
+                                                                    'socket')
+    parser.add_argument('--stall-report', type=pathlib.Path, help='Watch for event loop stalls and write their stacks '
+                                                                  'to this rotating file')
+    parser.add_argument('--stall-threshold', type=float, default=50., help='Event loop lag reported as a stall, in '
+                                                                           'milliseconds')
+    args = parser.parse_args()
+
+    metrics = None
+    metrics_server = None
+    if args.metrics_port is not None or args.metrics_socket is not None:
+        metrics = MetricsRegistry()
+        metrics_server = MetricsServer(metrics, port=args.metrics_port, socket_path=args.metrics_socket)
+        await metrics_server.start()
+
+    watchdog_task = None
+    if args.stall_report is not None:
+        watchdog = StallWatchdog(args.stall_report, args.stall_threshold / 1000)
+        watchdog_task = asyncio.create_task(watchdog.run())
+        if metrics is not None:
+            metrics.register('event_loop_lag_seconds', 'histogram', 'Delay of the event loop heartbeats',
+                             watchdog.lag)
+            metrics.register('event_loop_stalls_total', 'counter', 'Event loop lags above the stall threshold',
+                             lambda: watchdog.stalls)
+
+    recorder = None
+    if args.record is not None:
+        recorder = MidiRecorder(args.record)
+        recorder.open()
+
+    pulse_client = pulsectl_asyncio.PulseAsync('midi-shortcuts-controller')
+    try:
+        await inputs_loop(pulse_client, PulseSinksDb(), PulseSinkInputsDb(), args.bindings, recorder, metrics,
+                          startup)
+    finally:
+        pulse_client.close()
+        if recorder is not None:
+            recorder.close()
+            logging.info(f'Recorded {recorder.count} MIDI messages to {args.record}')
+        if metrics_server is not None:
+            await metrics_server.stop()
+        if watchdog_task is not None:
+            watchdog_task.cancel()
+            await asyncio.gather(watchdog_task, return_exceptions=True)
 
 
 asyncio.run(main())
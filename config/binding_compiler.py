@@ -0,0 +1,233 @@
+import logging
+from typing import Callable, Coroutine, Dict, List, Optional, Tuple, Union
+
+import mido
+
+from config.binding_config import controller_sections
+from config.binding_config_exception import BindingConfigException
+from config.binding_resources import BindingResources
+from metrics.instrumented import timed
+from metrics.metrics_registry import MetricsRegistry
+from midi.binding_worker import BindingWorker, OverflowPolicy
+from midi.controller_mapping import ControllerMapping
+from midi.dispatch_table import DispatchTable, DispatchTableBuilder
+from midi.feedback_engine import FeedbackSources
+from midi.program import Program
+from midi.program_mapping_exception import ProgramMappingException
+from sound.pulse_sink_input import PulseSinkInput
+from sound.pulse_sinks import PulseSinks
+from sound.stream_router import RoutingRule
+
+
+# Index of the controller in the dispatch table and mapping of its programs, by controller name
+ControllerMappings = Dict[str, Tuple[int, ControllerMapping]]
+
+
+class BindingCompiler:
+    """
+    Turns the bindings configuration into a dispatch table, pad feedback sources and stream routing rules
+    """
+
+    def __init__(self, resources: BindingResources, metrics: Optional[MetricsRegistry] = None):
+        self._resources = resources
+        self._metrics = metrics
+
+    def compile(self, config: dict) -> DispatchTable:
+        """
+        :raise BindingConfigException
+        """
+        mappings = BindingCompiler._compile_mappings(config)
+
+        builder = DispatchTableBuilder()
+        for binding in config.get('bindings', []):
+            try:
+                self._compile_binding(binding, config, mappings, builder)
+            except (AttributeError, KeyError, ValueError, ProgramMappingException) as e:
+                raise BindingConfigException(f'Invalid binding {binding}: {e!r}') from e
+
+        logging.info(f'Compiled {len(config.get("bindings", []))} bindings')
+        return builder.build()
+
+    def compile_feedback(self, config: dict) -> Dict[str, FeedbackSources]:
+        """
+        :return: Whether each pad should be lit, by (channel, note), by controller name
+        :raise BindingConfigException
+        """
+        mappings = BindingCompiler._compile_mappings(config)
+
+        sources = {name: {} for name in mappings}
+        for feedback in config.get('feedback', []):
+            try:
+                source = self._compile_feedback_source(feedback, config)
+                name = BindingCompiler._controller_name(feedback, mappings)
+                _, mapping = mappings[name]
+                program_ids = feedback['program'] if isinstance(feedback['program'], list) else [feedback['program']]
+                for program_id in program_ids:
+                    program = mapping.get(program_id)
+                    sources[name][(program.channel or 0, program.get_pad(feedback['pad']))] = source
+            except (KeyError, ValueError, ProgramMappingException) as e:
+                raise BindingConfigException(f'Invalid feedback {feedback}: {e!r}') from e
+
+        return sources
+
+    def _compile_feedback_source(self, feedback: dict, config: dict) -> Callable[[], bool]:
+        source = feedback['source']
+
+        if source == 'sample':
+            return self._resources.sound_player(BindingCompiler._section(config, 'samples',
+                                                                         feedback['sample'])).is_playing
+
+        if source == 'crossfader':
+            crossfader = self._resources.crossfader([BindingCompiler._section(config, 'sinks', deck)
+                                                     for deck in feedback['decks']])
+            deck = self._resources.sinks(BindingCompiler._section(config, 'sinks', feedback['deck']))
+            return lambda: crossfader.default_sink is deck
+
+        if source == 'sink_input':
+            return self._resources.sink_input(BindingCompiler._section(config, 'sink_inputs',
+                                                                       feedback['sink_input'])).has_targets
+
+        if source == 'sinks':
+            return self._resources.sinks(BindingCompiler._section(config, 'sinks', feedback['sinks'])).has_targets
+
+        raise BindingConfigException(f'Unknown feedback source {source}')
+
+    def compile_routes(self, config: dict) -> List[RoutingRule]:
+        """
+        :return: Rules in priority order
+        :raise BindingConfigException
+        """
+        rules = []
+        for route in config.get('routes', []):
+            try:
+                rules.append(RoutingRule(
+                    self._resources.sink_input(BindingCompiler._section(config, 'sink_inputs', route['sink_input'])),
+                    self._resources.sinks(BindingCompiler._section(config, 'sinks', route['sinks']))))
+            except KeyError as e:
+                raise BindingConfigException(f'Invalid route {route}: {e!r}') from e
+
+        return rules
+
+    @staticmethod
+    def _compile_mappings(config: dict) -> ControllerMappings:
+        return {name: (index, BindingCompiler._compile_mapping(section['programs']))
+                for index, (name, section) in enumerate(controller_sections(config).items())}
+
+    @staticmethod
+    def _controller_name(binding: dict, mappings: ControllerMappings) -> str:
+        """
+        :return: Controller of a binding or a feedback, the first one by default
+        """
+        name = binding.get('controller', next(iter(mappings)))
+        if name not in mappings:
+            raise BindingConfigException(f'Could not find controller {name}')
+
+        return name
+
+    @staticmethod
+    def _compile_mapping(programs: dict) -> ControllerMapping:
+        if not programs:
+            raise BindingConfigException('No program defined')
+
+        mapping = ControllerMapping(max(int(program_id) for program_id in programs))
+        for program_id, program in programs.items():
+            mapping.map(int(program_id), Program(program['pads'], program['knobs'], program.get('channel')))
+
+        return mapping
+
+    def _compile_binding(self, binding: dict, config: dict, mappings: ControllerMappings,
+                         builder: DispatchTableBuilder) -> None:
+        name = BindingCompiler._controller_name(binding, mappings)
+        device, mapping = mappings[name]
+        program_ids = binding['program'] if isinstance(binding['program'], list) else [binding['program']]
+
+        if 'pad' in binding:
+            control_description = f'pad {binding["pad"]}'
+            default_message_type = 'note_on'
+        elif 'knob' in binding:
+            control_description = f'knob {binding["knob"]}'
+            default_message_type = 'control_change'
+        else:
+            raise BindingConfigException(f'Binding {binding} has neither a pad nor a knob')
+
+        message_type = binding.get('message', default_message_type)
+        description = f'{message_type} {control_description} of program {program_ids}: {binding["action"]}'
+        if len(mappings) > 1:
+            description = f'{name} {description}'
+        callback = self._compile_action(binding, config)
+        if self._metrics is not None:
+            callback = timed(self._metrics, callback, 'binding', 'bindings handling a MIDI message',
+                             binding=description)
+
+        worker = BindingWorker(callback, description, binding.get('queue_size', 16),
+                               OverflowPolicy(binding.get('overflow', 'drop_newest')))
+
+        for program_id in program_ids:
+            program = mapping.get(program_id)
+            number = program.get_pad(binding['pad']) if 'pad' in binding else program.get_knob(binding['knob'])
+            builder.bind(message_type, number, worker, program.channel, device)
+
+    def _compile_action(self, binding: dict, config: dict) -> Callable[[mido.Message], Coroutine]:
+        action = binding['action']
+
+        if action == 'keys':
+            window_input = self._resources.window_input(BindingCompiler._section(config, 'focus',
+                                                                                 binding.get('focus')),
+                                                        binding['keys'])
+
+            if binding.get('only_pressed', False):
+                # Pads in control change mode also send a message with a 0 value when released
+                async def send_if_pressed(msg: mido.Message):
+                    if msg.value > 0:
+                        await window_input.send()
+
+                return send_if_pressed
+
+            return lambda msg: window_input.send()
+
+        if action == 'sink_input_volume':
+            sink_input = self._resources.sink_input(BindingCompiler._section(config, 'sink_inputs',
+                                                                             binding['sink_input']))
+            return self._volume_action(sink_input)
+
+        if action == 'sinks_volume':
+            sinks = self._resources.sinks(BindingCompiler._section(config, 'sinks', binding['sinks']))
+            return self._volume_action(sinks)
+
+        if action == 'crossfader':
+            crossfader = self._resources.crossfader([BindingCompiler._section(config, 'sinks', deck)
+                                                     for deck in binding['decks']])
+            crossfader.configure(binding.get('curve', 'dip'), binding.get('hysteresis', 2))
+            return crossfader.update
+
+        if action == 'sample':
+            player = self._resources.sound_player(BindingCompiler._section(config, 'samples', binding['sample']))
+            trigger = {'play': player.play, 'toggle': player.toggle, 'retrigger': player.retrigger,
+                       'stop': player.stop}[binding.get('mode', 'play')]
+
+            async def trigger_sample(_msg: mido.Message):
+                trigger()
+
+            return trigger_sample
+
+        raise BindingConfigException(f'Unknown action {action}')
+
+    def _volume_action(self, target: Union[PulseSinks, PulseSinkInput]) -> Callable[[mido.Message], Coroutine]:
+        ramps = self._resources.ramps
+        if ramps is None:
+            return lambda msg: target.set_volume(msg.value / 127.)
+
+        async def ramp_volume(msg: mido.Message):
+            ramps.set_goal(target, msg.value / 127.)
+
+        return ramp_volume
+
+    @staticmethod
+    def _section(config: dict, section: str, name: Optional[str]) -> Optional[dict]:
+        if name is None:
+            return None
+
+        if name not in config.get(section, {}):
+            raise BindingConfigException(f'Could not find {name} in [{section}]')
+
+        return config[section][name]
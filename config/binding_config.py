@@ -0,0 +1,51 @@
+import pathlib
+from typing import Dict
+
+try:
+    import tomllib
+except ImportError:
+    # Python < 3.11
+    import tomli as tomllib
+
+from config.binding_config_exception import BindingConfigException
+
+
+def load_binding_config(path: pathlib.Path) -> dict:
+    """
+    :raise BindingConfigException
+    """
+    try:
+        if path.suffix == '.toml':
+            with open(path, 'rb') as f:
+                return tomllib.load(f)
+
+        if path.suffix in ('.yaml', '.yml'):
+            # YAML support is optional
+            import yaml
+            with open(path) as f:
+                return yaml.safe_load(f)
+    except (OSError, ImportError, ValueError) as e:
+        raise BindingConfigException(f'Failed to load bindings from {path}: {e}') from e
+
+    raise BindingConfigException(f'Unsupported bindings file format: {path}')
+
+
+def controller_sections(config: dict) -> Dict[str, dict]:
+    """
+    Controllers declared in [controllers.<name>], or the single [controller] named default. Their programs default to
+    the top level [programs].
+
+    :return: Sections by controller name, in declaration order
+    :raise BindingConfigException
+    """
+    if 'controllers' in config:
+        sections = config['controllers']
+    elif 'controller' in config:
+        sections = {'default': config['controller']}
+    else:
+        sections = {}
+
+    if not sections:
+        raise BindingConfigException('No [controller] or [controllers.<name>] defined')
+
+    return {name: {'programs': config.get('programs', {}), **section} for name, section in sections.items()}
@@ -0,0 +1,2 @@
+class BindingConfigException(Exception):
+    pass
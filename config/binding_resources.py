@@ -0,0 +1,251 @@
+import logging
+import pathlib
+import re
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple, Union
+
+import uinput
+from pulsectl import PulseSinkInfo
+from pulsectl_asyncio import PulseAsync
+
+from controls.crossfader import CrossFader
+from executors.blocking_executors import BlockingExecutors
+from focus.brotab_tab_index import BrotabTabIndex
+from focus.browser_tab_focus import BrowserTabFocuser
+from focus.focuser import Focuser
+from focus.no_focus import NoFocuser
+from focus.window_focus import WindowFocuser
+from focus.window_registry import WindowRegistry
+from input import WindowInput
+from input.browser_input import BrowserInput
+from input.virtual_keyboard import VirtualKeyboard
+from metrics.instrumented import InstrumentedProxy
+from metrics.metrics_registry import MetricsRegistry
+from sound.mixer import Mixer
+from sound.pulse_sink_input import PulseSinkInput
+from sound.pulse_sink_inputs_db import PulseSinkInputsDb
+from sound.pulse_sinks import PulseSinks
+from sound.pulse_sinks_db import PulseSinksDb
+from sound.pulse_sinks_view import PulseSinksView
+from sound.sample_bank import SampleBank
+from sound.sound_player import SoundPlayer
+from sound.volume_batch import VolumeBatch
+from sound.volume_ramps import VolumeRamps
+
+
+class BindingResources:
+    """
+    Objects the bindings act on, created on first use from their configuration and reused when the bindings are
+    compiled again, so that reloading does not recreate Pulse handles, players or focusers. Once a new configuration is
+    loaded, the objects it no longer uses are released, along with their matchers and subscriptions in the dbs. With
+    metrics, inputs, focusers and sound objects are wrapped to time their calls.
+    """
+
+    def __init__(self, sinks_db: PulseSinksDb, sink_inputs_db: PulseSinkInputsDb, pulse_client: PulseAsync,
+                 window_registry: WindowRegistry, tab_index: BrotabTabIndex, sample_bank: SampleBank, mixer: Mixer,
+                 keyboard: VirtualKeyboard, executors: BlockingExecutors, metrics: Optional[MetricsRegistry] = None,
+                 ramps: Optional[VolumeRamps] = None):
+        self._metrics = metrics
+        self._executors = executors
+        self._ramps = ramps
+        self._sinks_db = sinks_db
+        self._sink_inputs_db = sink_inputs_db
+        self._pulse_client = pulse_client
+        self._window_registry = window_registry
+        self._tab_index = tab_index
+        self._sample_bank = sample_bank
+        self._mixer = mixer
+        self._keyboard = keyboard
+        self._objects: Dict[Hashable, object] = {}
+        # Objects created by the factory of each object, used along with it
+        self._dependencies: Dict[Hashable, Set[Hashable]] = {}
+        self._releases: Dict[Hashable, Callable[[], None]] = {}
+        self._used: Set[Hashable] = set()
+        self._creating: List[Hashable] = []
+
+    def preload(self, config: dict) -> None:
+        """
+        Decode the samples of the configuration, may be called from a worker thread
+        """
+        preload_samples(self._sample_bank, config)
+
+    def window_input(self, focus: Optional[dict], keys: List[List[str]]) -> Union[WindowInput, BrowserInput]:
+        combos = [[getattr(uinput, key) for key in combo] for combo in keys]
+
+        def create():
+            window_input = self._instrument(WindowInput(self._window_focuser(focus), self._keyboard,
+                                                        self._executors.uinput, *combos),
+                                            'window_input', ['send'])
+            if focus is not None and 'browser' in focus:
+                tab_focuser = self._get(('browser_tab', focus['browser'], focus['tab']),
+                                        lambda: self._instrument(BrowserTabFocuser(re.compile(focus['browser']),
+                                                                                   re.compile(focus['tab']),
+                                                                                   self._tab_index),
+                                                                 'browser_tab_focuser', ['focus']))
+                return self._instrument(BrowserInput(tab_focuser, window_input), 'browser_input', ['send'])
+            return window_input
+
+        return self._get(('window_input', _freeze(focus), _freeze(keys)), create)
+
+    def sink_input(self, spec: dict) -> PulseSinkInput:
+        key = ('sink_input', _freeze(spec))
+
+        def create():
+            sink_input = self._instrument(PulseSinkInput(_compile(spec.get('app')), _compile(spec.get('media')),
+                                                         self._sink_inputs_db, self._pulse_client),
+                                          'sink_input', ['set_volume', 'move', 'update'])
+            if not spec.get('restore_volume', False):
+                self._releases[key] = sink_input.release
+                return sink_input
+
+            update = sink_input.update
+            self._sink_inputs_db.register_to_change(update)
+
+            def release():
+                self._sink_inputs_db.unregister_to_change(update)
+                sink_input.release()
+
+            self._releases[key] = release
+            return sink_input
+
+        return self._get(key, create)
+
+    def sinks(self, spec: dict) -> PulseSinks:
+        key = ('sinks', _freeze(spec))
+
+        def create():
+            description_pattern = _compile(spec.get('match_description'))
+            state = spec.get('state')
+
+            def matcher(sink: PulseSinkInfo) -> bool:
+                return (description_pattern is None or description_pattern.search(sink.description) is not None) \
+                    and (state is None or sink.state == state)
+
+            sinks = self._instrument(PulseSinks(PulseSinksView(matcher, self._sinks_db,
+                                                               spec.get('description', str(spec))),
+                                                self._pulse_client),
+                                     'sinks', ['set_volume', 'set_default'])
+            self._releases[key] = sinks.release
+            return sinks
+
+        return self._get(key, create)
+
+    def crossfader(self, decks: List[dict]) -> CrossFader:
+        return self._get(('crossfader', _freeze(decks)),
+                         lambda: CrossFader([self.sinks(deck) for deck in decks], self._ramps))
+
+    def sound_player(self, spec: dict) -> SoundPlayer:
+        key = ('sound_player', _freeze(spec))
+
+        def create():
+            player = SoundPlayer(self._sample_bank.load(pathlib.Path(spec['file'])), self._mixer,
+                                 spec.get('looping', False))
+            # Nothing could stop a looping voice once its player is gone
+            self._releases[key] = player.stop
+            return player
+
+        return self._get(key, create)
+
+    def release_unused(self) -> None:
+        """
+        Release the objects not used since the previous call, to be called once the bindings compiled since then are
+        loaded
+        """
+        unused = [key for key in self._objects if key not in self._used]
+        for key in unused:
+            del self._objects[key]
+            del self._dependencies[key]
+            release = self._releases.pop(key, None)
+            if release is not None:
+                release()
+
+        if unused:
+            logging.info(f'Released {len(unused)} binding resources')
+        self._used = set()
+
+    async def restore_volumes(self) -> None:
+        """
+        Set again the latest volume of every sink input and sinks binding in one batch, e.g. after a Pulse restart
+        """
+        # The server forgot the volumes sent before it restarted
+        VolumeBatch.forget_sent(self._pulse_client)
+        batch = VolumeBatch(self._pulse_client)
+        for key, target in self._objects.items():
+            if key[0] in ('sink_input', 'sinks'):
+                target.restore_volume_to(batch)
+
+        logging.info(f'Restoring {batch.pending} volumes')
+        await batch.apply()
+
+    @property
+    def ramps(self) -> Optional[VolumeRamps]:
+        return self._ramps
+
+    def _window_focuser(self, focus: Optional[dict]) -> Focuser:
+        if focus is None or 'window_class' not in focus:
+            return self._get(('no_focus',), NoFocuser)
+
+        return self._get(('window_focus', focus['window_class'], focus.get('window_name')),
+                         lambda: self._instrument(WindowFocuser(re.compile(focus['window_class']),
+                                                                _compile(focus.get('window_name')),
+                                                                self._window_registry,
+                                                                self._executors.window_manager),
+                                                  'window_focuser', ['focus']))
+
+    def _instrument(self, target, component: str, methods: Optional[List[str]] = None, name: Optional[str] = None):
+        if self._metrics is None:
+            return target
+
+        return InstrumentedProxy(target, self._metrics, component, methods, name)
+
+    def _get(self, key: Hashable, factory: Callable[[], object]):
+        if self._creating:
+            self._dependencies[self._creating[-1]].add(key)
+
+        if key not in self._objects:
+            self._dependencies[key] = set()
+            self._creating.append(key)
+            try:
+                self._objects[key] = factory()
+            except Exception:
+                del self._dependencies[key]
+                raise
+            finally:
+                self._creating.pop()
+
+        self._use(key)
+        return self._objects[key]
+
+    def _use(self, key: Hashable) -> None:
+        if key in self._used:
+            return
+
+        self._used.add(key)
+        for dependency in self._dependencies[key]:
+            self._use(dependency)
+
+
+def _compile(pattern: Optional[str]) -> Optional[re.Pattern]:
+    return re.compile(pattern) if pattern is not None else None
+
+
+def preload_samples(sample_bank: SampleBank, config: dict) -> None:
+    for sample in config.get('samples', {}).values():
+        sample_bank.load(pathlib.Path(sample['file']))
+
+
+def config_keys(config: dict) -> Set[Tuple[int, int]]:
+    """
+    Keys of the configuration, so that the virtual keyboard can be created before the bindings are compiled. Unknown
+    keys are reported by the compiler.
+    """
+    return {getattr(uinput, key) for binding in config.get('bindings', []) for combo in binding.get('keys', [])
+            for key in combo if hasattr(uinput, key)}
+
+
+def _freeze(value) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+
+    return value
@@ -0,0 +1,42 @@
+import asyncio
+import logging
+import pathlib
+from typing import Callable, Coroutine, Optional
+
+from config.binding_config import load_binding_config
+
+
+class ConfigWatcher:
+    """
+    Polls the bindings file and hands its new content to a callback when it changes. The file is parsed in a worker
+    thread, away from MIDI dispatch.
+    """
+
+    def __init__(self, path: pathlib.Path, on_change: Callable[[dict], Coroutine], interval: float = 1.):
+        self._path = path
+        self._on_change = on_change
+        self._interval = interval
+
+    async def watch(self) -> None:
+        mtime = self._mtime()
+
+        while True:
+            await asyncio.sleep(self._interval)
+
+            current_mtime = self._mtime()
+            if current_mtime == mtime:
+                continue
+            mtime = current_mtime
+
+            logging.info(f'{self._path} changed, reloading bindings')
+            try:
+                config = await asyncio.to_thread(load_binding_config, self._path)
+                await self._on_change(config)
+            except Exception:
+                logging.exception(f'Failed to reload {self._path}, keeping previous bindings')
+
+    def _mtime(self) -> Optional[int]:
+        try:
+            return self._path.stat().st_mtime_ns
+        except OSError:
+            return None
@@ -1,27 +1,81 @@
 import logging
+from typing import List, Optional, Sequence
 
 from mido import Message
 
+from controls.crossfader_curves import CurveTable, curve_table
 from sound.pulse_sinks import PulseSinks
+from sound.volume_batch import VolumeBatch
+from sound.volume_ramps import VolumeRamps
 
 
 class CrossFader:
-    def __init__(self, left_sink: PulseSinks, right_sink: PulseSinks):
-        self._left_sink = left_sink
-        self._right_sink = right_sink
+    """
+    Fades between decks spread evenly along the fader, the first one at 0. Gains are read from precomputed curve
+    tables, and the default sink only changes when the fader moves closer to another deck by more than the
+    hysteresis.
+    """
+
+    def __init__(self, decks: Sequence[PulseSinks], ramps: Optional[VolumeRamps] = None, curve: str = 'dip',
+                 hysteresis: int = 2):
+        """
+        :param ramps: Glide to the new volumes instead of setting them at once
+        :param hysteresis: In fader steps, past the middle between two decks
+        """
+        if len(decks) < 2:
+            raise ValueError(f'A crossfader needs at least 2 decks, got {len(decks)}')
+
+        self._decks = list(decks)
+        self._ramps = ramps
+        self._tables: List[CurveTable] = []
+        self._hysteresis = 0.
+        self._default_deck: Optional[int] = None
+        self._default_sink: Optional[PulseSinks] = None
+        self.configure(curve, hysteresis)
+
+    def configure(self, curve: str, hysteresis: int) -> None:
+        """
+        :raise ValueError: Unknown curve
+        """
+        self._tables = [curve_table(curve, deck, len(self._decks)) for deck in range(len(self._decks))]
+        self._hysteresis = hysteresis / 127
 
     async def update(self, msg: Message) -> None:
         value = msg.value
-        logging.debug(f'Crossfader between {self._left_sink} and {self._right_sink}: {value}')
+        logging.debug(f'Crossfader between {self._decks}: {value}')
+
+        if self._ramps is not None:
+            for deck, table in zip(self._decks, self._tables):
+                self._ramps.set_goal(deck, table[value])
+        else:
+            batch = VolumeBatch(self._decks[0].pulse_client)
+            for deck, table in zip(self._decks, self._tables):
+                deck.add_volume_to(batch, table[value])
+            await batch.apply()
 
-        mid_value = 127 / 2
-        left_value = max((value - mid_value) * 2 / 100, 0)
-        right_value = max((mid_value - value) * 2 / 100, 0)
+        default_deck = self._closest_deck(value / 127)
+        # Until the default sink is set, the next values close to this deck try again
+        if default_deck != self._default_deck and await self._decks[default_deck].set_default():
+            self._default_deck = default_deck
+            self._default_sink = self._decks[default_deck]
 
-        await self._left_sink.set_volume(right_value)
-        await self._right_sink.set_volume(left_value)
+    def _closest_deck(self, position: float) -> int:
+        closest = round(position * (len(self._decks) - 1))
+        if self._default_deck is None:
+            return closest
 
-        if value > mid_value:
-            await self._right_sink.set_default()
-        else:
-            await self._left_sink.set_default()
+        spacing = 1 / (len(self._decks) - 1)
+        distance_to_default = abs(position - self._default_deck * spacing)
+        distance_to_closest = abs(position - closest * spacing)
+        # Past the middle between the decks by more than the hysteresis
+        if distance_to_default - distance_to_closest > 2 * self._hysteresis:
+            return closest
+
+        return self._default_deck
+
+    @property
+    def default_sink(self) -> Optional[PulseSinks]:
+        """
+        :return: Deck last set as the default sink
+        """
+        return self._default_sink
@@ -0,0 +1,37 @@
+import math
+from typing import Callable, Dict, Tuple
+
+CurveTable = Tuple[float, ...]
+
+
+def _dip(closeness: float) -> float:
+    # Both decks silent in the middle, up to 127% at their end
+    return max((closeness * 127 - 127 / 2) * 2 / 100, 0)
+
+
+# Gain of a deck from its closeness to the fader, 1 when the fader is on the deck and 0 on the neighbour deck
+CURVES: Dict[str, Callable[[float], float]] = {
+    'linear': lambda closeness: closeness,
+    'constant_power': lambda closeness: math.sin(closeness * math.pi / 2),
+    'cut': lambda closeness: min(closeness * 20, 1.),
+    'dip': _dip,
+}
+
+
+def curve_table(curve: str, deck: int, nb_decks: int) -> CurveTable:
+    """
+    Gains of a deck for the 128 fader values, decks being spread evenly along the fader
+
+    :raise ValueError: Unknown curve
+    """
+    if curve not in CURVES:
+        raise ValueError(f'Unknown crossfader curve {curve}, expected one of {list(CURVES)}')
+
+    gain = CURVES[curve]
+    position = deck / (nb_decks - 1)
+    table = []
+    for value in range(128):
+        closeness = 1 - abs(value / 127 - position) * (nb_decks - 1)
+        table.append(gain(closeness) if closeness > 0 else 0.)
+
+    return tuple(table)
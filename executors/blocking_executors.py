@@ -0,0 +1,35 @@
+from typing import List
+
+from executors.executor_pool import ExecutorPool
+
+
+class BlockingExecutors:
+    """
+    Pools shared by the focusers and inputs: a single uinput writer so that combos are typed in order, a single
+    window manager worker since X11 displays are not thread safe, and several workers for the spawned processes
+    """
+
+    def __init__(self, subprocess_workers: int = 4):
+        self._uinput = ExecutorPool('uinput')
+        self._window_manager = ExecutorPool('window-manager')
+        self._subprocess = ExecutorPool('subprocess', subprocess_workers)
+
+    def shutdown(self) -> None:
+        for pool in self.pools:
+            pool.shutdown()
+
+    @property
+    def uinput(self) -> ExecutorPool:
+        return self._uinput
+
+    @property
+    def window_manager(self) -> ExecutorPool:
+        return self._window_manager
+
+    @property
+    def subprocess(self) -> ExecutorPool:
+        return self._subprocess
+
+    @property
+    def pools(self) -> List[ExecutorPool]:
+        return [self._uinput, self._window_manager, self._subprocess]
@@ -0,0 +1,120 @@
+import asyncio
+import concurrent.futures
+import logging
+import time
+from typing import Callable, Dict, Hashable, Optional, TypeVar
+
+from metrics.histogram import Histogram
+
+T = TypeVar('T')
+
+
+class SupersededException(Exception):
+    pass
+
+
+class ExecutorPool:
+    """
+    Bounded set of threads running the blocking calls of one resource, so that they do not stall the event loop. Calls
+    run in submission order, and a pool with a single worker serializes the access to its resource. Callers wait for a
+    free slot once max_pending calls are queued or running. A call still queued when a newer one is submitted with the
+    same key is cancelled, and its caller gets a SupersededException.
+    """
+
+    def __init__(self, name: str, workers: int = 1, max_pending: int = 64):
+        self._name = name
+        self._workers = workers
+        self._executor = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix=name)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._max_pending = max_pending
+        self._queued: Dict[Hashable, concurrent.futures.Future] = {}
+        self._queue_wait = Histogram()
+        self._created_at = time.perf_counter()
+        self._busy_time = 0.
+        self._running = 0
+        self._completed = 0
+        self._superseded = 0
+
+    async def run(self, func: Callable[..., T], *args, key: Optional[Hashable] = None) -> T:
+        """
+        :param key: Calls with the same key supersede each other while queued
+        :raise SupersededException: A newer call with the same key was submitted before this one started
+        """
+        loop = asyncio.get_running_loop()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_pending)
+
+        async with self._slots:
+            if key is not None and key in self._queued and self._queued.pop(key).cancel():
+                self._superseded += 1
+
+            submitted_at = time.perf_counter()
+
+            def call():
+                started_at = time.perf_counter()
+                loop.call_soon_threadsafe(self._on_started, started_at - submitted_at)
+                try:
+                    return func(*args)
+                finally:
+                    loop.call_soon_threadsafe(self._on_finished, time.perf_counter() - started_at)
+
+            future = self._executor.submit(call)
+            if key is not None:
+                self._queued[key] = future
+            try:
+                return await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                # A superseded call is no longer the queued one of its key, otherwise the caller was cancelled
+                if key is not None and future.cancelled() and self._queued.get(key) is not future:
+                    raise SupersededException(f'{func} superseded in {self._name}') from None
+                raise
+            finally:
+                if key is not None and self._queued.get(key) is future:
+                    del self._queued[key]
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        logging.info(f'Executor {self}')
+
+    def _on_started(self, queue_wait: float) -> None:
+        self._queue_wait.record(queue_wait)
+        self._running += 1
+
+    def _on_finished(self, duration: float) -> None:
+        self._busy_time += duration
+        self._running -= 1
+        self._completed += 1
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def queue_wait(self) -> Histogram:
+        """
+        :return: Delay between submitting a call and a worker starting it
+        """
+        return self._queue_wait
+
+    @property
+    def utilisation(self) -> float:
+        """
+        :return: Share of the worker time spent running calls since the pool was created, between 0 and 1
+        """
+        return self._busy_time / ((time.perf_counter() - self._created_at) * self._workers)
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def completed(self) -> int:
+        return self._completed
+
+    @property
+    def superseded(self) -> int:
+        return self._superseded
+
+    def __str__(self):
+        return f'{self._name} (workers={self._workers}, queue wait: {self._queue_wait}, ' \
+               f'utilisation={self.utilisation:.1%}, completed={self._completed}, superseded={self._superseded})'
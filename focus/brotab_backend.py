@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import re
+import string
+import subprocess
+from abc import ABCMeta, abstractmethod
+from typing import Dict, List, Optional, Sequence
+
+from executors.executor_pool import ExecutorPool, SupersededException
+from startup.lazy_import import lazy_import
+
+# Only loaded when a browser tab is focused
+aiohttp = lazy_import('aiohttp')
+
+
+class BrotabBackend(metaclass=ABCMeta):
+    @abstractmethod
+    async def list_browsers(self) -> Optional[Dict[str, str]]:
+        """
+        :return: Browser names by client prefix, None on failure
+        """
+        pass
+
+    @abstractmethod
+    async def list_tabs(self, browser_id: str) -> Optional[Dict[str, str]]:
+        """
+        :return: Tab titles by tab id (prefix.window.tab), None on failure
+        """
+        pass
+
+    @abstractmethod
+    async def activate_tab(self, tab_id: str) -> bool:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class SubprocessBrotabBackend(BrotabBackend):
+    """
+    Runs the bt command line for every request, in the subprocess pool. A tab activation still queued is superseded by
+    a newer one.
+    """
+
+    ACTIVATE = 'activate_tab'
+
+    def __init__(self, executor: ExecutorPool):
+        self._executor = executor
+
+    async def list_browsers(self) -> Optional[Dict[str, str]]:
+        return await self._list_bt_objects(["bt", "clients"], re.compile('^([^.]+)\\..*\\s+(\\S+)$'))
+
+    async def list_tabs(self, browser_id: str) -> Optional[Dict[str, str]]:
+        return await self._list_bt_objects(["bt", "list"], re.compile(f'(^{browser_id}\\.[^\t]+)\t([^\t]+)'))
+
+    async def activate_tab(self, tab_id: str) -> bool:
+        try:
+            p = await self._executor.run(subprocess.run, ['bt', 'activate', tab_id],
+                                         key=SubprocessBrotabBackend.ACTIVATE)
+        except SupersededException:
+            logging.debug(f'Activation of {tab_id} superseded by a newer one')
+            return False
+
+        if p.returncode != 0:
+            logging.warning(f'Failed to activate {tab_id}')
+            return False
+
+        return True
+
+    async def _list_bt_objects(self, command: List[str], line_matcher: re.Pattern) -> Optional[Dict[str, str]]:
+        p = await self._executor.run(functools.partial(subprocess.run, command, text=True, capture_output=True))
+        if p.returncode != 0:
+            return None
+
+        objects = {}
+        for line in p.stdout.split('\n'):
+            matches = line_matcher.match(line)
+            if matches:
+                objects[matches.group(1)] = matches.group(2)
+
+        return objects
+
+
+class HttpBrotabBackend(BrotabBackend):
+    """
+    Talks to the brotab mediators over HTTP through a pooled session. Client prefixes are assigned by port, like bt
+    does.
+    """
+
+    DEFAULT_HOST = '127.0.0.1'
+    DEFAULT_PORTS = range(4625, 4635)
+
+    def __init__(self, host: str = DEFAULT_HOST, ports: Sequence[int] = DEFAULT_PORTS, timeout: float = 1.):
+        self._host = host
+        self._ports = ports
+        self._timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._mediator_ports: Dict[str, int] = {}
+
+    async def list_browsers(self) -> Optional[Dict[str, str]]:
+        results = await asyncio.gather(*[self._get(port, '/get_browser') for port in self._ports],
+                                       return_exceptions=True)
+
+        browsers = {}
+        self._mediator_ports = {}
+        for prefix, port, result in zip(string.ascii_lowercase, self._ports, results):
+            if isinstance(result, Exception):
+                continue
+            self._mediator_ports[prefix] = port
+            browsers[prefix] = result.strip()
+
+        return browsers
+
+    async def list_tabs(self, browser_id: str) -> Optional[Dict[str, str]]:
+        port = self._mediator_ports.get(browser_id)
+        if port is None:
+            return None
+
+        try:
+            result = await self._get(port, '/list_tabs')
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.warning(f'Failed to list tabs of {browser_id}: {e}')
+            return None
+
+        tabs = {}
+        for line in result.splitlines():
+            fields = line.split('\t')
+            if len(fields) >= 2:
+                tabs[f'{browser_id}.{fields[0]}'] = fields[1]
+
+        return tabs
+
+    async def activate_tab(self, tab_id: str) -> bool:
+        browser_id, _window_id, tab = tab_id.split('.')
+        port = self._mediator_ports.get(browser_id)
+
+        try:
+            if port is None:
+                raise aiohttp.ClientError(f'no mediator for {browser_id}')
+            await self._get(port, f'/activate_tab/{tab}')
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.warning(f'Failed to activate {tab_id}: {e}')
+            return False
+
+        return True
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get(self, port: int, path: str) -> str:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self._timeout),
+                                                  connector=aiohttp.TCPConnector(limit_per_host=2))
+
+        async with self._session.get(f'http://{self._host}:{port}{path}') as response:
+            response.raise_for_status()
+            return await response.text()
@@ -0,0 +1,68 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from focus.brotab_backend import BrotabBackend
+
+
+class BrotabTabIndex:
+    """
+    Browsers and their tabs, cached for a short time. Lookups on a stale index return it as is and refresh it in the
+    background.
+    """
+
+    def __init__(self, backend: BrotabBackend, ttl: float = 2.):
+        self._backend = backend
+        self._ttl = ttl
+        self._browsers: Optional[Dict[str, str]] = None
+        self._tabs: Dict[str, Dict[str, str]] = {}
+        self._refreshed_at = 0.
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def browsers(self) -> Dict[str, str]:
+        await self._ensure_fresh()
+        return self._browsers or {}
+
+    async def tabs(self, browser_id: str) -> Dict[str, str]:
+        await self._ensure_fresh()
+        return self._tabs.get(browser_id, {})
+
+    async def refresh(self) -> None:
+        """
+        Refresh now, sharing the refresh already running if any
+        """
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+
+        await asyncio.shield(self._refresh_task)
+
+    @property
+    def backend(self) -> BrotabBackend:
+        return self._backend
+
+    async def _ensure_fresh(self) -> None:
+        if self._browsers is None:
+            await self.refresh()
+        elif time.monotonic() - self._refreshed_at > self._ttl and \
+                (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._refresh())
+
+    async def _refresh(self) -> None:
+        try:
+            browsers = await self._backend.list_browsers()
+            if browsers is None:
+                logging.warning('Failed to list browsers')
+                return
+
+            tabs = await asyncio.gather(*[self._backend.list_tabs(browser_id) for browser_id in browsers])
+        except Exception:
+            logging.exception('Failed to refresh brotab index')
+            return
+
+        self._browsers = browsers
+        self._tabs = {browser_id: browser_tabs for browser_id, browser_tabs in zip(browsers, tabs)
+                      if browser_tabs is not None}
+        self._refreshed_at = time.monotonic()
+        logging.debug(f'Refreshed brotab index: {len(browsers)} browsers, '
+                      f'{sum(len(t) for t in self._tabs.values())} tabs')
@@ -0,0 +1,31 @@
+from abc import ABCMeta, abstractmethod
+from typing import Callable, List, Optional
+
+from wmctrl import Window
+
+
+class WindowEventSource(metaclass=ABCMeta):
+    @abstractmethod
+    def start(self, on_windows_changed: Callable[[], None], on_active_changed: Callable[[Optional[int]], None],
+              on_title_changed: Callable[[int, str], None]) -> None:
+        """
+        Start watching windows. Callbacks may be called from another thread.
+
+        :param on_title_changed: Called with the id and the new title of a window
+        """
+        pass
+
+    @abstractmethod
+    def list_windows(self) -> List[Window]:
+        pass
+
+    @abstractmethod
+    def active_window(self) -> Optional[int]:
+        """
+        :return: Id of the active window
+        """
+        pass
+
+    @abstractmethod
+    def activate(self, window: Window) -> None:
+        pass
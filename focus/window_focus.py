@@ -2,19 +2,30 @@ import asyncio
 import re
 from datetime import timedelta
 import logging
-import time
 from typing import Optional
 
 from wmctrl import Window
 
+from executors.executor_pool import ExecutorPool, SupersededException
 from focus.focuser import Focuser
+from focus.window_registry import WindowRegistry
 
 
 class WindowFocuser(Focuser):
+    """
+    Lists and activates windows in the window manager pool, the windows cached by the registry are read without it. An
+    activation still queued is superseded by the one of a newer focus, whichever the window.
+    """
+
+    ACTIVATE = 'activate_window'
+
     def __init__(self, window_class_pattern: re.Pattern, window_name_pattern: Optional[re.Pattern],
+                 window_registry: WindowRegistry, executor: ExecutorPool,
                  time_to_focus: timedelta = timedelta(seconds=5)):
         self._window_class_pattern = window_class_pattern
         self._window_name_pattern = window_name_pattern
+        self._window_registry = window_registry
+        self._executor = executor
         self._time_to_focus = time_to_focus
 
     async def focus(self) -> bool:
@@ -26,7 +37,10 @@ class WindowFocuser(Focuser):
             return (self._window_class_pattern is None or self._window_class_pattern.search(w.wm_class)) and \
                 (self._window_name_pattern is None or self._window_name_pattern.search(w.wm_name))
 
-        target_windows = list(filter(is_target_window, Window.list()))
+        windows = self._window_registry.cached_windows()
+        if windows is None:
+            windows = await self._executor.run(self._window_registry.windows)
+        target_windows = list(filter(is_target_window, windows))
 
         if len(target_windows) == 0:
             logging.warning(f'Could not find window with {search_description}')
@@ -37,16 +51,21 @@ class WindowFocuser(Focuser):
 
         target_window = target_windows[0]
 
-        target_window.activate()
-        timeout_start = time.time()
+        if self._window_registry.is_active(target_window):
+            return True
+
+        try:
+            await self._executor.run(self._window_registry.activate, target_window, key=WindowFocuser.ACTIVATE)
+        except SupersededException:
+            logging.debug(f'Activation of window with {search_description} superseded by a newer focus')
+            return False
 
-        while time.time() - timeout_start < self._time_to_focus.seconds:
-            if Window.get_active() == target_window:
-                await asyncio.sleep(0.1)
-                return True
+        if await self._window_registry.wait_until_active(target_window, self._time_to_focus, self._executor):
             await asyncio.sleep(0.1)
+            return True
 
-        logging.warning(f'Could not activate window with {search_description} within {timeout}s')
+        logging.warning(f'Could not activate window with {search_description} within '
+                        f'{self._time_to_focus.total_seconds()}s')
         return False
 
     def __str__(self):
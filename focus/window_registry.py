@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import threading
+from datetime import timedelta
+from typing import List, Optional
+
+import attr
+from wmctrl import Window
+
+from executors.executor_pool import ExecutorPool
+from focus.window_events import WindowEventSource
+
+
+class WindowRegistry:
+    """
+    Windows and active window shared by all the window focusers. With an event source they are kept in memory and
+    refreshed on change notifications, otherwise every lookup lists windows and activation is polled. Title changes
+    are applied to the cached windows without listing them again. Windows are listed and polled by the window manager
+    worker, notifications are handled on the event loop.
+    """
+
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, event_source: Optional[WindowEventSource] = None):
+        self._event_source = event_source
+        self._windows: Optional[List[Window]] = None
+        # Bumped when the windows change, so that a listing started before is not cached
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._active_id: Optional[int] = None
+        self._active_changed = asyncio.Event()
+        self._process_spawns = 0
+
+    def start(self) -> None:
+        if self._event_source is None:
+            logging.info('No window event source, window lookups will poll')
+            return
+
+        loop = asyncio.get_running_loop()
+        self._event_source.start(lambda: loop.call_soon_threadsafe(self.invalidate),
+                                 lambda window_id: loop.call_soon_threadsafe(self._set_active, window_id),
+                                 lambda window_id, title: loop.call_soon_threadsafe(self._set_title, window_id, title))
+        self._active_id = self._event_source.active_window()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._windows = None
+
+    def cached_windows(self) -> Optional[List[Window]]:
+        """
+        :return: The windows if known without listing them, None otherwise. Does not block.
+        """
+        with self._lock:
+            return self._windows
+
+    def windows(self) -> List[Window]:
+        if self._event_source is None:
+            self._process_spawns += 1
+            return Window.list()
+
+        with self._lock:
+            windows, generation = self._windows, self._generation
+        if windows is not None:
+            return windows
+
+        windows = self._event_source.list_windows()
+        with self._lock:
+            if generation == self._generation:
+                self._windows = windows
+
+        return windows
+
+    def is_active(self, window: Window) -> bool:
+        """
+        :return: False when the active window is unknown (no event source)
+        """
+        return self._active_id is not None and self._active_id == int(window.id, 16)
+
+    def activate(self, window: Window) -> None:
+        if self._event_source is None:
+            self._process_spawns += 1
+            window.activate()
+        else:
+            self._event_source.activate(window)
+
+    async def wait_until_active(self, window: Window, timeout: timedelta, executor: ExecutorPool) -> bool:
+        """
+        :param executor: Runs the polls when there is no event source
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout.total_seconds()
+
+        if self._event_source is None:
+            while loop.time() < deadline:
+                # xprop, then wmctrl to find the window by id
+                self._process_spawns += 2
+                if await executor.run(Window.get_active) == window:
+                    return True
+                await asyncio.sleep(WindowRegistry.POLL_INTERVAL)
+            return False
+
+        while not self.is_active(window):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._active_changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+
+        return True
+
+    @property
+    def process_spawns(self) -> int:
+        return self._process_spawns
+
+    def _set_title(self, window_id: int, title: str) -> None:
+        with self._lock:
+            if self._windows is None:
+                # A listing in progress may predate the new title
+                self._generation += 1
+                return
+
+            self._windows = [attr.evolve(window, wm_name=title) if int(window.id, 16) == window_id else window
+                             for window in self._windows]
+
+    def _set_active(self, window_id: Optional[int]) -> None:
+        self._active_id = window_id
+        # Wake up the current waiters, later ones wait for the next change
+        self._active_changed.set()
+        self._active_changed = asyncio.Event()
@@ -0,0 +1,138 @@
+import logging
+import threading
+from typing import Callable, List, Optional, Set
+
+from Xlib import X, Xatom, display as xdisplay, error as xerror
+from Xlib.protocol import event as xevent
+from wmctrl import Window
+
+from focus.window_events import WindowEventSource
+
+
+class X11WindowEvents(WindowEventSource):
+    """
+    Watches the root window and the client windows for property changes, lists windows from _NET_CLIENT_LIST and
+    activates them by sending _NET_ACTIVE_WINDOW requests, without spawning processes
+    """
+
+    def __init__(self, display_name: Optional[str] = None):
+        self._display_name = display_name
+        # Xlib displays are not thread safe: this one is only used by the single window manager worker, once started
+        self._display = xdisplay.Display(display_name)
+        self._root = self._display.screen().root
+        self._net_active_window = self._display.intern_atom('_NET_ACTIVE_WINDOW')
+        self._net_client_list = self._display.intern_atom('_NET_CLIENT_LIST')
+        self._net_wm_name = self._display.intern_atom('_NET_WM_NAME')
+        self._net_wm_pid = self._display.intern_atom('_NET_WM_PID')
+        self._net_wm_desktop = self._display.intern_atom('_NET_WM_DESKTOP')
+        self._utf8_string = self._display.intern_atom('UTF8_STRING')
+        self._watched_clients: Set[int] = set()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, on_windows_changed: Callable[[], None], on_active_changed: Callable[[Optional[int]], None],
+              on_title_changed: Callable[[int, str], None]) -> None:
+        self._thread = threading.Thread(target=self._listen,
+                                        args=(on_windows_changed, on_active_changed, on_title_changed),
+                                        name='x11-window-events', daemon=True)
+        self._thread.start()
+
+    def list_windows(self) -> List[Window]:
+        """
+        Same windows and fields as wmctrl -l -G -p -x
+        """
+        clients = self._root.get_full_property(self._net_client_list, X.AnyPropertyType)
+        windows = []
+        for client_id in clients.value if clients is not None else []:
+            try:
+                windows.append(self._describe(client_id))
+            except xerror.XError:
+                # Closed meanwhile, the client list notification follows
+                continue
+
+        return windows
+
+    def active_window(self) -> Optional[int]:
+        return self._get_active(self._root)
+
+    def activate(self, window: Window) -> None:
+        target = self._display.create_resource_object('window', int(window.id, 16))
+        # Source 2 tells the window manager that the request comes from a pager, like wmctrl does
+        request = xevent.ClientMessage(window=target, client_type=self._net_active_window,
+                                       data=(32, [2, X.CurrentTime, 0, 0, 0]))
+        self._root.send_event(request, event_mask=X.SubstructureRedirectMask | X.SubstructureNotifyMask)
+        self._display.flush()
+
+    def _listen(self, on_windows_changed: Callable[[], None], on_active_changed: Callable[[Optional[int]], None],
+                on_title_changed: Callable[[int, str], None]) -> None:
+        display = xdisplay.Display(self._display_name)
+        root = display.screen().root
+        root.change_attributes(event_mask=X.PropertyChangeMask)
+        self._watch_clients(display, root)
+
+        while True:
+            ev = display.next_event()
+            if ev.type != X.PropertyNotify:
+                continue
+
+            if ev.window.id == root.id:
+                if ev.atom == self._net_active_window:
+                    on_active_changed(self._get_active(root))
+                elif ev.atom == self._net_client_list:
+                    self._watch_clients(display, root)
+                    on_windows_changed()
+            elif ev.atom in (self._net_wm_name, Xatom.WM_NAME):
+                # Titles change all the time (browser tabs, players), the other fields stay valid
+                try:
+                    on_title_changed(ev.window.id, self._get_title(ev.window))
+                except xerror.XError:
+                    continue
+
+    def _watch_clients(self, display: xdisplay.Display, root) -> None:
+        """
+        Subscribe to property changes of new client windows, to be notified when their title changes
+        """
+        clients = root.get_full_property(self._net_client_list, X.AnyPropertyType)
+        client_ids = set(clients.value) if clients is not None else set()
+
+        for client_id in client_ids - self._watched_clients:
+            window = display.create_resource_object('window', client_id)
+            window.change_attributes(event_mask=X.PropertyChangeMask, onerror=xerror.CatchError(xerror.BadWindow))
+
+        self._watched_clients = client_ids
+        logging.debug(f'Watching {len(client_ids)} X11 windows')
+
+    def _describe(self, client_id: int) -> Window:
+        window = self._display.create_resource_object('window', client_id)
+        wm_class = window.get_wm_class()
+        geometry = window.get_geometry()
+        position = self._root.translate_coords(window, 0, 0)
+        desktop = self._get_cardinal(window, self._net_wm_desktop)
+
+        return Window(f'0x{client_id:08x}',
+                      # Sticky windows are on desktop 0xFFFFFFFF, shown as -1
+                      -1 if desktop in (None, 0xFFFFFFFF) else desktop,
+                      self._get_cardinal(window, self._net_wm_pid) or 0,
+                      position.x, position.y, geometry.width, geometry.height,
+                      '.'.join(wm_class) if wm_class is not None else 'N/A',
+                      window.get_wm_client_machine() or 'N/A',
+                      self._get_title(window))
+
+    def _get_title(self, window) -> str:
+        title = window.get_full_property(self._net_wm_name, self._utf8_string)
+        if title is not None:
+            value = title.value
+            return value.decode('utf-8', errors='replace') if isinstance(value, bytes) else value
+
+        return window.get_wm_name() or ''
+
+    @staticmethod
+    def _get_cardinal(window, atom: int) -> Optional[int]:
+        prop = window.get_full_property(atom, Xatom.CARDINAL)
+        return prop.value[0] if prop is not None and len(prop.value) > 0 else None
+
+    def _get_active(self, root) -> Optional[int]:
+        active = root.get_full_property(self._net_active_window, X.AnyPropertyType)
+        if active is None or len(active.value) == 0 or active.value[0] == 0:
+            return None
+
+        return active.value[0]
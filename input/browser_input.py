@@ -11,3 +11,6 @@ class BrowserInput:
 
     async def send(self):
         return await self._browser_tab_focus.focus() and await self._window_input.send()
+
+    def __str__(self):
+        return f'{self._window_input} in {self._browser_tab_focus}'
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import pathlib
+import time
+from typing import Iterable, List, Optional, Set, Tuple
+
+import uinput
+
+from executors.executor_pool import ExecutorPool
+
+
+class VirtualKeyboard:
+    """
+    Single uinput device shared by all the inputs, holding the union of their keys. Keys must be registered before
+    the device is created, starting again after registering new keys recreates it. The device is created, written to
+    and destroyed by the single uinput worker only.
+    """
+
+    INPUT_DEVICES = pathlib.Path('/proc/bus/input/devices')
+
+    def __init__(self, executor: ExecutorPool, name: str = 'midi-shortcuts-controller', ready_timeout: float = 1.):
+        self._executor = executor
+        self._name = name
+        self._ready_timeout = ready_timeout
+        self._keys: Set[Tuple[int, int]] = set()
+        self._device: Optional[uinput.Device] = None
+        self._outdated = False
+        self._creation_time: Optional[float] = None
+        self._ready_time: Optional[float] = None
+
+    def register(self, keys: Iterable[Tuple[int, int]]) -> None:
+        new_keys = set(keys) - self._keys
+        if not new_keys:
+            return
+
+        self._keys.update(new_keys)
+        if self._device is not None:
+            logging.warning(f'Virtual keyboard to be recreated for new keys {new_keys}')
+            self._outdated = True
+
+    async def start(self) -> None:
+        """
+        Create the device, or recreate it with the keys registered since
+        """
+        start = time.perf_counter()
+        self._outdated = False
+        await self._executor.run(self._create_device, sorted(self._keys))
+        self._creation_time = time.perf_counter() - start
+
+        # The device can only be used once the kernel registered it, otherwise the first keystrokes may be lost
+        while not self._is_registered():
+            if time.perf_counter() - start > self._ready_timeout:
+                logging.warning(f'Virtual keyboard not ready after {self._ready_timeout}s')
+                break
+            await asyncio.sleep(0.005)
+        self._ready_time = time.perf_counter() - start
+
+        logging.info(f'Created virtual keyboard with {len(self._keys)} keys in {self._creation_time * 1000:.1f}ms, '
+                     f'ready after {self._ready_time * 1000:.1f}ms')
+
+    def emit_combo(self, keys: List[Tuple[int, int]]) -> None:
+        """
+        Called by the uinput worker
+        """
+        if self._device is None:
+            logging.warning(f'Virtual keyboard not started, dropping {keys}')
+            return
+
+        self._device.emit_combo(keys, True)
+
+    @property
+    def started(self) -> bool:
+        """
+        :return: False until started, and again once new keys were registered
+        """
+        return self._device is not None and not self._outdated
+
+    @property
+    def creation_time(self) -> Optional[float]:
+        return self._creation_time
+
+    @property
+    def ready_time(self) -> Optional[float]:
+        """
+        :return: Time from the creation request until the device was registered by the kernel
+        """
+        return self._ready_time
+
+    def _create_device(self, keys: List[Tuple[int, int]]) -> None:
+        if self._device is not None:
+            self._device.destroy()
+            self._device = None
+        self._device = uinput.Device(keys, name=self._name)
+
+    def _is_registered(self) -> bool:
+        try:
+            return f'N: Name="{self._name}"' in VirtualKeyboard.INPUT_DEVICES.read_text()
+        except OSError:
+            return True
@@ -1,22 +1,35 @@
 from typing import List, Iterable
 
-import uinput
 import logging
 
+from executors.executor_pool import ExecutorPool
 from focus.focuser import Focuser
+from input.virtual_keyboard import VirtualKeyboard
 
 
 class WindowInput:
-    def __init__(self, focuser: Focuser, *inputs: List[int]):
+    """
+    Combos typed once the window is focused, written to the virtual keyboard by the uinput pool in one call
+    """
+
+    def __init__(self, focuser: Focuser, keyboard: VirtualKeyboard, executor: ExecutorPool, *inputs: List[int]):
         self._focuser = focuser
         self._inputs = inputs
-        self._keyboard = uinput.Device(WindowInput._unique_inputs(inputs))
+        self._keyboard = keyboard
+        self._executor = executor
+        self._keyboard.register(WindowInput._unique_inputs(inputs))
 
     async def send(self):
         if await self._focuser.focus():
-            for virtual_input in self._inputs:
-                self._keyboard.emit_combo(virtual_input, True)
-                logging.debug(f'Sent keyboard combo {virtual_input} after focusing on {self._focuser}')
+            await self._executor.run(self._emit_combos)
+            logging.debug(f'Sent keyboard combos {list(self._inputs)} after focusing on {self._focuser}')
+
+    def _emit_combos(self) -> None:
+        for virtual_input in self._inputs:
+            self._keyboard.emit_combo(virtual_input)
+
+    def __str__(self):
+        return f'{list(self._inputs)} on {self._focuser}'
 
     @classmethod
     def _unique_inputs(cls: 'WindowInput', virtual_inputs: Iterable[List[int]]):
@@ -0,0 +1,20 @@
+class Gauge:
+    """
+    Value that goes up and down, also used for counters which only go up
+    """
+
+    def __init__(self):
+        self._value = 0.
+
+    def inc(self, amount: float = 1.) -> None:
+        self._value += amount
+
+    def dec(self, amount: float = 1.) -> None:
+        self._value -= amount
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    @property
+    def value(self) -> float:
+        return self._value
@@ -0,0 +1,65 @@
+import bisect
+from typing import List, Sequence, Tuple
+
+
+class Histogram:
+    DEFAULT_BOUNDS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1., 2., 5.)
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BOUNDS):
+        """
+        :param bounds: Sorted upper bounds of the buckets (in seconds), an extra +inf bucket is always added
+        """
+        self._bounds = tuple(bounds)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._count = 0
+        self._sum = 0.
+        self._max = 0.
+
+    def record(self, value: float) -> None:
+        self._counts[bisect.bisect_left(self._bounds, value)] += 1
+        self._count += 1
+        self._sum += value
+        self._max = max(self._max, value)
+
+    def buckets(self) -> List[Tuple[float, int]]:
+        """
+        :return: Cumulative (upper bound, count) pairs, ending with the +inf bucket
+        """
+        result = []
+        cumulated = 0
+        for bound, count in zip(self._bounds + (float('inf'),), self._counts):
+            cumulated += count
+            result.append((bound, cumulated))
+
+        return result
+
+    def quantile(self, q: float) -> float:
+        """
+        :param q: Between 0 and 1
+        :return: Upper bound of the bucket holding the quantile (the max value for the +inf bucket)
+        """
+        if self._count == 0:
+            return 0.
+
+        rank = q * self._count
+        for bound, cumulated in self.buckets():
+            if cumulated >= rank:
+                return min(bound, self._max)
+
+        return self._max
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    @property
+    def max(self) -> float:
+        return self._max
+
+    def __str__(self):
+        return f'count={self._count}, p50<={self.quantile(.5) * 1000:.1f}ms, ' \
+               f'p99<={self.quantile(.99) * 1000:.1f}ms, max={self._max * 1000:.1f}ms'
@@ -0,0 +1,65 @@
+import asyncio
+import time
+from typing import Callable, Coroutine, Iterable, Optional
+
+from metrics.metrics_registry import MetricsRegistry
+
+
+def timed(registry: MetricsRegistry, callback: Callable[..., Coroutine], metric: str, description: str,
+          **labels: str) -> Callable[..., Coroutine]:
+    """
+    Wrap a coroutine function to record its duration, the calls in flight and the calls that raised
+    """
+    duration = registry.histogram(f'{metric}_duration_seconds', f'Duration of {description}', **labels)
+    in_flight = registry.gauge(f'{metric}_in_flight', f'{description.capitalize()} in flight', **labels)
+    errors = registry.counter(f'{metric}_errors_total', f'{description.capitalize()} that raised', **labels)
+
+    async def timed_callback(*args, **kwargs):
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            return await callback(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            duration.record(time.perf_counter() - start)
+            in_flight.dec()
+
+    return timed_callback
+
+
+class InstrumentedProxy:
+    """
+    Delegates to an object, timing calls to its coroutine methods. Only created when metrics are enabled, so that
+    uninstrumented objects are used directly otherwise.
+    """
+
+    def __init__(self, target, registry: MetricsRegistry, component: str, methods: Optional[Iterable[str]] = None,
+                 name: Optional[str] = None):
+        """
+        :param methods: Coroutine methods to time, all of them if None
+        :param name: Label telling instances of a component apart, str(target) by default
+        """
+        self._target = target
+        self._registry = registry
+        self._component = component
+        self._methods = set(methods) if methods is not None else None
+        self._name = name if name is not None else str(target)
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._target, name)
+        if not asyncio.iscoroutinefunction(attribute) or (self._methods is not None and name not in self._methods):
+            return attribute
+
+        wrapped = timed(self._registry, attribute, 'call', 'calls made by the bindings', component=self._component,
+                        target=self._name, method=name)
+        # Found by regular attribute lookup next time, without going through __getattr__
+        setattr(self, name, wrapped)
+        return wrapped
+
+    def __str__(self):
+        return str(self._target)
+
+    def __repr__(self):
+        return f'Instrumented({self._target!r})'
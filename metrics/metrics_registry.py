@@ -0,0 +1,93 @@
+from typing import Callable, Dict, List, Tuple, Union
+
+from metrics.gauge import Gauge
+from metrics.histogram import Histogram
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class MetricFamily:
+    def __init__(self, name: str, metric_type: str, description: str):
+        self.name = name
+        self.metric_type = metric_type
+        self.description = description
+        self.metrics: Dict[Labels, Union[Gauge, Histogram, Callable[[], float]]] = {}
+
+
+class MetricsRegistry:
+    """
+    Metrics by name and labels, rendered in the Prometheus text format
+    """
+
+    PREFIX = 'midi_shortcuts_'
+
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+
+    def counter(self, name: str, description: str, **labels: str) -> Gauge:
+        return self._get(name, 'counter', description, labels, Gauge)
+
+    def gauge(self, name: str, description: str, **labels: str) -> Gauge:
+        return self._get(name, 'gauge', description, labels, Gauge)
+
+    def histogram(self, name: str, description: str, **labels: str) -> Histogram:
+        return self._get(name, 'histogram', description, labels, Histogram)
+
+    def register(self, name: str, metric_type: str, description: str,
+                 metric: Union[Gauge, Histogram, Callable[[], float]], **labels: str) -> None:
+        """
+        Expose a metric maintained elsewhere, a callable is read when rendering
+        """
+        self._family(name, metric_type, description).metrics[MetricsRegistry._labels(labels)] = metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self._families.values():
+            name = MetricsRegistry.PREFIX + family.name
+            lines.append(f'# HELP {name} {family.description}')
+            lines.append(f'# TYPE {name} {family.metric_type}')
+
+            for labels, metric in family.metrics.items():
+                if isinstance(metric, Histogram):
+                    for bound, count in metric.buckets():
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f'{name}_bucket{MetricsRegistry._format(labels + (("le", le),))} {count}')
+                    lines.append(f'{name}_sum{MetricsRegistry._format(labels)} {metric.sum}')
+                    lines.append(f'{name}_count{MetricsRegistry._format(labels)} {metric.count}')
+                else:
+                    value = metric() if callable(metric) else metric.value
+                    lines.append(f'{name}{MetricsRegistry._format(labels)} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    def _get(self, name: str, metric_type: str, description: str, labels: Dict[str, str], factory):
+        family = self._family(name, metric_type, description)
+        key = MetricsRegistry._labels(labels)
+        if key not in family.metrics:
+            family.metrics[key] = factory()
+
+        return family.metrics[key]
+
+    def _family(self, name: str, metric_type: str, description: str) -> MetricFamily:
+        if name not in self._families:
+            self._families[name] = MetricFamily(name, metric_type, description)
+
+        family = self._families[name]
+        if family.metric_type != metric_type:
+            raise ValueError(f'{name} is a {family.metric_type}, not a {metric_type}')
+
+        return family
+
+    @staticmethod
+    def _labels(labels: Dict[str, str]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    @staticmethod
+    def _format(labels: Labels) -> str:
+        if not labels:
+            return ''
+
+        def escape(value: str) -> str:
+            return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels) + '}'
@@ -0,0 +1,53 @@
+import asyncio
+import logging
+import pathlib
+from typing import Optional
+
+from metrics.metrics_registry import MetricsRegistry
+
+
+class MetricsServer:
+    """
+    Minimal HTTP server answering every request with the metrics in the Prometheus text format, on a TCP port or on
+    a Unix socket (curl --unix-socket <path> http://localhost/metrics)
+    """
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self, registry: MetricsRegistry, host: str = '127.0.0.1', port: Optional[int] = None,
+                 socket_path: Optional[pathlib.Path] = None):
+        self._registry = registry
+        self._host = host
+        self._port = port
+        self._socket_path = socket_path
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        if self._socket_path is not None:
+            self._socket_path.unlink(missing_ok=True)
+            self._server = await asyncio.start_unix_server(self._serve, self._socket_path)
+            logging.info(f'Serving metrics on {self._socket_path}')
+        else:
+            self._server = await asyncio.start_server(self._serve, self._host, self._port)
+            logging.info(f'Serving metrics on http://{self._host}:{self._port}/metrics')
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            # Request line and headers, the request itself does not matter
+            while (await reader.readline()).strip():
+                pass
+
+            body = self._registry.render().encode()
+            writer.write(f'HTTP/1.1 200 OK\r\nContent-Type: {MetricsServer.CONTENT_TYPE}\r\n'
+                         f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,124 @@
+import asyncio
+import collections
+import logging
+import logging.handlers
+import pathlib
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Optional, Tuple
+
+from metrics.histogram import Histogram
+
+
+class StallWatchdog:
+    """
+    Measures the event loop lag with a heartbeat task, and catches the stalls longer than a threshold from a thread:
+    the stack of the loop thread is captured while it is blocked, and attributed to the running task. Binding workers
+    name their task after their binding, so blocking calls made by a binding are reported with it. Stalls are written
+    to a rotating report.
+    """
+
+    LAG_BOUNDS = (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1., 2., 5.)
+
+    def __init__(self, report_path: pathlib.Path, threshold: float = 0.05, interval: float = 0.005,
+                 max_bytes: int = 1 << 20, backup_count: int = 3):
+        """
+        :param threshold: Lag above which the loop is considered stalled, in seconds
+        :param interval: Period of the heartbeat, in seconds
+        """
+        self._threshold = threshold
+        self._interval = interval
+        self._lag = Histogram(StallWatchdog.LAG_BOUNDS)
+        self._stalls: Dict[str, Histogram] = collections.defaultdict(lambda: Histogram(StallWatchdog.LAG_BOUNDS))
+
+        self._report = logging.getLogger(f'{__name__}.{report_path}')
+        self._report.propagate = False
+        self._report.setLevel(logging.INFO)
+        self._handler = logging.handlers.RotatingFileHandler(report_path, maxBytes=max_bytes,
+                                                             backupCount=backup_count, delay=True)
+        self._handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        # Expected end of the current heartbeat, and its number, written by the loop and read by the thread
+        self._beat: Tuple[int, float] = (0, float('inf'))
+        # Beat number, task name and stack of the latest stall, written by the thread and read by the loop
+        self._capture: Optional[Tuple[int, str, str]] = None
+        self._stop = threading.Event()
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._report.addHandler(self._handler)
+        thread = threading.Thread(target=self._watch, name='stall-watchdog', daemon=True)
+        thread.start()
+
+        try:
+            beat = 0
+            while True:
+                beat += 1
+                due = time.perf_counter() + self._interval
+                self._beat = (beat, due)
+                await asyncio.sleep(self._interval)
+
+                lag = max(time.perf_counter() - due, 0.)
+                self._lag.record(lag)
+                if lag >= self._threshold:
+                    self._record_stall(beat, lag)
+        finally:
+            self._stop.set()
+            thread.join()
+            self._beat = (0, float('inf'))
+            self._report.info(f'Summary: {self}')
+            self._report.removeHandler(self._handler)
+            self._handler.close()
+            logging.info(f'Event loop lag: {self._lag}, stalls: {self.stalls}')
+
+    def _watch(self) -> None:
+        """
+        Runs in its own thread, so that the stack is captured while the loop is still blocked
+        """
+        captured = 0
+        period = min(self._interval, self._threshold / 4)
+        while not self._stop.wait(period):
+            beat, due = self._beat
+            if beat == captured or time.perf_counter() - due < self._threshold:
+                continue
+
+            captured = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame is not None else ''
+            self._capture = (beat, StallWatchdog._describe(asyncio.current_task(self._loop)), stack)
+
+    def _record_stall(self, beat: int, lag: float) -> None:
+        capture = self._capture
+        if capture is not None and capture[0] == beat:
+            _, culprit, stack = capture
+        else:
+            # Ended before the thread saw it
+            culprit, stack = 'unknown', ''
+
+        self._stalls[culprit].record(lag)
+        self._report.info(f'Stall of {lag * 1000:.1f}ms in {culprit}\n{stack}')
+
+    @staticmethod
+    def _describe(task: Optional[asyncio.Task]) -> str:
+        return task.get_name() if task is not None else 'a loop callback'
+
+    @property
+    def lag(self) -> Histogram:
+        """
+        :return: Delay between the expected and the actual end of the heartbeats
+        """
+        return self._lag
+
+    @property
+    def stalls(self) -> int:
+        return sum(stalls.count for stalls in self._stalls.values())
+
+    def __str__(self):
+        culprits = sorted(self._stalls.items(), key=lambda item: item[1].sum, reverse=True)
+        return f'lag: {self._lag}, stalls by culprit: ' + \
+            (', '.join(f'{culprit} ({stalls})' for culprit, stalls in culprits) or 'none')
@@ -0,0 +1,164 @@
+import asyncio
+import collections
+import logging
+from enum import Enum
+from typing import Callable, Coroutine, Deque, Optional, Tuple
+
+import mido
+
+
+class OverflowPolicy(Enum):
+    DROP_OLDEST = 'drop_oldest'
+    DROP_NEWEST = 'drop_newest'
+    BLOCK = 'block'
+
+
+class BindingWorker:
+    """
+    Runs a binding in its own task, named after the binding, handling its messages in order through a bounded queue.
+    Submitting never waits, so that a slow binding does not hold up the others: with the block policy, messages that
+    do not fit in the queue wait in a backlog of this binding, moved to the queue by its own task as room frees up.
+    """
+
+    def __init__(self, callback: Callable[[mido.Message], Coroutine], description: str, max_queue_size: int = 16,
+                 overflow_policy: OverflowPolicy = OverflowPolicy.DROP_NEWEST):
+        self._callback = callback
+        self._description = description
+        self._overflow_policy = overflow_policy
+        self._queue: asyncio.Queue[Tuple[mido.Message, asyncio.Future]] = asyncio.Queue(max_queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self._backlog: Deque[Tuple[mido.Message, asyncio.Future]] = collections.deque()
+        self._feeder: Optional[asyncio.Task] = None
+        self._handled = 0
+        self._dropped = 0
+        self._max_depth = 0
+        self._busy = False
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f'binding {self._description}')
+
+    def stop(self) -> None:
+        """
+        The messages not handled yet are resolved to False
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._feeder is not None:
+            self._feeder.cancel()
+            self._feeder = None
+
+        # Resolved for the callers waiting on them, the message being handled is resolved by its cancelled task
+        pending = list(self._backlog)
+        self._backlog.clear()
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+            self._queue.task_done()
+        if pending:
+            logging.debug(f'Stopping {self}, discarding {len(pending)} messages')
+        for _, done in pending:
+            if not done.done():
+                done.set_result(False)
+
+    async def drain_and_stop(self) -> None:
+        if self._feeder is not None:
+            await asyncio.shield(self._feeder)
+        await self._queue.join()
+        self.stop()
+
+    def submit(self, msg: mido.Message) -> asyncio.Future:
+        """
+        :return: Future resolved to True once the binding handled the message, False if it was dropped or failed
+        """
+        done = asyncio.get_running_loop().create_future()
+
+        if self._backlog or self._queue.full():
+            if self._overflow_policy == OverflowPolicy.DROP_NEWEST:
+                self._drop(msg, done)
+                return done
+
+            if self._overflow_policy == OverflowPolicy.DROP_OLDEST:
+                self._drop(*self._queue.get_nowait())
+                self._queue.task_done()
+
+            if self._overflow_policy == OverflowPolicy.BLOCK:
+                self._backlog.append((msg, done))
+                if self._feeder is None:
+                    self._feeder = asyncio.create_task(self._feed(), name=f'backlog {self._description}')
+                self._max_depth = max(self._max_depth, self.depth)
+                return done
+
+        self._queue.put_nowait((msg, done))
+        self._max_depth = max(self._max_depth, self._queue.qsize())
+
+        return done
+
+    def _drop(self, msg: mido.Message, done: asyncio.Future) -> None:
+        logging.debug(f'Queue of {self} is full, dropping {msg}')
+        self._dropped += 1
+        if not done.done():
+            done.set_result(False)
+
+    async def _feed(self) -> None:
+        try:
+            while self._backlog:
+                await self._queue.put(self._backlog[0])
+                self._backlog.popleft()
+        finally:
+            if self._feeder is asyncio.current_task():
+                self._feeder = None
+
+    async def _run(self) -> None:
+        while True:
+            msg, done = await self._queue.get()
+            result = False
+            self._busy = True
+            try:
+                await self._callback(msg)
+                result = True
+            except Exception:
+                logging.exception(f'Binding {self} failed to handle {msg}')
+            finally:
+                self._busy = False
+                self._handled += 1
+                self._queue.task_done()
+                if not done.done():
+                    done.set_result(result)
+
+    @property
+    def description(self) -> str:
+        return self._description
+
+    @property
+    def depth(self) -> int:
+        """
+        :return: Messages waiting for the binding, in its queue or backlog
+        """
+        return self._queue.qsize() + len(self._backlog)
+
+    @property
+    def busy(self) -> bool:
+        """
+        :return: True while the callback is handling a message
+        """
+        return self._busy
+
+    @property
+    def max_depth(self) -> int:
+        return self._max_depth
+
+    @property
+    def handled(self) -> int:
+        return self._handled
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+    def __str__(self):
+        return f'{self._description} (depth={self.depth}, max depth={self._max_depth}, handled={self._handled}, ' \
+               f'dropped={self._dropped})'
+
+    def __repr__(self):
+        return f'BindingWorker({self._description})'
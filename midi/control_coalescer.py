@@ -0,0 +1,70 @@
+import asyncio
+import collections
+import logging
+from typing import Callable, Coroutine, Counter, Dict, Tuple
+
+import mido
+
+
+class ControlCoalescer:
+    """
+    Latest-value-wins stage for control changes: while a message for a (device, channel, control) is being
+    dispatched, later messages for the same control replace each other and only the newest one is dispatched afterwards
+    """
+
+    def __init__(self, dispatch: Callable[[mido.Message, int], Coroutine]):
+        self._dispatch = dispatch
+        self._in_flight: Dict[Tuple[int, int, int], asyncio.Task] = {}
+        self._pending: Dict[Tuple[int, int, int], mido.Message] = {}
+        self._dropped: Counter[int] = collections.Counter()
+        self._applied = 0
+
+    def submit(self, msg: mido.Message, device: int = 0) -> None:
+        key = (device, msg.channel, msg.control)
+
+        if key in self._in_flight:
+            if key in self._pending:
+                self._dropped[device] += 1
+            self._pending[key] = msg
+            return
+
+        self._in_flight[key] = asyncio.create_task(self._run(key, msg))
+
+    async def _run(self, key: Tuple[int, int, int], msg: mido.Message) -> None:
+        try:
+            while msg is not None:
+                self._applied += 1
+                try:
+                    await self._dispatch(msg, key[0])
+                except Exception:
+                    logging.exception(f'Failed to dispatch {msg}')
+                msg = self._pending.pop(key, None)
+        finally:
+            del self._in_flight[key]
+
+    @property
+    def in_flight(self) -> int:
+        """
+        :return: Number of controls whose messages are being dispatched
+        """
+        return len(self._in_flight)
+
+    @property
+    def dropped(self) -> int:
+        """
+        :return: Number of messages replaced by a newer value before being dispatched
+        """
+        return sum(self._dropped.values())
+
+    def dropped_from(self, device: int) -> int:
+        return self._dropped[device]
+
+    @property
+    def applied(self) -> int:
+        """
+        :return: Number of messages dispatched
+        """
+        return self._applied
+
+    def __str__(self):
+        return f'applied={self._applied}, dropped={self.dropped}'
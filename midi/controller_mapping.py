@@ -15,7 +15,7 @@ class ControllerMapping:
         self._programs[program_id - 1] = program
 
     def get(self, program_id: int) -> Program:
-        if program_id < 1 or program_id >= len(self._programs) or self._programs[program_id - 1] is None:
+        if program_id < 1 or program_id > len(self._programs) or self._programs[program_id - 1] is None:
             raise ProgramMappingException(f'Could not find program {program_id} (programs start at 1)')
 
         return self._programs[program_id - 1]
@@ -0,0 +1,88 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import mido
+
+from midi.binding_worker import BindingWorker
+
+
+class DispatchTable:
+    """
+    Bindings in a flat array indexed by (device, message type, channel, note or control number)
+    """
+
+    MESSAGE_TYPES = ('note_on', 'note_off', 'control_change')
+    NB_CHANNELS = 16
+    NB_NUMBERS = 128
+    DEVICE_SIZE = len(MESSAGE_TYPES) * NB_CHANNELS * NB_NUMBERS
+
+    def __init__(self, slots: List[Tuple[BindingWorker, ...]]):
+        self._slots = slots
+
+    @classmethod
+    def empty(cls) -> 'DispatchTable':
+        return DispatchTableBuilder().build()
+
+    def lookup(self, msg: mido.Message, device: int = 0) -> Tuple[BindingWorker, ...]:
+        if device >= self.nb_devices:
+            return ()
+
+        if msg.type == 'control_change':
+            return self._slots[DispatchTable.slot(2, msg.channel, msg.control, device)]
+        if msg.type == 'note_on':
+            return self._slots[DispatchTable.slot(0, msg.channel, msg.note, device)]
+        if msg.type == 'note_off':
+            return self._slots[DispatchTable.slot(1, msg.channel, msg.note, device)]
+
+        return ()
+
+    def workers(self, device: Optional[int] = None) -> Iterable[BindingWorker]:
+        """
+        :param device: None for the workers of all the devices
+        """
+        slots = self._slots if device is None \
+            else self._slots[device * DispatchTable.DEVICE_SIZE:(device + 1) * DispatchTable.DEVICE_SIZE]
+        seen = set()
+        for workers in slots:
+            for worker in workers:
+                if id(worker) not in seen:
+                    seen.add(id(worker))
+                    yield worker
+
+    @property
+    def nb_devices(self) -> int:
+        return len(self._slots) // DispatchTable.DEVICE_SIZE
+
+    @staticmethod
+    def slot(type_index: int, channel: int, number: int, device: int = 0) -> int:
+        return ((device * len(DispatchTable.MESSAGE_TYPES) + type_index) * DispatchTable.NB_CHANNELS + channel) \
+            * DispatchTable.NB_NUMBERS + number
+
+
+class DispatchTableBuilder:
+    def __init__(self):
+        self._bindings: Dict[int, List[BindingWorker]] = {}
+
+    def bind(self, message_type: str, number: int, worker: BindingWorker, channel: Optional[int] = None,
+             device: int = 0) -> None:
+        """
+        :param channel: Zero-based, None to bind all channels
+        :param device: Index of the controller the messages come from
+        """
+        if message_type not in DispatchTable.MESSAGE_TYPES:
+            raise ValueError(f'Cannot bind {message_type} messages')
+        if not 0 <= number < DispatchTable.NB_NUMBERS:
+            raise ValueError(f'Invalid note or control number {number}')
+
+        type_index = DispatchTable.MESSAGE_TYPES.index(message_type)
+        channels = range(DispatchTable.NB_CHANNELS) if channel is None else [channel]
+        for c in channels:
+            self._bindings.setdefault(DispatchTable.slot(type_index, c, number, device), []).append(worker)
+
+    def build(self) -> DispatchTable:
+        nb_devices = max(self._bindings, default=0) // DispatchTable.DEVICE_SIZE + 1
+        size = nb_devices * DispatchTable.DEVICE_SIZE
+        slots: List[Tuple[BindingWorker, ...]] = [()] * size
+        for slot, workers in self._bindings.items():
+            slots[slot] = tuple(workers)
+
+        return DispatchTable(slots)
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Iterator, Optional, Set, Tuple
+
+import mido
+
+from midi.midi_controller import MidiController
+
+FeedbackSources = Dict[Tuple[int, int], Callable[[], bool]]
+
+
+class FeedbackEngine:
+    """
+    Lights the pads of the controller from the state of what they act on. Sources, keyed by (channel, note), are
+    polled every tick and only the pads whose state differs from what was last sent are written to the output port,
+    within a messages per second budget. Changes over the budget are sent on the next ticks, with their latest state.
+    """
+
+    def __init__(self, controller: MidiController, messages_per_second: float = 100., tick: float = 0.02,
+                 on_velocity: int = 127):
+        self._controller = controller
+        self._messages_per_second = messages_per_second
+        self._tick = tick
+        self._on_velocity = on_velocity
+        self._sources: FeedbackSources = {}
+        self._released: Set[Tuple[int, int]] = set()
+        self._sent: Dict[Tuple[int, int], bool] = {}
+        self._output_name: Optional[str] = None
+        self._allowance = 0.
+        self._last_tick: Optional[float] = None
+        self._messages_sent = 0
+        self._deferred = 0
+
+    def load(self, sources: FeedbackSources) -> None:
+        """
+        Replace the sources, pads which no longer have one are switched off
+        """
+        self._sources = sources
+        self._released = (self._released | self._sent.keys()) - sources.keys()
+
+    async def run(self) -> None:
+        try:
+            while True:
+                await asyncio.sleep(self._tick)
+                self.tick()
+        finally:
+            logging.info(f'Pad feedback: {self}')
+
+    def tick(self) -> None:
+        if self._controller.output_name != self._output_name:
+            # New port, the device state is unknown
+            self._output_name = self._controller.output_name
+            self._sent.clear()
+
+        if self._output_name is None:
+            return
+
+        now = time.perf_counter()
+        elapsed = now - self._last_tick if self._last_tick is not None else self._tick
+        self._last_tick = now
+        # Unused budget does not pile up beyond one tick, so that a burst stays within the rate
+        self._allowance = min(self._allowance + elapsed * self._messages_per_second,
+                              max(self._tick * self._messages_per_second, 1.))
+
+        for key, lit in self._desired_states():
+            if self._sent.get(key) == lit:
+                continue
+
+            if self._allowance < 1.:
+                self._deferred += 1
+                continue
+
+            channel, note = key
+            msg = mido.Message('note_on', channel=channel, note=note, velocity=self._on_velocity) if lit \
+                else mido.Message('note_off', channel=channel, note=note)
+            if not self._controller.send(msg):
+                return
+
+            self._allowance -= 1.
+            self._messages_sent += 1
+            self._sent[key] = lit
+
+        # Switched off pads released by a reload are no longer tracked
+        for key in [key for key in self._released if self._sent.get(key) is not True]:
+            self._released.discard(key)
+            self._sent.pop(key, None)
+
+    def _desired_states(self) -> Iterator[Tuple[Tuple[int, int], bool]]:
+        for key, source in self._sources.items():
+            try:
+                yield key, bool(source())
+            except Exception:
+                logging.exception(f'Feedback source of {key} failed')
+
+        for key in self._released:
+            yield key, False
+
+    @property
+    def messages_sent(self) -> int:
+        return self._messages_sent
+
+    @property
+    def deferred(self) -> int:
+        """
+        :return: Pad changes postponed to a later tick by the budget
+        """
+        return self._deferred
+
+    def __str__(self):
+        return f'sent={self._messages_sent}, deferred={self._deferred}'
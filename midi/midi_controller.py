@@ -1,58 +1,144 @@
-import asyncio
 import logging
 import re
-from collections import defaultdict
-from typing import Optional, List, Callable, Coroutine
+import time
+from typing import Callable, List, Optional
 
 import mido
 
+# Hands a message, with the index of the controller and its reception time, to the dispatch
+MessageSink = Callable[[int, mido.Message, float], None]
+
 
 class MidiController:
+    """
+    Input and output ports of one MIDI device, found by name. Received messages are handed to a sink shared by all
+    the controllers, tagged with the index of the controller.
+    """
+
     CONTROL_CHANGE = 'control_change'
     NOTE_ON = 'note_on'
     NOTE_OFF = 'note_on'
 
-    def __init__(self, name_regex: re.Pattern):
-        self._controls_bindings = defaultdict(list)
+    def __init__(self, name_regex: re.Pattern, sink: MessageSink, name: str = 'default', index: int = 0):
         self._outport = None
         self._inport = None
+        self._inport_name: Optional[str] = None
+        self._outport_name: Optional[str] = None
+        self._input_generation = 0
+        self._stale_messages = 0
+        self._received = 0
         self._midi_in = None
         self._name_regex = name_regex
-        self._note_on_bindings = defaultdict(list)
+        self._sink = sink
+        self._name = name
+        self._index = index
 
     def connect(self) -> None:
-        inport_name = self._find(mido.get_input_names())
-        outport_name = self._find(mido.get_output_names())
-
-        if self._inport is not None:
-            self._inport.close()
-            self._inport = None
-
-        if self._outport is not None:
-            self._outport.close()
-            self._outport = None
-
-        if inport_name:
-            self._inport = mido.open_input(inport_name)
+        self._reconnect(force=True)
 
-        if outport_name:
-            self._outport = mido.open_output(outport_name)
+    def reconnect(self) -> bool:
+        """
+        Reopens only the ports whose name changed since they were opened, ALSA names include the client and port
+        numbers so a replugged device gets a new one.
 
-        logging.debug(f'Connecting MIDI controller: in = {self._inport}, out = {self._outport}')
+        :return: True if a port was closed or opened
+        """
+        return self._reconnect(force=False)
 
-    def bind_note_on(self, note: int, callback: Callable[[mido.Message], Coroutine]):
-        self._note_on_bindings[note].append(callback)
-
-    def bind_control_change(self, control: int, callback: Callable[[mido.Message], Coroutine]):
-        self._controls_bindings[control].append(callback)
-
-    async def receive(self):
-        while True:
-            # FIXME: Discard messages when read
-            if self._inport:
-                for msg in self._inport.iter_pending():
-                    await self._dispatch(msg)
-                await asyncio.sleep(0.1)
+    def _reconnect(self, force: bool) -> bool:
+        inport_name = self._find(mido.get_input_names())
+        outport_name = self._find(mido.get_output_names())
+        changed = False
+
+        if force or inport_name != self._inport_name:
+            if self._inport is not None:
+                self._inport.close()
+                self._inport = None
+
+            if inport_name:
+                self._inport = self._open_input(inport_name)
+            self._inport_name = inport_name
+            changed = True
+
+        if force or outport_name != self._outport_name:
+            if self._outport is not None:
+                self._outport.close()
+                self._outport = None
+
+            if outport_name:
+                self._outport = mido.open_output(outport_name)
+            self._outport_name = outport_name
+            changed = True
+
+        if changed:
+            logging.debug(f'Connecting MIDI controller {self._name}: in = {self._inport}, out = {self._outport}')
+
+        return changed
+
+    def _open_input(self, name: str):
+        self._input_generation += 1
+        generation = self._input_generation
+        return mido.open_input(name, callback=lambda msg: self._on_message(msg, generation))
+
+    def send(self, msg: mido.Message) -> bool:
+        """
+        :return: False when no output port is open
+        """
+        if self._outport is None:
+            return False
+
+        self._outport.send(msg)
+        return True
+
+    def feed(self, msg: mido.Message) -> None:
+        """
+        Hand a message to the sink as if the input port received it, may be called from any thread
+        """
+        self._on_message(msg)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    @property
+    def name_regex(self) -> re.Pattern:
+        return self._name_regex
+
+    @property
+    def output_name(self) -> Optional[str]:
+        return self._outport_name if self._outport is not None else None
+
+    @property
+    def connected(self) -> bool:
+        return self._inport is not None
+
+    @property
+    def stale_messages(self) -> int:
+        """
+        :return: Messages dropped because they were delivered by an input port that had already been replaced
+        """
+        return self._stale_messages
+
+    @property
+    def received(self) -> int:
+        return self._received
+
+    def _on_message(self, msg: mido.Message, generation: Optional[int] = None) -> None:
+        """
+        Called from the MIDI backend thread
+        """
+        received_at = time.perf_counter()
+
+        if generation is not None and generation != self._input_generation:
+            self._stale_messages += 1
+            return
+
+        self._received += 1
+        self._sink(self._index, msg, received_at)
 
     def _find(self, available: List[str]) -> Optional[str]:
         matching = [dev_name for dev_name in set(available) if self._name_regex.search(dev_name)]
@@ -67,15 +153,3 @@ class MidiController:
                             f'picking first')
 
         return matching[0]
-
-    async def _dispatch(self, msg: mido.Message):
-        bindings = []
-
-        if msg.type == MidiController.NOTE_ON:
-            bindings = self._note_on_bindings[msg.note]
-        elif msg.is_cc():
-            bindings = self._controls_bindings[msg.control]
-
-        logging.debug(f'Received MIDI message {msg}, found {len(bindings)} bindings')
-        for binding in bindings:
-            await binding(msg)
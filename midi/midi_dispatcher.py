@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from typing import Iterable, Optional, Tuple
+
+import mido
+
+from midi.binding_worker import BindingWorker
+from midi.control_coalescer import ControlCoalescer
+from midi.dispatch_table import DispatchTable
+
+
+class MidiDispatcher:
+    def __init__(self):
+        self._table = DispatchTable.empty()
+        self._coalescer = ControlCoalescer(self._dispatch_and_wait)
+        self._started = False
+
+    def load(self, table: DispatchTable) -> None:
+        """
+        Swap the dispatch table. Workers of the previous table finish their queued messages, then stop.
+        """
+        previous, self._table = self._table, table
+
+        if self._started:
+            current_workers = set(table.workers())
+            for worker in current_workers:
+                worker.start()
+            for worker in previous.workers():
+                if worker not in current_workers:
+                    asyncio.create_task(worker.drain_and_stop())
+
+    def start(self) -> None:
+        self._started = True
+        for worker in self.workers():
+            worker.start()
+
+    def stop(self) -> None:
+        self._started = False
+        for worker in self.workers():
+            worker.stop()
+
+    async def dispatch(self, msg: mido.Message, device: int = 0) -> None:
+        """
+        :param device: Index of the controller which received the message
+        """
+        if msg.is_cc():
+            self._coalescer.submit(msg, device)
+        else:
+            for worker in self._get_bindings(msg, device):
+                worker.submit(msg)
+
+    def workers(self, device: Optional[int] = None) -> Iterable[BindingWorker]:
+        """
+        :param device: None for the workers of all the devices
+        """
+        return self._table.workers(device)
+
+    def dropped(self, device: int) -> int:
+        """
+        :return: Messages of a device replaced by a newer value or dropped by a full binding queue
+        """
+        return self._coalescer.dropped_from(device) + sum(worker.dropped for worker in self.workers(device))
+
+    @property
+    def coalescer(self) -> ControlCoalescer:
+        return self._coalescer
+
+    def _get_bindings(self, msg: mido.Message, device: int) -> Tuple[BindingWorker, ...]:
+        bindings = self._table.lookup(msg, device)
+        logging.debug(f'Received MIDI message {msg} from device {device}, found {len(bindings)} bindings')
+        return bindings
+
+    async def _dispatch_and_wait(self, msg: mido.Message, device: int) -> None:
+        """
+        Hand the message to every binding and wait until they all handled it, so that the coalescer knows when the
+        control is free again
+        """
+        await asyncio.gather(*[worker.submit(msg) for worker in self._get_bindings(msg, device)])
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from metrics.histogram import Histogram
+from midi.midi_controller import MidiController
+from startup.lazy_import import lazy_import
+
+pyudev = lazy_import('pyudev')
+
+
+class MidiHotplug:
+    """
+    Reconnects the controller when its ALSA sound card appears or disappears. udev events are received on the
+    observer thread, filtered on the controller identity there, and debounced on the event loop so a burst of events
+    for one plug results in a single reconnect.
+    """
+
+    def __init__(self, controller: MidiController, debounce: float = 0.25):
+        self._controller = controller
+        self._debounce = debounce
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._observer: Optional[pyudev.MonitorObserver] = None
+        self._pending: Optional[asyncio.TimerHandle] = None
+        self._burst_started_at: Optional[float] = None
+        self._outage_started_at: Optional[float] = None
+        self._outage_stale_messages = 0
+        self._reconnect_latency = Histogram()
+        self._ignored = 0
+        self._debounced = 0
+        self._reconnects = 0
+        self._outages = 0
+        self._messages_lost = 0
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+
+        context = pyudev.Context()
+        monitor = pyudev.Monitor.from_netlink(context)
+        monitor.filter_by(subsystem='sound')
+
+        self._observer = pyudev.MonitorObserver(monitor, self._on_device_event)
+        self._observer.start()
+
+    def stop(self) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+
+        logging.info(f'MIDI hotplug of {self._controller.name}: {self}')
+
+    @property
+    def reconnect_latency(self) -> Histogram:
+        """
+        :return: Delay between the first udev event of a burst and the controller ports being reopened
+        """
+        return self._reconnect_latency
+
+    @property
+    def messages_lost(self) -> int:
+        return self._messages_lost
+
+    def _on_device_event(self, action: str, device: pyudev.Device) -> None:
+        """
+        Called from the udev observer thread
+        """
+        received_at = time.perf_counter()
+
+        if action not in ('add', 'remove', 'change') or not self._is_controller(device):
+            self._ignored += 1
+            return
+
+        self._loop.call_soon_threadsafe(self._schedule, received_at)
+
+    def _is_controller(self, device: pyudev.Device) -> bool:
+        """
+        Matches the controller name against the card identity udev knows about. Events without any identity (some
+        removals) are kept, the reconnect only reopens ports whose name actually changed.
+        """
+        identities = [device.get(key) for key in ('ID_MODEL', 'ID_MODEL_FROM_DATABASE', 'ID_SERIAL')]
+        card = device if device.sys_name.startswith('card') else device.find_parent('sound')
+        if card is not None and card.sys_name.startswith('card'):
+            try:
+                identities.append(card.attributes.asstring('id'))
+            except (KeyError, UnicodeDecodeError):
+                pass
+
+        identities = [identity.replace('_', ' ') for identity in identities if identity]
+        if len(identities) == 0:
+            return True
+
+        name_regex = self._controller.name_regex
+        return any(name_regex.search(identity) for identity in identities)
+
+    def _schedule(self, received_at: float) -> None:
+        if self._pending is not None:
+            self._pending.cancel()
+            self._debounced += 1
+        else:
+            self._burst_started_at = received_at
+
+        self._pending = self._loop.call_later(self._debounce, self._reconnect)
+
+    def _reconnect(self) -> None:
+        self._pending = None
+        was_connected = self._controller.connected
+
+        try:
+            changed = self._controller.reconnect()
+        except Exception:
+            logging.exception(f'Failed to reconnect MIDI controller {self._controller.name}')
+            return
+
+        now = time.perf_counter()
+        if not changed:
+            logging.debug('MIDI controller ports unchanged, not reconnecting')
+            return
+
+        self._reconnects += 1
+        connected = self._controller.connected
+
+        if was_connected and not connected:
+            self._outage_started_at = now
+            self._outage_stale_messages = self._controller.stale_messages
+            logging.info(f'MIDI controller {self._controller.name} disconnected')
+            return
+
+        if not connected:
+            return
+
+        self._reconnect_latency.record(now - self._burst_started_at)
+        if self._outage_started_at is None:
+            # Replaced in one step, the outage is the time the old port was closed
+            self._outage_started_at = now
+            self._outage_stale_messages = self._controller.stale_messages
+
+        self._outages += 1
+        lost = self._controller.stale_messages - self._outage_stale_messages
+        self._messages_lost += lost
+        logging.info(f'MIDI controller {self._controller.name} reconnected in '
+                     f'{(now - self._burst_started_at) * 1000:.1f} ms after {now - self._outage_started_at:.1f} s '
+                     f'outage, {lost} messages lost')
+        self._outage_started_at = None
+
+    def __str__(self) -> str:
+        return (f'reconnects={self._reconnects}, outages={self._outages}, messages lost={self._messages_lost}, '
+                f'debounced={self._debounced}, ignored={self._ignored}, latency: {self._reconnect_latency}')
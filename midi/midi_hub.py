@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import re
+import time
+from typing import List, Optional, Tuple
+
+import mido
+
+from metrics.histogram import Histogram
+from midi.dispatch_table import DispatchTable
+from midi.midi_controller import MidiController
+from midi.midi_dispatcher import MidiDispatcher
+from midi.midi_recorder import MidiRecorder
+
+
+class MidiHub:
+    """
+    Controllers whose messages feed one queue and one dispatcher. The MIDI backend threads of all the controllers
+    push to the queue, tagged with the index of their controller, and a single task dispatches them to the bindings
+    of that controller.
+    """
+
+    def __init__(self):
+        self._controllers: List[MidiController] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._messages: asyncio.Queue[Tuple[int, mido.Message, float]] = asyncio.Queue()
+        self._latency = Histogram()
+        self._dispatcher = MidiDispatcher()
+        self._recorder: Optional[MidiRecorder] = None
+
+    def add(self, name: str, name_regex: re.Pattern) -> MidiController:
+        controller = MidiController(name_regex, self._on_message, name, len(self._controllers))
+        self._controllers.append(controller)
+        return controller
+
+    def load(self, table: DispatchTable) -> None:
+        self._dispatcher.load(table)
+
+    def record_to(self, recorder: Optional[MidiRecorder]) -> None:
+        self._recorder = recorder
+
+    def feed(self, msg: mido.Message, device: Optional[str] = None) -> None:
+        """
+        Hand a message to the hub as if a controller received it, may be called from any thread
+
+        :param device: Name of the controller, None for the first one
+        """
+        controller = self.controller(device) if device is not None else self._controllers[0]
+        controller.feed(msg)
+
+    async def receive(self):
+        self._loop = asyncio.get_running_loop()
+        self._dispatcher.start()
+
+        try:
+            while True:
+                device, msg, received_at = await self._messages.get()
+                self._latency.record(time.perf_counter() - received_at)
+                await self._dispatcher.dispatch(msg, device)
+        finally:
+            self._dispatcher.stop()
+            logging.info(f'MIDI dispatch latency: {self._latency}, control changes: {self._dispatcher.coalescer}')
+            for controller in self._controllers:
+                logging.info(f'MIDI controller {controller.name}: received={controller.received}, '
+                             f'dropped={self._dispatcher.dropped(controller.index)}')
+            for worker in self._dispatcher.workers():
+                logging.info(f'Binding {worker}')
+
+    def controller(self, name: str) -> MidiController:
+        """
+        :raise KeyError: No controller has this name
+        """
+        for controller in self._controllers:
+            if controller.name == name:
+                return controller
+
+        raise KeyError(name)
+
+    @property
+    def controllers(self) -> List[MidiController]:
+        return list(self._controllers)
+
+    @property
+    def names(self) -> List[str]:
+        return [controller.name for controller in self._controllers]
+
+    @property
+    def latency(self) -> Histogram:
+        """
+        :return: Delay between a message reaching the MIDI backend and its dispatch
+        """
+        return self._latency
+
+    @property
+    def dispatcher(self) -> MidiDispatcher:
+        return self._dispatcher
+
+    @property
+    def backlog(self) -> int:
+        """
+        :return: Number of received messages not dispatched yet
+        """
+        return self._messages.qsize()
+
+    def _on_message(self, device: int, msg: mido.Message, received_at: float) -> None:
+        """
+        Called from the MIDI backend threads
+        """
+        if self._recorder is not None:
+            self._recorder.record(msg, received_at, self._controllers[device].name if device > 0 else None)
+
+        if self._loop is None:
+            logging.debug(f'Dropping MIDI message {msg} received before the hub started receiving')
+            return
+
+        self._loop.call_soon_threadsafe(self._messages.put_nowait, (device, msg, received_at))
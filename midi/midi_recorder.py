@@ -0,0 +1,67 @@
+import pathlib
+import threading
+import time
+from typing import List, Optional, TextIO, Tuple
+
+import mido
+
+
+class MidiRecorder:
+    """
+    Writes the messages received by the controllers to a file, one message per line prefixed with the number of
+    seconds since the first one and, except for the first controller, with @ and the name of the controller.
+    Messages are recorded from the MIDI backend threads.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self._path = path
+        self._file: Optional[TextIO] = None
+        self._lock = threading.Lock()
+        self._started_at: Optional[float] = None
+        self._count = 0
+
+    def open(self) -> None:
+        self._file = self._path.open('w')
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def record(self, msg: mido.Message, received_at: float, device: Optional[str] = None) -> None:
+        with self._lock:
+            if self._file is None:
+                return
+
+            if self._started_at is None:
+                self._started_at = received_at
+
+            prefix = f'@{device} ' if device is not None else ''
+            self._file.write(f'{received_at - self._started_at:.6f} {prefix}{msg}\n')
+            self._count += 1
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+
+Recording = List[Tuple[float, mido.Message, Optional[str]]]
+
+
+def load_recording(path: pathlib.Path) -> Recording:
+    """
+    :return: (seconds since the first message, message, controller name or None for the first one) read from a file
+             written by MidiRecorder
+    """
+    recording = []
+    for line in path.read_text().splitlines():
+        if not line.strip():
+            continue
+        timestamp, msg = line.split(' ', 1)
+        device = None
+        if msg.startswith('@'):
+            device, msg = msg[1:].split(' ', 1)
+        recording.append((float(timestamp), mido.Message.from_str(msg), device))
+
+    return recording
@@ -1,12 +1,16 @@
-from typing import List
+from typing import List, Optional
 
 from midi.program_mapping_exception import ProgramMappingException
 
 
 class Program:
-    def __init__(self, pads: List[int], knobs: List[int]):
+    def __init__(self, pads: List[int], knobs: List[int], channel: Optional[int] = None):
+        """
+        :param channel: Zero-based MIDI channel of the program, None if it is not tied to a channel
+        """
         self._pads = pads
         self._knobs = knobs
+        self._channel = channel
 
     def get_pad(self, pad: int):
         """
@@ -27,3 +31,7 @@ class Program:
             raise ProgramMappingException(f'Knob {knob} is not mapped')
 
         return self._knobs[knob - 1]
+
+    @property
+    def channel(self) -> Optional[int]:
+        return self._channel
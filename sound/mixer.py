@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import List, Optional
+
+from startup.lazy_import import lazy_import
+
+# Only loaded once the mixer is started, when samples are configured
+numpy = lazy_import('numpy')
+sounddevice = lazy_import('sounddevice')
+
+
+class Voice:
+    def __init__(self, sample: numpy.ndarray, looping: bool):
+        self.sample = sample
+        self.looping = looping
+        self.position = 0
+        self.finished = False
+
+    def stop(self) -> None:
+        self.finished = True
+
+
+class Mixer:
+    """
+    Single output stream, opened once, whose callback mixes all the playing voices. When the stream cannot be opened,
+    the voices played finish right away.
+    """
+
+    def __init__(self, samplerate: int = 48000, channels: int = 2, blocksize: int = 256):
+        self._samplerate = samplerate
+        self._channels = channels
+        self._blocksize = blocksize
+        self._voices: List[Voice] = []
+        self._voices_lock = threading.Lock()
+        self._stream: Optional[sounddevice.OutputStream] = None
+        self._disabled = False
+
+    def start(self) -> bool:
+        """
+        :return: False if the output stream could not be opened, samples are not played then
+        """
+        try:
+            self._stream = sounddevice.OutputStream(samplerate=self._samplerate, channels=self._channels,
+                                                    dtype='float32', blocksize=self._blocksize, latency='low',
+                                                    callback=self._callback)
+            self._stream.start()
+        except Exception as e:
+            # PortAudioError without a usable device, OSError without PortAudio
+            logging.warning(f'Could not open the audio output, samples are disabled: {e!r}')
+            self.stop()
+            self._disabled = True
+            return False
+
+        self._disabled = False
+        logging.debug(f'Started mixer: {self._samplerate}Hz, {self._channels} channels, '
+                      f'latency {self._stream.latency * 1000:.1f}ms')
+        return True
+
+    def stop(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def play(self, sample: numpy.ndarray, looping: bool = False) -> Voice:
+        voice = Voice(sample, looping)
+        if self._disabled:
+            voice.stop()
+            return voice
+
+        with self._voices_lock:
+            self._voices.append(voice)
+
+        return voice
+
+    @property
+    def started(self) -> bool:
+        return self._stream is not None
+
+    @property
+    def samplerate(self) -> int:
+        return self._samplerate
+
+    @property
+    def channels(self) -> int:
+        return self._channels
+
+    def _callback(self, out_data: numpy.ndarray, frames: int, _time, _status) -> None:
+        out_data.fill(0)
+
+        with self._voices_lock:
+            self._voices = [voice for voice in self._voices if not voice.finished]
+            voices = list(self._voices)
+
+        for voice in voices:
+            self._mix(voice, out_data, frames)
+
+        numpy.clip(out_data, -1., 1., out=out_data)
+
+    @staticmethod
+    def _mix(voice: Voice, out_data: numpy.ndarray, frames: int) -> None:
+        offset = 0
+        while offset < frames and not voice.finished:
+            count = min(frames - offset, len(voice.sample) - voice.position)
+            out_data[offset:offset + count] += voice.sample[voice.position:voice.position + count]
+            offset += count
+            voice.position += count
+
+            if voice.position >= len(voice.sample):
+                if voice.looping:
+                    voice.position = 0
+                else:
+                    voice.finished = True
@@ -1,11 +1,13 @@
+import asyncio
 import logging
 import re
 from typing import List, Optional
-from pulsectl import PulseVolumeInfo, PulseSinkInputInfo
+from pulsectl import PulseSinkInputInfo
 from pulsectl_asyncio import PulseAsync
 
-from sound.pulse_sink_inputs_db import PulseSinkInputsDb
+from sound.pulse_sink_inputs_db import PulseSinkInputsDb, SinkInputsDelta
 from sound.pulse_sinks import PulseSinks, SinksCountException
+from sound.volume_batch import VolumeBatch
 
 
 class PulseSinkInput:
@@ -19,6 +21,7 @@ class PulseSinkInput:
         self._sink_inputs_db = sink_inputs_db
         self._pulse_client = pulse_client
         self._current_volume: Optional[float] = None
+        self._sink_inputs_db.register_matcher(self.matches)
 
     async def set_volume(self, percentage: float):
         """
@@ -28,27 +31,66 @@ class PulseSinkInput:
         self._current_volume = percentage
         await self._set_volume(percentage)
 
+    def add_volume_to(self, batch: VolumeBatch, percentage: float) -> None:
+        """
+        Same as set_volume, sent with the other commands of the batch
+
+        :param percentage: Between 0 and 1
+        """
+        self._current_volume = percentage
+        self._add_volume_to(batch, percentage)
+
+    def restore_volume_to(self, batch: VolumeBatch) -> None:
+        """
+        Add the last volume set, if any, to the batch
+        """
+        if self._current_volume is not None:
+            self._add_volume_to(batch, self._current_volume)
+
+    def has_targets(self) -> bool:
+        return len(self._get_matching_sink_inputs()) > 0
+
+    def release(self) -> None:
+        """
+        Stop maintaining the matching sink inputs, the object must not be used afterwards
+        """
+        self._sink_inputs_db.unregister_matcher(self.matches)
+
     async def move(self, sink: PulseSinks) -> bool:
+        """
+        Move all the matching sink inputs to the sink, concurrently
+        """
         try:
-            sink_index = sink.get_index()
+            sink_index = sink.get_sink().index
         except SinksCountException as e:
             logging.warning(f'Failed to move {self}: {e}')
             return False
 
-        sink_inputs = self._get_matching_sink_inputs()
+        sink_inputs = [sink_input for sink_input in self._get_matching_sink_inputs() if sink_input.sink != sink_index]
         logging.debug(f'Moving sink inputs {sink_inputs} to sink {sink_index}')
 
-        for sink_input in sink_inputs:
-            await self._pulse_client.sink_input_move(sink_input.index, sink_index)
-            return True
+        await asyncio.gather(*[self._pulse_client.sink_input_move(sink_input.index, sink_index)
+                               for sink_input in sink_inputs])
+        return True
 
-    async def update(self) -> None:
-        logging.debug(f'Updating {self} (current volume = {self._current_volume})')
-        if self._current_volume is not None:
-            logging.info(f'Setting volume for {self} to {self._current_volume * 100}%')
-            await self._set_volume(self._current_volume)
+    async def update(self, delta: SinkInputsDelta) -> None:
+        """
+        Apply the last volume set to the new matching sink inputs, the others already have it
+        """
+        if self._current_volume is None:
+            return
+
+        added = [sink_input for sink_input in delta.added.values() if self.matches(sink_input)]
+        if len(added) == 0:
+            return
 
-    def _matches(self, source: PulseSinkInputInfo) -> bool:
+        logging.info(f'Setting volume of {len(added)} new sink inputs for {self} to {self._current_volume * 100}%')
+        batch = VolumeBatch(self._pulse_client)
+        for sink_input in added:
+            batch.set_sink_input_volume(sink_input, self._current_volume)
+        await batch.apply()
+
+    def matches(self, source: PulseSinkInputInfo) -> bool:
         props = source.proplist
         return (self._app_name_pattern is None or PulseSinkInput.APP_NAME_KEY in props
                 and self._app_name_pattern.search(props[PulseSinkInput.APP_NAME_KEY])) and \
@@ -56,18 +98,21 @@ class PulseSinkInput:
              and self._media_name_pattern.search(props[PulseSinkInput.MEDIA_NAME_KEY]))
 
     async def _set_volume(self, percentage: float):
+        batch = VolumeBatch(self._pulse_client)
+        self._add_volume_to(batch, percentage)
+        await batch.apply()
+
+    def _add_volume_to(self, batch: VolumeBatch, percentage: float) -> None:
         sink_inputs = self._get_matching_sink_inputs()
 
         if len(sink_inputs) == 0:
             logging.warning(f'Could not find sink for {self}')
 
         for sink in sink_inputs:
-            volume_info = PulseVolumeInfo(percentage, len(sink.volume.values))
-            await self._pulse_client.sink_input_volume_set(sink.index, volume_info)
-            logging.debug(f'Set {sink.name} volume to {percentage * 100}%')
+            batch.set_sink_input_volume(sink, percentage)
 
     def _get_matching_sink_inputs(self) -> List[PulseSinkInputInfo]:
-        return list(filter(self._matches, self._sink_inputs_db.get()))
+        return self._sink_inputs_db.get_matching(self.matches)
 
     def __str__(self) -> str:
         return f'App_name: {self._app_name_pattern}, media name: {self._media_name_pattern}'
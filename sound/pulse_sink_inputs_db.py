@@ -1,23 +1,164 @@
+import asyncio
+import dataclasses
 import logging
-from typing import List, Callable, Coroutine
+from typing import List, Callable, Coroutine, Dict, Optional, Set
 
 from pulsectl import PulseSinkInputInfo
 
 
+@dataclasses.dataclass
+class SinkInputsDelta:
+    """
+    Sink inputs added, changed and removed since the previous notification of a subscriber
+    """
+    added: Dict[int, PulseSinkInputInfo] = dataclasses.field(default_factory=dict)
+    changed: Dict[int, PulseSinkInputInfo] = dataclasses.field(default_factory=dict)
+    removed: Set[int] = dataclasses.field(default_factory=set)
+
+    def add(self, sink_input: PulseSinkInputInfo) -> None:
+        self.added[sink_input.index] = sink_input
+        self.removed.discard(sink_input.index)
+
+    def change(self, sink_input: PulseSinkInputInfo) -> None:
+        if sink_input.index in self.added:
+            self.added[sink_input.index] = sink_input
+        else:
+            self.changed[sink_input.index] = sink_input
+
+    def remove(self, index: int) -> None:
+        self.changed.pop(index, None)
+        if self.added.pop(index, None) is None:
+            self.removed.add(index)
+
+    def merge(self, other: 'SinkInputsDelta') -> None:
+        for index in other.removed:
+            self.remove(index)
+        for sink_input in other.added.values():
+            self.add(sink_input)
+        for sink_input in other.changed.values():
+            self.change(sink_input)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+
+class _Subscriber:
+    """
+    Delivers the deltas to a callback in its own task, merging those which arrive while it is running
+    """
+
+    def __init__(self, callback: Callable[[SinkInputsDelta], Coroutine]):
+        self._callback = callback
+        self._pending = SinkInputsDelta()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def callback(self) -> Callable[[SinkInputsDelta], Coroutine]:
+        return self._callback
+
+    def notify(self, delta: SinkInputsDelta) -> None:
+        self._pending.merge(delta)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._deliver())
+
+    async def _deliver(self) -> None:
+        while self._pending:
+            delta, self._pending = self._pending, SinkInputsDelta()
+            try:
+                await self._callback(delta)
+            except Exception:
+                logging.exception(f'Sink inputs subscriber {self._callback} failed')
+
+
 class PulseSinkInputsDb:
+    """
+    Sink inputs keyed by index, along with the indices matched by each registered matcher so that looking up the
+    sink inputs of a matcher does not evaluate it. Subscribers receive what changed in their own task, so that a slow
+    subscriber does not delay the next Pulse events.
+    """
+
     def __init__(self):
-        self._sink_inputs = []
-        self._change_callbacks = []
+        self._sink_inputs: Dict[int, PulseSinkInputInfo] = {}
+        self._matches: Dict[Callable[[PulseSinkInputInfo], bool], Set[int]] = {}
+        self._subscribers: List[_Subscriber] = []
 
-    async def refresh(self, sink_inputs: List[PulseSinkInputInfo]) -> None:
+    def refresh(self, sink_inputs: List[PulseSinkInputInfo]) -> None:
         logging.debug('Pulse sink inputs changed')
 
-        self._sink_inputs = sink_inputs
-        for cb in self._change_callbacks:
-            await cb()
+        previous, self._sink_inputs = self._sink_inputs, {sink_input.index: sink_input for sink_input in sink_inputs}
+        for matcher in self._matches:
+            self._matches[matcher] = {index for index, sink_input in self._sink_inputs.items() if matcher(sink_input)}
+
+        delta = SinkInputsDelta()
+        for index, sink_input in self._sink_inputs.items():
+            if index in previous:
+                delta.change(sink_input)
+            else:
+                delta.add(sink_input)
+        for index in previous.keys() - self._sink_inputs.keys():
+            delta.remove(index)
+
+        self._notify(delta)
+
+    def add_or_update(self, sink_input: PulseSinkInputInfo) -> None:
+        is_new = sink_input.index not in self._sink_inputs
+        logging.debug(f'Pulse sink input {sink_input.index} {"added" if is_new else "changed"}')
+
+        self._sink_inputs[sink_input.index] = sink_input
+        for matcher, matching in self._matches.items():
+            if matcher(sink_input):
+                matching.add(sink_input.index)
+            else:
+                matching.discard(sink_input.index)
+
+        delta = SinkInputsDelta()
+        if is_new:
+            delta.add(sink_input)
+        else:
+            delta.change(sink_input)
+        self._notify(delta)
+
+    def remove(self, index: int) -> None:
+        if self._sink_inputs.pop(index, None) is None:
+            return
+
+        logging.debug(f'Pulse sink input {index} removed')
+        for matching in self._matches.values():
+            matching.discard(index)
+
+        delta = SinkInputsDelta()
+        delta.remove(index)
+        self._notify(delta)
 
     def get(self) -> List[PulseSinkInputInfo]:
-        return self._sink_inputs
+        return list(self._sink_inputs.values())
+
+    def register_matcher(self, matcher: Callable[[PulseSinkInputInfo], bool]) -> None:
+        if matcher not in self._matches:
+            self._matches[matcher] = {index for index, sink_input in self._sink_inputs.items() if matcher(sink_input)}
+
+    def unregister_matcher(self, matcher: Callable[[PulseSinkInputInfo], bool]) -> None:
+        self._matches.pop(matcher, None)
+
+    def get_matching(self, matcher: Callable[[PulseSinkInputInfo], bool]) -> List[PulseSinkInputInfo]:
+        """
+        :param matcher: Must have been registered with register_matcher
+        """
+        return [self._sink_inputs[index] for index in sorted(self._matches[matcher])]
+
+    def register_to_change(self, callback: Callable[[SinkInputsDelta], Coroutine]) -> None:
+        self._subscribers.append(_Subscriber(callback))
+
+    def unregister_to_change(self, callback: Callable[[SinkInputsDelta], Coroutine]) -> None:
+        """
+        A delivery already running goes on
+        """
+        self._subscribers = [subscriber for subscriber in self._subscribers if subscriber.callback != callback]
+
+    def _notify(self, delta: SinkInputsDelta) -> None:
+        if not delta:
+            return
 
-    def register_to_change(self, callback: Callable[['PulseSinkInputsDb'], Coroutine]) -> None:
-        self._change_callbacks.append(callback)
+        for subscriber in self._subscribers:
+            subscriber.notify(delta)
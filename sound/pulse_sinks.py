@@ -1,9 +1,11 @@
 import logging
+from typing import Optional
 
-from pulsectl import PulseVolumeInfo, PulseSinkInfo
+from pulsectl import PulseSinkInfo
 from pulsectl_asyncio import PulseAsync
 
 from sound.pulse_sinks_view import PulseSinksView
+from sound.volume_batch import VolumeBatch
 
 
 class SinksCountException(Exception):
@@ -14,12 +16,22 @@ class PulseSinks:
     def __init__(self, sinks_view: PulseSinksView, pulse_client: PulseAsync):
         self._sinks_view = sinks_view
         self._pulse_client = pulse_client
+        self._current_volume: Optional[float] = None
 
     async def set_volume(self, percentage: float) -> None:
+        """
+        :param percentage: Between 0 and 1
+        """
+        batch = VolumeBatch(self._pulse_client)
+        self.add_volume_to(batch, percentage)
+        await batch.apply()
+
+    def add_volume_to(self, batch: VolumeBatch, percentage: float) -> None:
         """
         :param percentage: Between 0 and 1
         """
         logging.debug(f'Setting volume to {percentage * 100}% for {self}')
+        self._current_volume = percentage
 
         sinks = self._sinks_view.get()
 
@@ -27,12 +39,18 @@ class PulseSinks:
             logging.info(f'No sink matched for {self._sinks_view}')
 
         for s in sinks:
-            volume = PulseVolumeInfo(percentage, len(s.volume.values))
-            await self._pulse_client.sink_volume_set(s.index, volume)
+            batch.set_sink_volume(s, percentage)
+
+    def restore_volume_to(self, batch: VolumeBatch) -> None:
+        """
+        Add the last volume set, if any, to the batch
+        """
+        if self._current_volume is not None:
+            self.add_volume_to(batch, self._current_volume)
 
     async def set_default(self) -> bool:
         try:
-            raw_sink = self._get_raw_sink()
+            raw_sink = self.get_sink()
         except SinksCountException as e:
             logging.warning(f'Failed setting default sink: {e}')
             return False
@@ -42,9 +60,19 @@ class PulseSinks:
 
         return True
 
-    def _get_raw_sink(self) -> PulseSinkInfo:
+    def has_targets(self) -> bool:
+        return len(self._sinks_view.get()) > 0
+
+    def release(self) -> None:
+        self._sinks_view.release()
+
+    @property
+    def pulse_client(self) -> PulseAsync:
+        return self._pulse_client
+
+    def get_sink(self) -> PulseSinkInfo:
         """
-        :return:
+        :return: The only matching sink
         :raise SinksCountException
         """
         sinks = self._sinks_view.get()
@@ -1,14 +1,68 @@
-from typing import List
+import logging
+from typing import Callable, Dict, List, Tuple
 
 from pulsectl import PulseSinkInfo
 
 
 class PulseSinksDb:
+    """
+    Sinks keyed by index, along with the sinks matched by each registered matcher. Matches are only recomputed when a
+    sink appears, changes or disappears
+    """
+
     def __init__(self):
-        self._sinks = []
+        self._sinks: Dict[int, PulseSinkInfo] = {}
+        self._matches: Dict[Callable[[PulseSinkInfo], bool], Tuple[PulseSinkInfo, ...]] = {}
+        self._cache_hits = 0
+        self._change_callbacks: List[Callable[[], None]] = []
 
     def refresh(self, sinks_info: List[PulseSinkInfo]) -> None:
-        self._sinks = sinks_info
+        self._sinks = {sink.index: sink for sink in sinks_info}
+        self._rebuild_matches()
+
+    def add_or_update(self, sink: PulseSinkInfo) -> None:
+        logging.debug(f'Pulse sink {sink.index} {"changed" if sink.index in self._sinks else "added"}')
+        self._sinks[sink.index] = sink
+        self._rebuild_matches()
+
+    def remove(self, index: int) -> None:
+        if self._sinks.pop(index, None) is not None:
+            logging.debug(f'Pulse sink {index} removed')
+            self._rebuild_matches()
 
     def get(self) -> List[PulseSinkInfo]:
-        return self._sinks
+        return list(self._sinks.values())
+
+    def register_matcher(self, matcher: Callable[[PulseSinkInfo], bool]) -> None:
+        if matcher not in self._matches:
+            self._matches[matcher] = self._match(matcher)
+
+    def unregister_matcher(self, matcher: Callable[[PulseSinkInfo], bool]) -> None:
+        self._matches.pop(matcher, None)
+
+    def get_matching(self, matcher: Callable[[PulseSinkInfo], bool]) -> Tuple[PulseSinkInfo, ...]:
+        """
+        :param matcher: Must have been registered with register_matcher
+        """
+        self._cache_hits += 1
+        return self._matches[matcher]
+
+    def register_to_change(self, callback: Callable[[], None]) -> None:
+        """
+        :param callback: Called once the matches are rebuilt, must not block
+        """
+        self._change_callbacks.append(callback)
+
+    @property
+    def cache_hits(self) -> int:
+        return self._cache_hits
+
+    def _rebuild_matches(self) -> None:
+        for matcher in self._matches:
+            self._matches[matcher] = self._match(matcher)
+
+        for callback in self._change_callbacks:
+            callback()
+
+    def _match(self, matcher: Callable[[PulseSinkInfo], bool]) -> Tuple[PulseSinkInfo, ...]:
+        return tuple(sink for sink in self._sinks.values() if matcher(sink))
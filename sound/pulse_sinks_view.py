@@ -1,4 +1,4 @@
-from typing import Callable, List
+from typing import Callable, Tuple
 
 from pulsectl import PulseSinkInfo
 
@@ -10,9 +10,16 @@ class PulseSinksView:
         self._matcher = matcher
         self._pulse_sinks_db = pulse_sinks_db
         self._description = description
+        self._pulse_sinks_db.register_matcher(self._matcher)
 
-    def get(self) -> List[PulseSinkInfo]:
-        return list(filter(self._matcher, self._pulse_sinks_db.get()))
+    def get(self) -> Tuple[PulseSinkInfo, ...]:
+        return self._pulse_sinks_db.get_matching(self._matcher)
+
+    def release(self) -> None:
+        """
+        Stop maintaining the matches, the view must not be used afterwards
+        """
+        self._pulse_sinks_db.unregister_matcher(self._matcher)
 
     @property
     def description(self) -> str:
@@ -0,0 +1,272 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Coroutine, Dict, List, Optional
+
+from pulsectl import PulseDisconnected, PulseError, PulseEventFacilityEnum, PulseEventInfo, PulseEventTypeEnum, \
+    PulseIndexError, PulseSinkInfo, PulseSinkInputInfo
+from pulsectl_asyncio import PulseAsync
+
+from metrics.histogram import Histogram
+from sound.pulse_sink_inputs_db import PulseSinkInputsDb
+from sound.pulse_sinks_db import PulseSinksDb
+from sound.volume_batch import VolumeBatch
+
+
+class PulseSupervisor:
+    """
+    Keeps the sinks and sink inputs dbs in sync with Pulse, and the connection up. Events are handled in bursts with
+    one request per facility, so that a burst of stream changes is synchronized with a single listing. When the server
+    goes away (e.g. pipewire-pulse restarts), it reconnects with an exponential backoff, rebuilds both dbs from full
+    lists and calls the recovery callbacks. MIDI handling goes on meanwhile, volume batches are skipped while
+    disconnected and the targets keep their latest volume, to be restored by a recovery callback. The volumes reported
+    are checked against the ones sent before the dbs are updated, so that the bindings notified can send them again.
+    """
+
+    RECOVERY_BOUNDS = (0.1, 0.2, 0.5, 1., 2., 5., 10., 30., 60.)
+
+    def __init__(self, pulse_client: PulseAsync, sinks_db: PulseSinksDb, sink_inputs_db: PulseSinkInputsDb,
+                 backoff: float = 0.1, max_backoff: float = 5., event_window: float = 0.015):
+        """
+        :param event_window: Time to collect the events following a first one, in seconds
+        """
+        self._pulse_client = pulse_client
+        self._sinks_db = sinks_db
+        self._sink_inputs_db = sink_inputs_db
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._event_window = event_window
+        self._recovery_callbacks: List[Callable[[], Coroutine]] = []
+        self._recovery_time = Histogram(PulseSupervisor.RECOVERY_BOUNDS)
+        self._outage_started_at: Optional[float] = None
+        self._outages = 0
+        self._attempts = 0
+        self._events = 0
+        self._events_coalesced = 0
+        self._resyncs_avoided = 0
+
+    async def connect(self) -> bool:
+        """
+        First connection, on failure run() keeps trying
+
+        :return: True if connected
+        """
+        try:
+            await self._connect()
+            return True
+        except (PulseDisconnected, PulseError) as e:
+            logging.warning(f'Could not connect to Pulse, retrying in the background: {e}')
+            self._outage_started_at = time.perf_counter()
+            return False
+
+    def register_to_recovery(self, callback: Callable[[], Coroutine]) -> None:
+        """
+        :param callback: Called once reconnected and resynchronized
+        """
+        self._recovery_callbacks.append(callback)
+
+    async def run(self) -> None:
+        try:
+            while True:
+                try:
+                    if self._outage_started_at is not None:
+                        await self._reconnect()
+                    await self._follow_events()
+                except (PulseDisconnected, PulseError) as e:
+                    if self._outage_started_at is not None:
+                        # Lost again while reconnecting, the outage goes on
+                        logging.warning(f'Failed to recover the Pulse connection, retrying: {e!r}')
+                        await asyncio.sleep(self._backoff)
+                        continue
+                    if self._pulse_client.connected:
+                        logging.warning(f'Failed to handle Pulse events, subscribing again: {e!r}')
+                        await asyncio.sleep(self._backoff)
+                        continue
+                    logging.warning(f'Lost the Pulse connection, reconnecting: {e!r}')
+                    self._outage_started_at = time.perf_counter()
+        finally:
+            logging.info(f'Pulse connection: {self}')
+
+    @property
+    def connected(self) -> bool:
+        return self._outage_started_at is None
+
+    @property
+    def recovery_time(self) -> Histogram:
+        """
+        :return: Delay between losing the connection and being resynchronized
+        """
+        return self._recovery_time
+
+    @property
+    def outages(self) -> int:
+        return self._outages
+
+    async def _connect(self) -> None:
+        await self._pulse_client.connect()
+        sink_inputs, sinks = await asyncio.gather(self._pulse_client.sink_input_list(), self._pulse_client.sink_list())
+        self._refresh_sink_inputs(sink_inputs)
+        self._refresh_sinks(sinks)
+
+    async def _reconnect(self) -> None:
+        delay = self._backoff
+        while True:
+            self._attempts += 1
+            try:
+                await self._connect()
+                break
+            except (PulseDisconnected, PulseError) as e:
+                logging.debug(f'Pulse reconnection failed, retrying in {delay}s: {e}')
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self._max_backoff)
+
+        for callback in self._recovery_callbacks:
+            try:
+                await callback()
+            except Exception:
+                logging.exception(f'Pulse recovery callback {callback} failed')
+
+        recovery_time = time.perf_counter() - self._outage_started_at
+        self._recovery_time.record(recovery_time)
+        self._outages += 1
+        self._outage_started_at = None
+        logging.info(f'Reconnected to Pulse after {recovery_time:.2f}s')
+
+    async def _follow_events(self) -> None:
+        events: asyncio.Queue[PulseEventInfo] = asyncio.Queue()
+        resync_task = asyncio.create_task(self._resync_bursts(events))
+        try:
+            async for ev in self._pulse_client.subscribe_events('sink', 'sink_input', 'server'):
+                events.put_nowait(ev)
+        finally:
+            resync_task.cancel()
+
+    async def _resync_bursts(self, events: asyncio.Queue) -> None:
+        """
+        Collects the events received within the event window after a first one, then synchronizes each affected
+        facility with a single request
+        """
+        while True:
+            burst = [await events.get()]
+            await asyncio.sleep(self._event_window)
+            while not events.empty():
+                burst.append(events.get_nowait())
+
+            try:
+                await self._resync(burst)
+            except (PulseDisconnected, PulseError) as e:
+                # Reconnecting is up to the subscription, which fails as well when the connection is lost
+                logging.warning(f'Failed to synchronize after {len(burst)} Pulse events: {e!r}')
+            except Exception:
+                # Raised by a db change callback, the next bursts must still be handled
+                logging.exception(f'Failed to handle {len(burst)} Pulse events')
+
+    async def _resync(self, burst: List[PulseEventInfo]) -> None:
+        sink_inputs: Dict[int, PulseEventTypeEnum] = {}
+        sinks: Dict[int, PulseEventTypeEnum] = {}
+        server_changed = False
+        for ev in burst:
+            if ev.facility == PulseEventFacilityEnum.sink_input:
+                sink_inputs[ev.index] = ev.t
+            elif ev.facility == PulseEventFacilityEnum.sink:
+                sinks[ev.index] = ev.t
+            elif ev.facility == PulseEventFacilityEnum.server:
+                server_changed = True
+
+        requests = 0
+        if len(sink_inputs) == 1:
+            index, t = next(iter(sink_inputs.items()))
+            requests += await self._update_sink_input(index, t)
+        elif sink_inputs:
+            self._refresh_sink_inputs(await self._pulse_client.sink_input_list())
+            requests += 1
+
+        # The default sink is a server property, sinks may have changed along
+        if len(sinks) == 1 and not server_changed:
+            index, t = next(iter(sinks.items()))
+            requests += await self._update_sink(index, t)
+        elif sinks or server_changed:
+            self._refresh_sinks(await self._pulse_client.sink_list())
+            requests += 1
+
+        # One request per new or changed object when handled one event at a time
+        self._events += len(burst)
+        self._resyncs_avoided += max(sum(ev.t != PulseEventTypeEnum.remove for ev in burst
+                                         if ev.facility != PulseEventFacilityEnum.server) - requests, 0)
+        self._events_coalesced += len(burst) - (bool(sink_inputs) + bool(sinks or server_changed))
+
+    async def _update_sink_input(self, index: int, t: PulseEventTypeEnum) -> int:
+        """
+        :return: Number of requests made
+        """
+        if t == PulseEventTypeEnum.remove:
+            self._remove_sink_input(index)
+            return 0
+
+        try:
+            sink_input = await self._pulse_client.sink_input_info(index)
+        except PulseIndexError:
+            # Removed before we could fetch it, the remove event will follow
+            self._remove_sink_input(index)
+            return 1
+
+        VolumeBatch.observe(self._pulse_client, VolumeBatch.SINK_INPUT, sink_input)
+        self._sink_inputs_db.add_or_update(sink_input)
+        return 1
+
+    async def _update_sink(self, index: int, t: PulseEventTypeEnum) -> int:
+        """
+        :return: Number of requests made
+        """
+        if t == PulseEventTypeEnum.remove:
+            self._remove_sink(index)
+            return 0
+
+        try:
+            sink = await self._pulse_client.sink_info(index)
+        except PulseIndexError:
+            self._remove_sink(index)
+            return 1
+
+        VolumeBatch.observe(self._pulse_client, VolumeBatch.SINK, sink)
+        self._sinks_db.add_or_update(sink)
+        return 1
+
+    def _refresh_sink_inputs(self, sink_inputs: List[PulseSinkInputInfo]) -> None:
+        VolumeBatch.observe_all(self._pulse_client, VolumeBatch.SINK_INPUT, sink_inputs)
+        self._sink_inputs_db.refresh(sink_inputs)
+
+    def _refresh_sinks(self, sinks: List[PulseSinkInfo]) -> None:
+        VolumeBatch.observe_all(self._pulse_client, VolumeBatch.SINK, sinks)
+        self._sinks_db.refresh(sinks)
+
+    def _remove_sink_input(self, index: int) -> None:
+        VolumeBatch.forget(self._pulse_client, VolumeBatch.SINK_INPUT, index)
+        self._sink_inputs_db.remove(index)
+
+    def _remove_sink(self, index: int) -> None:
+        VolumeBatch.forget(self._pulse_client, VolumeBatch.SINK, index)
+        self._sinks_db.remove(index)
+
+    @property
+    def events(self) -> int:
+        return self._events
+
+    @property
+    def events_coalesced(self) -> int:
+        """
+        :return: Events handled along with an earlier event of the same burst and facility
+        """
+        return self._events_coalesced
+
+    @property
+    def resyncs_avoided(self) -> int:
+        """
+        :return: Requests saved compared to fetching every new or changed object on its own event
+        """
+        return self._resyncs_avoided
+
+    def __str__(self):
+        return f'outages={self._outages}, reconnection attempts={self._attempts}, ' \
+               f'recovery time: {self._recovery_time}, ' \
+               f'events={self._events}, coalesced={self._events_coalesced}, resyncs avoided={self._resyncs_avoided}'
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import logging
+import pathlib
+from typing import Dict
+
+from startup.lazy_import import lazy_import
+
+# Only loaded when samples are decoded
+numpy = lazy_import('numpy')
+soundfile = lazy_import('soundfile')
+
+
+class SampleBank:
+    """
+    Samples decoded once into float32 arrays of shape (frames, channels), at the rate and channel count of the mixer
+    """
+
+    def __init__(self, samplerate: int, channels: int):
+        self._samplerate = samplerate
+        self._channels = channels
+        self._samples: Dict[pathlib.Path, numpy.ndarray] = {}
+
+    def load(self, file_path: pathlib.Path) -> numpy.ndarray:
+        file_path = file_path.resolve()
+        if file_path not in self._samples:
+            data, samplerate = soundfile.read(file_path, dtype='float32', always_2d=True)
+            self._samples[file_path] = self._resample(self._convert_channels(data), samplerate)
+            logging.debug(f'Loaded {file_path}: {len(self._samples[file_path])} frames')
+
+        return self._samples[file_path]
+
+    def _convert_channels(self, data: numpy.ndarray) -> numpy.ndarray:
+        if data.shape[1] == self._channels:
+            return data
+        if data.shape[1] == 1:
+            return numpy.repeat(data, self._channels, axis=1)
+
+        # Down-mix to mono first, then spread to every output channel
+        return numpy.repeat(data.mean(axis=1, keepdims=True), self._channels, axis=1)
+
+    def _resample(self, data: numpy.ndarray, samplerate: int) -> numpy.ndarray:
+        if samplerate == self._samplerate:
+            return numpy.ascontiguousarray(data)
+
+        nb_frames = round(len(data) * self._samplerate / samplerate)
+        source_times = numpy.arange(len(data)) / samplerate
+        target_times = numpy.arange(nb_frames) / self._samplerate
+        resampled = numpy.empty((nb_frames, data.shape[1]), dtype=numpy.float32)
+        for channel in range(data.shape[1]):
+            resampled[:, channel] = numpy.interp(target_times, source_times, data[:, channel])
+
+        return resampled
+
+    @property
+    def samplerate(self) -> int:
+        return self._samplerate
+
+    @property
+    def channels(self) -> int:
+        return self._channels
@@ -1,70 +1,48 @@
-import pathlib
-import threading
+from __future__ import annotations
 
-import sounddevice
-import soundfile
+from typing import List, TYPE_CHECKING
 
+from sound.mixer import Mixer, Voice
 
-class SoundPlayer:
-    def __init__(self, file_path: pathlib.Path, looping: bool = False):
-        self._playback_stop_event: threading.Event = threading.Event()
-        self._playback_stop_event.set()
-        self._file_path = file_path
-        self._looping = looping
-
-    def _play(self, file_path: pathlib.Path) -> None:
-        def _work():
-            self._playback_stop_event.clear()
-
-            ended_normally = False
-
-            def callback(out_data, frames, _time, _status):
-                data = wf.buffer_read(frames, dtype='float32')
-                if len(out_data) > len(data):
-                    out_data[:len(data)] = data
-                    out_data[len(data):] = b'\x00' * (len(out_data) - len(data))
-                    raise sounddevice.CallbackStop
-                else:
-                    out_data[:] = data
-
-            def finished_callback():
-                nonlocal ended_normally
-
-                self._playback_stop_event.set()
-                ended_normally = True
-
-            with soundfile.SoundFile(file_path) as wf:
-                stream = sounddevice.RawOutputStream(samplerate=wf.samplerate,
-                                                     channels=wf.channels,
-                                                     callback=callback,
-                                                     blocksize=1024,
-                                                     finished_callback=finished_callback)
+if TYPE_CHECKING:
+    import numpy
 
-                with stream:
-                    self._playback_stop_event.wait()
-                    # Save result before the callback is called again
-                    result = ended_normally
-                    stream.stop()
 
-            return result
-
-        if self._looping:
-            while _work():
-                pass
-        else:
-            _work()
-
-    def play(self):
-        playback_thread = threading.Thread(target=self._play, args=(self._file_path,))
-        playback_thread.start()
-
-    def stop(self):
-        if not self._playback_stop_event.is_set():
-            self._playback_stop_event.set()
-            return True
-
-        return False
+class SoundPlayer:
+    def __init__(self, sample: numpy.ndarray, mixer: Mixer, looping: bool = False):
+        self._sample = sample
+        self._mixer = mixer
+        self._looping = looping
+        self._voices: List[Voice] = []
+
+    def play(self) -> None:
+        """
+        Start a new voice, on top of the ones already playing
+        """
+        self._voices = [voice for voice in self._voices if not voice.finished]
+        self._voices.append(self._mixer.play(self._sample, self._looping))
+
+    def stop(self) -> bool:
+        """
+        :return: Whether a voice was playing
+        """
+        playing = self.is_playing()
+        for voice in self._voices:
+            voice.stop()
+        self._voices = []
+
+        return playing
+
+    def retrigger(self) -> None:
+        """
+        Restart from the beginning
+        """
+        self.stop()
+        self.play()
 
     def toggle(self) -> None:
         if not self.stop():
             self.play()
+
+    def is_playing(self) -> bool:
+        return any(not voice.finished for voice in self._voices)
@@ -0,0 +1,144 @@
+import asyncio
+import dataclasses
+import itertools
+import logging
+from typing import Dict, List, Optional, Set
+
+from pulsectl import PulseSinkInputInfo
+from pulsectl_asyncio import PulseAsync
+
+from sound.pulse_sink_input import PulseSinkInput
+from sound.pulse_sink_inputs_db import PulseSinkInputsDb, SinkInputsDelta
+from sound.pulse_sinks import PulseSinks, SinksCountException
+from sound.pulse_sinks_db import PulseSinksDb
+
+
+@dataclasses.dataclass
+class RoutingRule:
+    streams: PulseSinkInput
+    target: PulseSinks
+
+
+class StreamRouter:
+    """
+    Moves sink inputs to the sink of the first rule matching them. Sink inputs are evaluated against the rules when
+    they appear or change, and the ones routed by each rule are remembered, so that they are moved back together when
+    the target sink of the rule appears or changes, without scanning the other streams. Moves are sent concurrently.
+    """
+
+    def __init__(self, sink_inputs_db: PulseSinkInputsDb, sinks_db: PulseSinksDb, pulse_client: PulseAsync):
+        self._sink_inputs_db = sink_inputs_db
+        self._pulse_client = pulse_client
+        self._rules: List[RoutingRule] = []
+        self._targets: List[Optional[int]] = []
+        # Sink inputs matched by each rule, and the rule of each sink input
+        self._routed: List[Dict[int, PulseSinkInputInfo]] = []
+        self._rule_of: Dict[int, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._evaluations = 0
+        self._moves = 0
+
+        sink_inputs_db.register_to_change(self.update)
+        sinks_db.register_to_change(self._on_sinks_changed)
+
+    def load(self, rules: List[RoutingRule]) -> None:
+        """
+        Replace the rules and route the current sink inputs with them
+        """
+        self._rules = rules
+        self._targets = [StreamRouter._target(rule) for rule in rules]
+        self._routed = [{} for _ in rules]
+        self._rule_of = {}
+
+        if rules:
+            current = SinkInputsDelta()
+            for sink_input in self._sink_inputs_db.get():
+                current.add(sink_input)
+            self._spawn(self.update(current))
+
+    async def update(self, delta: SinkInputsDelta) -> None:
+        for index in delta.removed:
+            self._forget(index)
+
+        moves = {}
+        for sink_input in itertools.chain(delta.added.values(), delta.changed.values()):
+            rule_index = self._route(sink_input)
+            target = self._targets[rule_index] if rule_index is not None else None
+            if target is not None and sink_input.sink != target:
+                moves[sink_input.index] = target
+
+        await self._move(moves)
+
+    def _route(self, sink_input: PulseSinkInputInfo) -> Optional[int]:
+        """
+        :return: Index of the first rule matching the sink input, which is remembered
+        """
+        self._evaluations += 1
+        self._forget(sink_input.index)
+
+        for rule_index, rule in enumerate(self._rules):
+            if rule.streams.matches(sink_input):
+                self._routed[rule_index][sink_input.index] = sink_input
+                self._rule_of[sink_input.index] = rule_index
+                return rule_index
+
+        return None
+
+    def _forget(self, index: int) -> None:
+        rule_index = self._rule_of.pop(index, None)
+        if rule_index is not None:
+            del self._routed[rule_index][index]
+
+    def _on_sinks_changed(self) -> None:
+        moves = {}
+        for rule_index, rule in enumerate(self._rules):
+            target = StreamRouter._target(rule)
+            if target == self._targets[rule_index]:
+                continue
+
+            self._targets[rule_index] = target
+            if target is not None:
+                logging.info(f'Routing {len(self._routed[rule_index])} sink inputs of {rule.streams} to {rule.target}')
+                moves.update({index: target for index, sink_input in self._routed[rule_index].items()
+                              if sink_input.sink != target})
+
+        if moves:
+            self._spawn(self._move(moves))
+
+    async def _move(self, moves: Dict[int, int]) -> None:
+        """
+        :param moves: Target sink index by sink input index
+        """
+        if not moves:
+            return
+
+        results = await asyncio.gather(*[self._pulse_client.sink_input_move(index, sink_index)
+                                         for index, sink_index in moves.items()], return_exceptions=True)
+        for (index, sink_index), result in zip(moves.items(), results):
+            if isinstance(result, Exception):
+                logging.warning(f'Failed to move sink input {index} to sink {sink_index}: {result!r}')
+            else:
+                self._moves += 1
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    def _target(rule: RoutingRule) -> Optional[int]:
+        try:
+            return rule.target.get_sink().index
+        except SinksCountException:
+            return None
+
+    @property
+    def evaluations(self) -> int:
+        return self._evaluations
+
+    @property
+    def moves(self) -> int:
+        return self._moves
+
+    def __str__(self):
+        return f'rules={len(self._rules)}, evaluations={self._evaluations}, moves={self._moves}'
@@ -0,0 +1,137 @@
+import asyncio
+import functools
+import logging
+import weakref
+from typing import Callable, Coroutine, Dict, Iterable, Tuple, Union
+
+from pulsectl import PulseSinkInfo, PulseSinkInputInfo, PulseVolumeInfo
+from pulsectl_asyncio import PulseAsync
+
+# Volumes are sent to Pulse as integers, where PA_VOLUME_NORM is 100%
+PA_VOLUME_NORM = 0x10000
+
+
+class VolumeBatch:
+    """
+    Volume commands sent concurrently on the Pulse connection, skipping objects whose last volume sent is the target.
+    The volumes sent are remembered per connection rather than read from the dbs, which only learn about our own
+    commands once Pulse notified them. A volume is forgotten once Pulse reports another one for its object, e.g. set
+    by another client, and when the object goes away. Within a batch, the latest volume of an object replaces the
+    earlier ones.
+    """
+
+    SINK = 'sink'
+    SINK_INPUT = 'sink_input'
+
+    # Last volume sent to each (object type, index), by Pulse connection
+    _SENT: 'weakref.WeakKeyDictionary[PulseAsync, Dict[Tuple[str, int], int]]' = weakref.WeakKeyDictionary()
+
+    def __init__(self, pulse_client: PulseAsync):
+        self._pulse_client = pulse_client
+        self._sent = VolumeBatch._SENT.setdefault(pulse_client, {})
+        self._commands: Dict[Tuple[str, int], Callable[[], Coroutine]] = {}
+        self._skipped = 0
+
+    @staticmethod
+    def forget_sent(pulse_client: PulseAsync) -> None:
+        """
+        Send the next volumes even if they were the last ones sent, e.g. once the server restarted
+        """
+        VolumeBatch._SENT.pop(pulse_client, None)
+
+    @staticmethod
+    def observe(pulse_client: PulseAsync, object_type: str, info: Union[PulseSinkInfo, PulseSinkInputInfo]) -> None:
+        """
+        Forget the volume sent to an object if Pulse reports another one
+        """
+        sent = VolumeBatch._SENT.get(pulse_client)
+        key = (object_type, info.index)
+        if sent is not None and key in sent and \
+                any(abs(round(value * PA_VOLUME_NORM) - sent[key]) > 1 for value in info.volume.values):
+            # Pulse rounds the volumes of each channel
+            del sent[key]
+
+    @staticmethod
+    def observe_all(pulse_client: PulseAsync, object_type: str,
+                    infos: Iterable[Union[PulseSinkInfo, PulseSinkInputInfo]]) -> None:
+        """
+        Same as observe for a full list of objects, the volumes of the objects not listed are forgotten
+        """
+        infos = list(infos)
+        for info in infos:
+            VolumeBatch.observe(pulse_client, object_type, info)
+
+        sent = VolumeBatch._SENT.get(pulse_client)
+        if sent is not None:
+            listed = {(object_type, info.index) for info in infos}
+            for key in [key for key in sent if key[0] == object_type and key not in listed]:
+                del sent[key]
+
+    @staticmethod
+    def forget(pulse_client: PulseAsync, object_type: str, index: int) -> None:
+        sent = VolumeBatch._SENT.get(pulse_client)
+        if sent is not None:
+            sent.pop((object_type, index), None)
+
+    def set_sink_volume(self, sink: PulseSinkInfo, percentage: float) -> None:
+        """
+        :param percentage: Between 0 and 1
+        """
+        volume = PulseVolumeInfo(percentage, len(sink.volume.values))
+        self._add((VolumeBatch.SINK, sink.index), percentage,
+                  functools.partial(self._pulse_client.sink_volume_set, sink.index, volume))
+
+    def set_sink_input_volume(self, sink_input: PulseSinkInputInfo, percentage: float) -> None:
+        """
+        :param percentage: Between 0 and 1
+        """
+        volume = PulseVolumeInfo(percentage, len(sink_input.volume.values))
+        self._add((VolumeBatch.SINK_INPUT, sink_input.index), percentage,
+                  functools.partial(self._pulse_client.sink_input_volume_set, sink_input.index, volume))
+
+    async def apply(self) -> Dict[Tuple[str, int], Exception]:
+        """
+        :return: Failures keyed by (object type, index)
+        """
+        commands, self._commands = self._commands, {}
+        if not commands:
+            return {}
+
+        if not self._pulse_client.connected:
+            # The targets remember their latest volume, restored once reconnected
+            logging.debug(f'Pulse is disconnected, not sending {len(commands)} volume commands')
+            self._forget(commands)
+            return {}
+
+        results = await asyncio.gather(*[command() for command in commands.values()], return_exceptions=True)
+
+        failures = {}
+        for key, result in zip(commands, results):
+            if isinstance(result, Exception):
+                logging.warning(f'Failed to set volume of {key[0]} {key[1]}: {result}')
+                failures[key] = result
+        # Sent again by the next command, even with the same volume
+        self._forget(failures)
+
+        return failures
+
+    @property
+    def pending(self) -> int:
+        return len(self._commands)
+
+    @property
+    def skipped(self) -> int:
+        return self._skipped
+
+    def _add(self, key: Tuple[str, int], percentage: float, command: Callable[[], Coroutine]) -> None:
+        volume = round(percentage * PA_VOLUME_NORM)
+        if key not in self._commands and self._sent.get(key) == volume:
+            self._skipped += 1
+            return
+
+        self._sent[key] = volume
+        self._commands[key] = command
+
+    def _forget(self, keys) -> None:
+        for key in keys:
+            self._sent.pop(key, None)
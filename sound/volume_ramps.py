@@ -0,0 +1,98 @@
+import asyncio
+import dataclasses
+import logging
+from typing import Dict, Optional, Union
+
+from pulsectl_asyncio import PulseAsync
+
+from sound.pulse_sink_input import PulseSinkInput
+from sound.pulse_sinks import PulseSinks
+from sound.volume_batch import VolumeBatch
+
+VolumeTarget = Union[PulseSinks, PulseSinkInput]
+
+
+@dataclasses.dataclass
+class Ramp:
+    start: float
+    goal: float
+    started_at: float
+
+
+class VolumeRamps:
+    """
+    Moves volumes towards their goal at a fixed rate: every tick, the interpolated volumes of all the active ramps
+    are sent in one batch, so the Pulse writes per second do not depend on how fast knobs send messages. The
+    scheduler sleeps while no ramp is active.
+    """
+
+    def __init__(self, pulse_client: PulseAsync, rate: float = 50., ramp_time: float = 0.08):
+        """
+        :param rate: Ticks per second
+        :param ramp_time: Time to reach a new goal, in seconds
+        """
+        self._pulse_client = pulse_client
+        self._period = 1. / rate
+        self._ramp_time = ramp_time
+        self._ramps: Dict[VolumeTarget, Ramp] = {}
+        self._volumes: Dict[VolumeTarget, float] = {}
+        self._active = asyncio.Event()
+        self._ticks = 0
+        self._goals = 0
+
+    def set_goal(self, target: VolumeTarget, goal: float) -> None:
+        """
+        Start ramping from the current volume, the first goal of a target is applied at once
+
+        :param goal: Between 0 and 1
+        """
+        now = asyncio.get_running_loop().time()
+        self._ramps[target] = Ramp(self._current(target, now, goal), goal, now)
+        self._goals += 1
+        self._active.set()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        try:
+            while True:
+                if not self._ramps:
+                    self._active.clear()
+                    await self._active.wait()
+
+                started_at = loop.time()
+                await self._tick(started_at)
+                await asyncio.sleep(max(self._period - (loop.time() - started_at), 0.))
+        finally:
+            logging.info(f'Volume ramps: {self}')
+
+    async def _tick(self, now: float) -> None:
+        self._ticks += 1
+        batch = VolumeBatch(self._pulse_client)
+
+        for target, ramp in list(self._ramps.items()):
+            volume = self._current(target, now, ramp.goal)
+            self._volumes[target] = volume
+            target.add_volume_to(batch, volume)
+            if volume == ramp.goal:
+                del self._ramps[target]
+
+        await batch.apply()
+
+    def _current(self, target: VolumeTarget, now: float, default: float) -> float:
+        ramp: Optional[Ramp] = self._ramps.get(target)
+        if ramp is None:
+            return self._volumes.get(target, default)
+
+        progress = (now - ramp.started_at) / self._ramp_time
+        if progress >= 1.:
+            return ramp.goal
+
+        return ramp.start + (ramp.goal - ramp.start) * progress
+
+    @property
+    def active(self) -> int:
+        return len(self._ramps)
+
+    def __str__(self):
+        return f'ticks={self._ticks}, goals={self._goals}, active={len(self._ramps)}'
@@ -0,0 +1,34 @@
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Module whose code only runs on first attribute access, for optional subsystems that are slow to import. Loading
+    is not thread safe: a module used from several threads must be loaded by one of them first, see load_now().
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f'No module named {name!r}', name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+
+    return module
+
+
+def load_now(name: str) -> ModuleType:
+    """
+    Run the code of a module imported with lazy_import(), or import it
+    """
+    module = lazy_import(name)
+    # Any attribute access loads a lazy module
+    getattr(module, '__name__')
+    return module
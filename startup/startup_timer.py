@@ -0,0 +1,55 @@
+import contextlib
+import logging
+import os
+import time
+from typing import Awaitable, Iterator, List, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+def process_uptime() -> float:
+    """
+    :return: Seconds since the process was started, interpreter startup and imports included
+    """
+    try:
+        with open('/proc/self/stat') as stat:
+            # The command name may contain spaces, the other fields follow the closing parenthesis
+            fields = stat.read().rsplit(')', 1)[1].split()
+        started_at = int(fields[19]) / os.sysconf('SC_CLK_TCK')
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - started_at
+    except (OSError, IndexError, ValueError):
+        return 0.
+
+
+class StartupTimer:
+    """
+    Times the startup phases, which may overlap, from the start of the process
+    """
+
+    def __init__(self):
+        self._origin = time.perf_counter() - process_uptime()
+        self._phases: List[Tuple[str, float, float]] = []
+
+    def mark(self, name: str) -> None:
+        """
+        Record a phase running from the start of the process until now
+        """
+        self._phases.append((name, 0., time.perf_counter() - self._origin))
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter() - self._origin
+        try:
+            yield
+        finally:
+            self._phases.append((name, start, time.perf_counter() - self._origin))
+
+    async def run(self, name: str, awaitable: Awaitable[T]) -> T:
+        with self.phase(name):
+            return await awaitable
+
+    def report(self) -> None:
+        elapsed = time.perf_counter() - self._origin
+        breakdown = ', '.join(f'{name} {start * 1000:.0f}-{end * 1000:.0f}ms'
+                              for name, start, end in sorted(self._phases, key=lambda phase: phase[1]))
+        logging.info(f'Ready {elapsed * 1000:.0f}ms after process start: {breakdown}')
@@ -0,0 +1,51 @@
+import asyncio
+
+from bench.fake_pulse import FakePulse
+from config.binding_resources import BindingResources
+from sound.pulse_sink_inputs_db import PulseSinkInputsDb
+from sound.pulse_sinks_db import PulseSinksDb
+
+
+def create_resources(sinks_db: PulseSinksDb, sink_inputs_db: PulseSinkInputsDb, pulse: FakePulse) -> BindingResources:
+    return BindingResources(sinks_db, sink_inputs_db, pulse, None, None, None, None, None, None)
+
+
+def test_edited_sink_input_released():
+    async def run():
+        pulse = FakePulse(0)
+        sink_inputs_db = PulseSinkInputsDb()
+        resources = create_resources(PulseSinksDb(), sink_inputs_db, pulse)
+
+        old = resources.sink_input({'app': 'spotify', 'restore_volume': True})
+        resources.release_unused()
+        await old.set_volume(.2)
+
+        # Edited to another app
+        resources.sink_input({'app': 'firefox', 'restore_volume': True})
+        resources.release_unused()
+        sink_inputs_db.add_or_update(pulse.add_sink_input('spotify'))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return sink_inputs_db, pulse
+
+    sink_inputs_db, pulse = asyncio.run(run())
+
+    assert len(sink_inputs_db._matches) == 1
+    assert len(sink_inputs_db._subscribers) == 1
+    assert pulse.calls['sink_input_volume_set'] == 0
+
+
+def test_crossfader_keeps_its_decks():
+    sinks_db = PulseSinksDb()
+    resources = create_resources(sinks_db, PulseSinkInputsDb(), FakePulse(0))
+    decks = [{'match_description': 'speakers'}, {'match_description': 'headphones'}]
+
+    resources.crossfader(decks)
+    resources.release_unused()
+    resources.crossfader(decks)
+    resources.release_unused()
+    assert len(sinks_db._matches) == 2
+
+    resources.sinks(decks[0])
+    resources.release_unused()
+    assert len(sinks_db._matches) == 1
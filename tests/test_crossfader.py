@@ -0,0 +1,57 @@
+import asyncio
+from typing import List
+
+from mido import Message
+
+from bench.fake_pulse import FakePulse
+from controls.crossfader import CrossFader
+from sound.volume_batch import VolumeBatch
+
+
+class FakeDeck:
+    def __init__(self, pulse_client: FakePulse, failures: int = 0):
+        self.pulse_client = pulse_client
+        self.failures = failures
+        self.set_default_calls = 0
+
+    def add_volume_to(self, batch: VolumeBatch, percentage: float) -> None:
+        pass
+
+    async def set_default(self) -> bool:
+        self.set_default_calls += 1
+        if self.failures > 0:
+            self.failures -= 1
+            return False
+        return True
+
+
+def move(crossfader: CrossFader, values: List[int]) -> None:
+    async def run():
+        for value in values:
+            await crossfader.update(Message('control_change', control=1, value=value))
+
+    asyncio.run(run())
+
+
+def test_default_sink_set_again_after_failure():
+    pulse = FakePulse(0)
+    decks = [FakeDeck(pulse), FakeDeck(pulse, failures=1)]
+    crossfader = CrossFader(decks)
+
+    move(crossfader, [0, 127])
+    assert crossfader.default_sink is decks[0]
+
+    move(crossfader, [126])
+    assert crossfader.default_sink is decks[1]
+    assert decks[1].set_default_calls == 2
+
+
+def test_default_sink_set_once_per_deck():
+    pulse = FakePulse(0)
+    decks = [FakeDeck(pulse), FakeDeck(pulse)]
+    crossfader = CrossFader(decks)
+
+    move(crossfader, [0, 10, 127, 120, 126])
+
+    assert crossfader.default_sink is decks[1]
+    assert [deck.set_default_calls for deck in decks] == [1, 1]
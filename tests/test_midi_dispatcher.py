@@ -0,0 +1,65 @@
+import asyncio
+from typing import List
+
+import mido
+
+from midi.binding_worker import BindingWorker, OverflowPolicy
+from midi.dispatch_table import DispatchTableBuilder
+from midi.midi_dispatcher import MidiDispatcher
+
+
+def test_blocked_binding_does_not_hold_up_the_others():
+    async def run():
+        handled: List[str] = []
+        release = asyncio.Event()
+
+        async def slow(msg: mido.Message):
+            await release.wait()
+            handled.append(f'slow {msg.velocity}')
+
+        async def fast(_msg: mido.Message):
+            handled.append('fast')
+
+        slow_worker = BindingWorker(slow, 'slow', 1, OverflowPolicy.BLOCK)
+        fast_worker = BindingWorker(fast, 'fast')
+        builder = DispatchTableBuilder()
+        builder.bind('note_on', 1, slow_worker)
+        builder.bind('note_on', 2, fast_worker)
+        dispatcher = MidiDispatcher()
+        dispatcher.load(builder.build())
+        dispatcher.start()
+
+        for velocity in range(1, 5):
+            await asyncio.wait_for(dispatcher.dispatch(mido.Message('note_on', note=1, velocity=velocity)), 0.1)
+        await asyncio.wait_for(dispatcher.dispatch(mido.Message('note_on', note=2)), 0.1)
+        await asyncio.sleep(0.01)
+        assert handled == ['fast']
+        assert slow_worker.depth == 3
+
+        release.set()
+        await asyncio.wait_for(slow_worker.drain_and_stop(), 1.)
+        dispatcher.stop()
+
+        assert handled == ['fast', 'slow 1', 'slow 2', 'slow 3', 'slow 4']
+        assert slow_worker.dropped == 0
+
+    asyncio.run(run())
+
+
+def test_stop_resolves_the_pending_messages():
+    async def run():
+        async def stuck(_msg: mido.Message):
+            await asyncio.Event().wait()
+
+        worker = BindingWorker(stuck, 'stuck', 1, OverflowPolicy.BLOCK)
+        worker.start()
+        # Handled, queued, then two in the backlog
+        pending = [worker.submit(mido.Message('note_on', velocity=velocity)) for velocity in range(1, 5)]
+        await asyncio.sleep(0.01)
+
+        worker.stop()
+
+        assert await asyncio.wait_for(asyncio.gather(*pending), 0.1) == [False] * 4
+        assert worker.depth == 0
+
+    asyncio.run(run())
@@ -0,0 +1,20 @@
+from sound import mixer as mixer_module
+from sound.mixer import Mixer
+
+
+class NoDevice:
+    class PortAudioError(Exception):
+        pass
+
+    class OutputStream:
+        def __init__(self, **_kwargs):
+            raise NoDevice.PortAudioError('Error querying device -1')
+
+
+def test_samples_disabled_without_audio_output(monkeypatch):
+    monkeypatch.setattr(mixer_module, 'sounddevice', NoDevice)
+    mixer = Mixer()
+
+    assert not mixer.start()
+    assert not mixer.started
+    assert mixer.play(object()).finished
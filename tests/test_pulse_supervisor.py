@@ -0,0 +1,145 @@
+import asyncio
+import dataclasses
+from typing import List
+
+from pulsectl import PulseDisconnected, PulseError, PulseEventFacilityEnum, PulseEventTypeEnum
+
+from bench.fake_pulse import FakePulse
+from sound.pulse_sink_inputs_db import PulseSinkInputsDb
+from sound.pulse_sinks_db import PulseSinksDb
+from sound.pulse_supervisor import PulseSupervisor
+
+
+class FlakyPulse(FakePulse):
+    """
+    Fails the requests listed in failures, in order, then behaves
+    """
+
+    def __init__(self, failures: List[str]):
+        super().__init__(0)
+        self.add_sink('Speakers')
+        self.add_sink_input('spotify')
+        self.failures = failures
+        self.connected = False
+        self.disconnected = asyncio.Event()
+
+    def disconnect(self) -> None:
+        self.connected = False
+        self.disconnected.set()
+
+    def _fail(self, request: str) -> None:
+        if self.failures and self.failures[0] == request:
+            self.failures.pop(0)
+            if request == 'connect':
+                raise PulseError('connection refused')
+            self.disconnect()
+            raise PulseDisconnected()
+
+    async def connect(self) -> None:
+        self._fail('connect')
+        self.connected = True
+        self.disconnected = asyncio.Event()
+
+    async def sink_input_list(self):
+        self._fail('sink_input_list')
+        return await super().sink_input_list()
+
+    async def subscribe_events(self, *_masks):
+        await self.disconnected.wait()
+        raise PulseDisconnected()
+        yield
+
+
+async def supervise(pulse: FlakyPulse, restore) -> PulseSupervisor:
+    supervisor = PulseSupervisor(pulse, PulseSinksDb(), PulseSinkInputsDb(), backoff=0.001, max_backoff=0.001)
+    supervisor.register_to_recovery(restore)
+    assert not await supervisor.connect()
+
+    task = asyncio.create_task(supervisor.run())
+    for _ in range(200):
+        await asyncio.sleep(0.005)
+        if supervisor.connected and not pulse.failures:
+            break
+    assert not task.done()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    return supervisor
+
+
+def test_disconnected_while_listing():
+    pulse = FlakyPulse(['connect', 'sink_input_list'])
+    restores = []
+
+    async def restore():
+        restores.append(pulse.connected)
+
+    supervisor = asyncio.run(supervise(pulse, restore))
+
+    assert supervisor.connected
+    assert supervisor.outages == 1
+    assert restores == [True]
+
+
+def test_disconnected_while_restoring():
+    pulse = FlakyPulse(['connect'])
+    restores = []
+
+    async def restore():
+        restores.append(pulse.connected)
+        if len(restores) == 1:
+            pulse.disconnect()
+            raise PulseDisconnected()
+
+    supervisor = asyncio.run(supervise(pulse, restore))
+
+    assert supervisor.connected
+    assert supervisor.outages == 2
+    assert restores == [True, True]
+
+
+@dataclasses.dataclass
+class FakeEvent:
+    facility: PulseEventFacilityEnum
+    t: PulseEventTypeEnum
+    index: int
+
+
+class EventsPulse(FakePulse):
+    def __init__(self):
+        super().__init__(0)
+        self.events: asyncio.Queue[FakeEvent] = asyncio.Queue()
+
+    async def connect(self) -> None:
+        pass
+
+    async def subscribe_events(self, *_masks):
+        while True:
+            yield await self.events.get()
+
+
+def test_failing_change_callback():
+    async def run() -> PulseSinksDb:
+        pulse = EventsPulse()
+        sinks_db = PulseSinksDb()
+        supervisor = PulseSupervisor(pulse, sinks_db, PulseSinkInputsDb(), event_window=0)
+        assert await supervisor.connect()
+        failures = [RuntimeError('router bug')]
+
+        def on_sinks_changed():
+            if failures:
+                raise failures.pop()
+
+        sinks_db.register_to_change(on_sinks_changed)
+        task = asyncio.create_task(supervisor.run())
+        for description in ('Speakers', 'Headphones'):
+            sink = pulse.add_sink(description)
+            pulse.events.put_nowait(FakeEvent(PulseEventFacilityEnum.sink, PulseEventTypeEnum.new, sink.index))
+            for _ in range(10):
+                await asyncio.sleep(0)
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return sinks_db
+
+    assert [sink.description for sink in asyncio.run(run()).get()] == ['Speakers', 'Headphones']
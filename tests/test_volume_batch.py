@@ -0,0 +1,133 @@
+import asyncio
+from typing import List, Tuple
+
+from pulsectl import PulseVolumeInfo
+
+from bench.fake_pulse import FakePulse
+from sound.volume_batch import PA_VOLUME_NORM, VolumeBatch
+
+
+def set_volumes(volumes: List[float]) -> FakePulse:
+    """
+    Each volume in its own batch, against the sink input info listed before the first one, like a db not notified
+    of our own commands yet
+    """
+    async def run() -> FakePulse:
+        pulse = FakePulse(0)
+        pulse.add_sink_input('spotify')
+        stale, = await pulse.sink_input_list()
+        pulse.calls.clear()
+
+        for volume in volumes:
+            batch = VolumeBatch(pulse)
+            batch.set_sink_input_volume(stale, volume)
+            await batch.apply()
+
+        return pulse
+
+    return asyncio.run(run())
+
+
+def volume_of(pulse: FakePulse) -> List[float]:
+    sink_input, = asyncio.run(pulse.sink_input_list())
+    return sink_input.volume.values
+
+
+def test_back_to_initial_volume():
+    pulse = set_volumes([.6, 1.])
+
+    assert volume_of(pulse) == [1., 1.]
+    assert pulse.calls['sink_input_volume_set'] == 2
+
+
+def test_back_and_forth():
+    pulse = set_volumes([.6, 1., .6])
+
+    assert volume_of(pulse) == [.6, .6]
+    assert pulse.calls['sink_input_volume_set'] == 3
+
+
+def test_same_volume_sent_once():
+    pulse = set_volumes([.6, .6, .6])
+
+    assert volume_of(pulse) == [.6, .6]
+    assert pulse.calls['sink_input_volume_set'] == 1
+
+
+def test_latest_volume_of_a_batch_wins():
+    async def run() -> FakePulse:
+        pulse = FakePulse(0)
+        sink_input = pulse.add_sink_input('spotify')
+        batch = VolumeBatch(pulse)
+        batch.set_sink_input_volume(sink_input, .6)
+        batch.set_sink_input_volume(sink_input, .3)
+        await batch.apply()
+        return pulse
+
+    pulse = asyncio.run(run())
+
+    assert volume_of(pulse) == [.3, .3]
+    assert pulse.calls['sink_input_volume_set'] == 1
+
+
+def test_sent_again_once_forgotten():
+    async def run() -> FakePulse:
+        pulse = FakePulse(0)
+        sink_input = pulse.add_sink_input('spotify')
+        for _ in range(2):
+            batch = VolumeBatch(pulse)
+            batch.set_sink_input_volume(sink_input, .6)
+            await batch.apply()
+            VolumeBatch.forget_sent(pulse)
+        return pulse
+
+    assert asyncio.run(run()).calls['sink_input_volume_set'] == 2
+
+
+def test_sent_again_once_changed_by_another_client():
+    async def run() -> FakePulse:
+        pulse = FakePulse(0)
+        sink = pulse.add_sink('Speakers')
+        for _ in range(2):
+            batch = VolumeBatch(pulse)
+            batch.set_sink_volume(sink, 0.)
+            await batch.apply()
+            # Raised from pavucontrol, then reported by Pulse
+            sink.volume = PulseVolumeInfo(.8, 2)
+            VolumeBatch.observe(pulse, VolumeBatch.SINK, sink)
+        return pulse
+
+    assert asyncio.run(run()).calls['sink_volume_set'] == 2
+
+
+def test_own_volume_reported():
+    async def run() -> FakePulse:
+        pulse = FakePulse(0)
+        sink = pulse.add_sink('Speakers')
+        for _ in range(2):
+            batch = VolumeBatch(pulse)
+            batch.set_sink_volume(sink, .3)
+            await batch.apply()
+            VolumeBatch.observe(pulse, VolumeBatch.SINK, (await pulse.sink_list())[0])
+        return pulse
+
+    assert asyncio.run(run()).calls['sink_volume_set'] == 1
+
+
+def test_removed_sink_inputs_forgotten():
+    async def run() -> Tuple[FakePulse, int]:
+        pulse = FakePulse(0)
+        kept, removed, listed_out = [pulse.add_sink_input(app) for app in ('spotify', 'firefox', 'vlc')]
+        batch = VolumeBatch(pulse)
+        for sink_input in (kept, removed, listed_out):
+            batch.set_sink_input_volume(sink_input, .5)
+        await batch.apply()
+
+        VolumeBatch.forget(pulse, VolumeBatch.SINK_INPUT, removed.index)
+        pulse.remove_sink_input(listed_out.index)
+        VolumeBatch.observe_all(pulse, VolumeBatch.SINK_INPUT, await pulse.sink_input_list())
+        return pulse, kept.index
+
+    pulse, kept_index = asyncio.run(run())
+
+    assert VolumeBatch._SENT[pulse] == {(VolumeBatch.SINK_INPUT, kept_index): round(.5 * PA_VOLUME_NORM)}
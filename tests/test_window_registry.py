@@ -0,0 +1,102 @@
+import asyncio
+import re
+import threading
+from datetime import timedelta
+from typing import List
+
+from wmctrl import Window
+
+from bench.fake_window_events import FakeWindowEvents
+from executors.executor_pool import ExecutorPool
+from focus.window_focus import WindowFocuser
+from focus.window_registry import WindowRegistry
+
+
+def titles(registry: WindowRegistry) -> List[str]:
+    return [window.wm_name for window in registry.windows()]
+
+
+def test_title_change_updates_cached_windows():
+    async def run():
+        events = FakeWindowEvents()
+        window = events.add_window('Navigator.firefox', 'Inbox - Mozilla Firefox')
+        registry = WindowRegistry(events)
+        registry.start()
+        assert titles(registry) == ['Inbox - Mozilla Firefox']
+
+        events.rename(window, 'Microsoft Teams - Mozilla Firefox')
+        await asyncio.sleep(0)
+
+        assert titles(registry) == ['Microsoft Teams - Mozilla Firefox']
+        assert events.calls['list_windows'] == 1
+
+    asyncio.run(run())
+
+
+class RacingWindowEvents(FakeWindowEvents):
+    """
+    Notifies a new window while the windows are being listed
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.registry = None
+
+    def list_windows(self) -> List[Window]:
+        windows = super().list_windows()
+        if self.calls['list_windows'] == 1:
+            self.add_window('zoom.zoom', 'Zoom Meeting')
+            self.registry.invalidate()
+        return windows
+
+
+def test_invalidated_while_listing():
+    async def run():
+        events = RacingWindowEvents()
+        events.add_window('spotify.Spotify', 'Spotify Premium')
+        registry = WindowRegistry(events)
+        events.registry = registry
+        registry.start()
+
+        assert titles(registry) == ['Spotify Premium']
+        assert titles(registry) == ['Spotify Premium', 'Zoom Meeting']
+        assert events.calls['list_windows'] == 2
+
+    asyncio.run(run())
+
+
+def test_warm_cache_read_without_the_pool():
+    async def run():
+        events = FakeWindowEvents()
+        window = events.add_window('Navigator.firefox', 'Inbox - Mozilla Firefox')
+        registry = WindowRegistry(events)
+        registry.start()
+        registry.windows()
+        events.activate(window)
+        await asyncio.sleep(0)
+        pool = ExecutorPool('window-manager')
+
+        assert await WindowFocuser(re.compile('firefox'), None, registry, pool).focus()
+        assert pool.completed == 0
+
+    asyncio.run(run())
+
+
+def test_polls_in_the_pool(monkeypatch):
+    async def run():
+        window = FakeWindowEvents().add_window('Navigator.firefox', 'Inbox - Mozilla Firefox')
+        loop_thread = threading.get_ident()
+        polled_from = []
+
+        def get_active() -> Window:
+            polled_from.append(threading.get_ident())
+            return window
+
+        monkeypatch.setattr(Window, 'get_active', get_active)
+        pool = ExecutorPool('window-manager')
+
+        assert await WindowRegistry().wait_until_active(window, timedelta(seconds=1), pool)
+        assert pool.completed == 1
+        assert loop_thread not in polled_from
+
+    asyncio.run(run())